@@ -1,40 +1,13 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.decomposition import PCA
-from sklearn.metrics import silhouette_score
-from sklearn_extra.cluster import KMedoids
-import psycopg2
-from sqlalchemy import create_engine
-import toml
+from core import db, metrics, profiling
 
 st.set_page_config(page_title="Aplikasi Clustering Banjir", initial_sidebar_state="auto", layout="wide")
 
 # ===== LOAD DATABASE CONFIGURATION FROM secrets.toml =====
+# Konfigurasi dibaca sekali per proses; engine & connection pool dipakai bersama semua halaman
 try:
-    secrets = toml.load(".streamlit/secrets.toml")
-    
-    # Cek apakah menggunakan connection string atau credential terpisah
-    if "connection_string" in secrets["database"]:
-        # Menggunakan connection string langsung
-        connection_string = secrets["database"]["connection_string"]
-        from urllib.parse import urlparse
-        parsed = urlparse(connection_string)
-        db_host = parsed.hostname
-        db_port = str(parsed.port) if parsed.port else "5432"
-        db_name = parsed.path[1:]  
-        db_user = parsed.username
-        db_password = parsed.password
-    else:
-        # Menggunakan credential terpisah
-        db_host = secrets["database"]["db_host"]
-        db_port = secrets["database"]["db_port"]
-        db_name = secrets["database"]["db_name"]
-        db_user = secrets["database"]["db_user"]
-        db_password = secrets["database"]["db_password"]
-        connection_string = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}?sslmode=require"
-        
+    db.load_config()
+    db.warm_up()
 except FileNotFoundError:
     st.error("❌ File secrets.toml tidak ditemukan di folder .streamlit/")
     st.info("💡 Pastikan file secrets.toml ada di .streamlit/secrets.toml")
@@ -51,13 +24,11 @@ if 'logged_in' not in st.session_state:
 
 # Fungsi untuk cek login dari database
 def check_login(username, password):
+    # Import di sini: core.backend ikut memuat pandas, tidak perlu untuk menampilkan form login
+    from core.backend import get_backend
+
     try:
-        engine = create_engine(connection_string)
-        query = "SELECT * FROM admin WHERE username = %s AND password = %s"
-        result = pd.read_sql(query, engine, params=(username, password))
-        engine.dispose()
-        
-        return len(result) > 0
+        return get_backend().check_login(username, password)
     except Exception as e:
         st.error(f"Error: {str(e)}")
         return False
@@ -150,6 +121,78 @@ else:
         st.divider()
         if st.button("🚪 Logout", use_container_width=True):
             logout()
+        
+        # Panel memori hanya untuk admin
+        if st.session_state.user_type == "admin":
+            # pandas & core.memory hanya dibutuhkan panel admin
+            import pandas as pd
+            from core.memory import session_report, shared_report
+
+            with st.expander("🧠 Pemakaian Memori"):
+                df_shared = pd.DataFrame(shared_report(), columns=["objek", "bytes"])
+                df_shared["MB"] = (df_shared["bytes"].astype(float) / 1024**2).round(2)
+                st.caption("Objek bersama (satu salinan per proses)")
+                st.dataframe(df_shared[["objek", "MB"]], hide_index=True, use_container_width=True)
+                
+                sessions, sessions_note = session_report()
+                df_sessions = pd.DataFrame(sessions, columns=["sesi", "jumlah_key", "bytes", "key_terbesar"])
+                df_sessions["MB"] = (df_sessions["bytes"].astype(float) / 1024**2).round(2)
+                if sessions_note:
+                    st.info(f"ℹ️ {sessions_note}")
+                else:
+                    st.caption(f"Sesi aktif: {len(df_sessions)}")
+                st.dataframe(df_sessions[["sesi", "jumlah_key", "MB", "key_terbesar"]], hide_index=True, use_container_width=True)
+            
+            # Panel performa: durasi per tahap dan cache hit/miss di proses ini (core.metrics)
+            with st.expander("⏱️ Performa"):
+                df_stages = pd.DataFrame(metrics.stage_report(), columns=["tahap", "jumlah", "rata_ms", "maks_ms", "terakhir_ms"])
+                st.caption("Durasi per tahap sejak proses dimulai (ms), urut total waktu")
+                st.dataframe(df_stages, hide_index=True, use_container_width=True)
+                
+                df_cache = pd.DataFrame(metrics.cache_report(), columns=["cache", "hit", "miss", "stale", "hit_ratio"])
+                st.caption("Cache hit / miss")
+                st.dataframe(df_cache, hide_index=True, use_container_width=True)
+                
+                traces = [trace for trace in metrics.recent_traces() if trace["stages"]]
+                if traces:
+                    latest = traces[0]
+                    df_trace = pd.DataFrame(latest["stages"], columns=["tahap", "detik"])
+                    df_trace["ms"] = (df_trace["detik"] * 1000).round(1)
+                    st.caption(f"Rerun terakhir {latest['page']}: {latest['total'] * 1000:.0f} ms")
+                    st.dataframe(df_trace[["tahap", "ms"]], hide_index=True, use_container_width=True)
+                
+                st.download_button(
+                    "📥 Metrik (format Prometheus)",
+                    data=metrics.render(),
+                    file_name="metrics.prom",
+                    mime="text/plain",
+                    use_container_width=True
+                )
+            
+            # Profil on-demand: rerun CLUSTERING / DATA berikutnya yang menjalankan aksi (core.profiling)
+            with st.expander("🔬 Profil"):
+                if st.session_state.get(profiling.ARM_KEY):
+                    st.info("Menunggu aksi berikutnya: klik Jalankan di CLUSTERING atau upload di DATA")
+                    if st.button("Batalkan profil", use_container_width=True):
+                        st.session_state[profiling.ARM_KEY] = False
+                        st.rerun()
+                elif st.button("🔬 Profil aksi berikutnya", use_container_width=True):
+                    st.session_state[profiling.ARM_KEY] = True
+                    st.rerun()
+                st.caption("Atau tambahkan ?profile=1 ke URL halaman CLUSTERING / DATA")
+                
+                for capture in profiling.list_captures():
+                    st.markdown(f"**{capture['page']}** {capture['started_at']} ({capture['seconds']:.2f}s)")
+                    st.caption(f"Parameter: {capture['params']} | Versi data: {capture['data_version']}")
+                    for ext, path in capture["files"].items():
+                        with open(path, "rb") as file:
+                            st.download_button(
+                                f"📥 {ext}",
+                                data=file.read(),
+                                file_name=f"{capture['name']}{ext}",
+                                key=f"profile_{capture['name']}{ext}",
+                                use_container_width=True
+                            )
     
     # Halaman Beranda dengan gambar di tengah
     st.title("🌊 Sistem Clustering Data Banjir")
@@ -0,0 +1,493 @@
+"""
+Uji beban: N sesi Streamlit bersamaan yang dijalankan dengan AppTest.
+
+Skenario:
+    guest    BERANDA (Masuk sebagai Guest) -> CLUSTERING, K-Medoids per tahun
+    admin    BERANDA (form login)          -> CLUSTERING, K-Medoids data Total
+    upload   BERANDA (form login)          -> DATA, upload CSV satu tahun lalu Update Database
+
+Setiap sesi adalah satu AppTest di thread sendiri, sama seperti server
+Streamlit yang menjalankan script setiap sesi di thread terpisah dalam satu
+proses: cache (st.cache_data / cache_resource, SWR store, pool koneksi)
+dipakai bersama oleh semua sesi. Setiap sesi mengulang alurnya --iterations
+kali dengan tahun / baris upload yang berbeda.
+
+Database default adalah SQLite sementara yang diisi dari workbook bawaan
+(core.seed) plus akun admin untuk load test. --secrets memakai database lain
+(mis. Postgres lokal); data yang diubah skenario upload dikembalikan ke isi
+workbook di akhir skenario.
+
+Per skenario dilaporkan:
+    latensi rerun p50/p95/p99 (semua rerun dan per langkah) dan jumlah error
+    peak RSS proses selama skenario
+    koneksi database: checkout bersamaan maksimum dan koneksi baru dari pool
+    SQLAlchemy; untuk Postgres juga jumlah maksimum baris pg_stat_activity
+
+Contoh:
+    python -m benchmarks.loadtest --sessions 1 5 20
+    python -m benchmarks.loadtest --scenario guest --sessions 50 --iterations 5
+    python -m benchmarks.loadtest --secrets .streamlit/secrets.toml --scenario guest admin
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import NullPool
+
+from benchmarks.run import DEFAULT_OUT_DIR, git_revision
+
+SCENARIOS = ("guest", "admin", "upload")
+DEFAULT_SESSIONS = (1, 5, 20)
+ADMIN_USERNAME = "loadtest"
+ADMIN_PASSWORD = "loadtest"
+UPLOAD_YEAR = 2019
+UPLOAD_KEY = "loadtest_upload_path"
+SAMPLE_INTERVAL = 0.05
+TIMEOUT = 300
+REPO_ROOT = Path(__file__).resolve().parents[1]
+APP_SCRIPT = REPO_ROOT / "BERANDA.py"
+
+
+# ===== APPTEST PARALEL =====
+
+@contextmanager
+def shared_apptest_state():
+    """
+    Siapkan AppTest untuk banyak sesi paralel dalam satu proses; semua patch
+    dikembalikan saat keluar dari blok with.
+
+    - AppTest memasang Runtime tiruan sebelum setiap run lalu mengosongkannya
+      sesudahnya, sehingga sesi lain yang masih berjalan bisa kehilangan
+      runtime (st.cache_data, st.pyplot). Runtime.instance() diarahkan ke satu
+      runtime tiruan bersama bila sedang kosong.
+    - AppTest membuat ScriptCache baru setiap run; compile script yang sama
+      secara bersamaan memicu error AST di Python 3.11. Satu ScriptCache
+      dipakai bersama, seperti di server Streamlit sungguhan.
+    - st.file_uploader diganti upload_from_session.
+    - Direktori kerja dipindah ke root repo karena halaman membaca file
+      (geojson, workbook) relatif terhadap direktori kerja.
+    """
+    import logging
+
+    import streamlit as st
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    shared = MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    script_cache = ScriptCache()
+
+    # Peringatan "missing ScriptRunContext" dari thread sampler / pool tidak relevan
+    logger = logging.getLogger("streamlit")
+    log_level = logger.level
+    cwd = os.getcwd()
+
+    with ExitStack() as stack:
+        stack.enter_context(patch.object(Runtime, "instance", classmethod(lambda cls: cls._instance or shared)))
+        stack.enter_context(patch.object(Runtime, "exists", classmethod(lambda cls: True)))
+        stack.enter_context(patch.object(app_test, "ScriptCache", lambda: script_cache))
+        stack.enter_context(patch.object(local_script_runner, "ScriptCache", lambda: script_cache))
+        stack.enter_context(patch.object(st, "file_uploader", upload_from_session))
+        logger.setLevel(logging.ERROR)
+        os.chdir(REPO_ROOT)
+        try:
+            yield
+        finally:
+            os.chdir(cwd)
+            logger.setLevel(log_level)
+
+
+def upload_from_session(*args, **kwargs):
+    """Pengganti st.file_uploader: AppTest belum bisa mengisi file uploader"""
+    import streamlit as st
+
+    path = st.session_state.get(UPLOAD_KEY)
+    if not path:
+        return None
+    with open(path, "rb") as file:
+        uploaded = io.BytesIO(file.read())
+    uploaded.name = os.path.basename(path)
+    return uploaded
+
+
+# ===== PENGUKURAN =====
+
+def rss_mb():
+    """RSS proses saat ini (MB) dari /proc; fallback ke ru_maxrss"""
+    try:
+        with open("/proc/self/statm") as file:
+            pages = int(file.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def percentiles(values):
+    if not values:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(values),
+        "p50_ms": round(p50 * 1000, 1),
+        "p95_ms": round(p95 * 1000, 1),
+        "p99_ms": round(p99 * 1000, 1),
+        "max_ms": round(max(values) * 1000, 1),
+    }
+
+
+class DbMonitor:
+    """Hitung koneksi pool SQLAlchemy (event connect / checkout / checkin)"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.lock = threading.Lock()
+        self.reset()
+        event.listen(engine, "connect", self.on_connect)
+        event.listen(engine, "checkout", self.on_checkout)
+        event.listen(engine, "checkin", self.on_checkin)
+
+    def reset(self):
+        with self.lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checked_out = 0
+            self.peak_checked_out = 0
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self.lock:
+            self.connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self.lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        with self.lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def close(self):
+        event.remove(self.engine, "connect", self.on_connect)
+        event.remove(self.engine, "checkout", self.on_checkout)
+        event.remove(self.engine, "checkin", self.on_checkin)
+
+    def report(self):
+        pool = self.engine.pool
+        return {
+            "new_connections": self.connects,
+            "checkouts": self.checkouts,
+            "peak_checked_out": self.peak_checked_out,
+            "pool_size": pool.size() if hasattr(pool, "size") else None,
+            "max_overflow": getattr(pool, "_max_overflow", None),
+        }
+
+
+class Sampler(threading.Thread):
+    """Ambil sampel RSS (dan pg_stat_activity untuk Postgres) selama skenario berjalan"""
+
+    def __init__(self, url):
+        super().__init__(daemon=True)
+        self.stop_event = threading.Event()
+        self.peak_rss_mb = rss_mb()
+        self.peak_pg_connections = None
+        self.pg_engine = None
+        if url.get_backend_name() == "postgresql":
+            # Engine terpisah tanpa pool: koneksi sampler tidak ikut dihitung di pool aplikasi
+            self.pg_engine = create_engine(url, poolclass=NullPool)
+
+    def run(self):
+        conn = self.pg_engine.connect() if self.pg_engine is not None else None
+        query = text(
+            "SELECT count(*) FROM pg_stat_activity "
+            "WHERE datname = current_database() AND pid <> pg_backend_pid()"
+        )
+        try:
+            while not self.stop_event.is_set():
+                self.peak_rss_mb = max(self.peak_rss_mb, rss_mb())
+                if conn is not None:
+                    count = conn.execute(query).scalar()
+                    self.peak_pg_connections = max(self.peak_pg_connections or 0, count)
+                self.stop_event.wait(SAMPLE_INTERVAL)
+        finally:
+            if conn is not None:
+                conn.close()
+                self.pg_engine.dispose()
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+# ===== SESI =====
+
+class Session:
+    """Satu sesi browser: AppTest + catatan latensi setiap rerun"""
+
+    def __init__(self, number):
+        from streamlit.testing.v1 import AppTest
+
+        self.number = number
+        self.at = AppTest.from_file(APP_SCRIPT, default_timeout=TIMEOUT)
+        self.timings = []
+        self.errors = []
+
+    def step(self, name, action):
+        start = time.perf_counter()
+        try:
+            action()
+        except Exception as e:
+            self.errors.append({"step": name, "error": f"{type(e).__name__}: {e}"})
+            raise
+        self.timings.append((name, time.perf_counter() - start))
+        # Hanya exception; st.error juga dipakai untuk konten biasa (mis. skor silhouette rendah)
+        for exception in self.at.exception:
+            self.errors.append({"step": name, "error": exception.value})
+
+    def login_guest(self):
+        at = self.at
+        self.step("beranda.open", at.run)
+        self.step("beranda.pilih_guest", lambda: at.radio[0].set_value("Masuk sebagai Guest").run())
+        self.step("beranda.login", lambda: at.button[0].click().run())
+
+    def login_admin(self):
+        at = self.at
+        self.step("beranda.open", at.run)
+        at.text_input[0].input(ADMIN_USERNAME)
+        at.text_input[1].input(ADMIN_PASSWORD)
+        self.step("beranda.login", lambda: at.button[0].click().run())
+        if not at.session_state.logged_in:
+            raise RuntimeError("login admin gagal")
+
+    def clustering(self, tipe_data, tahun=None):
+        at = self.at
+        if "clustering.open" not in {name for name, _ in self.timings}:
+            self.step("clustering.open", lambda: at.switch_page("pages/CLUSTERING.py").run())
+        self.step("clustering.tipe_data", lambda: at.radio[0].set_value(tipe_data).run())
+        if tahun is not None:
+            self.step("clustering.tahun", lambda: at.selectbox[0].set_value(tahun).run())
+        self.step("clustering.run", lambda: at.button[0].click().run())
+
+    def upload(self, path):
+        at = self.at
+        at.session_state[UPLOAD_KEY] = path
+        # Membuka DATA dengan file terisi = baca + validasi
+        self.step("data.validate", lambda: at.switch_page("pages/DATA.py").run())
+        buttons = [button for button in at.button if "Update Database" in button.label]
+        if not buttons:
+            raise RuntimeError("tombol Update Database tidak muncul (validasi gagal?)")
+        self.step("data.update", lambda: buttons[0].click().run())
+
+
+def guest_flow(session, iterations, years):
+    session.login_guest()
+    for i in range(iterations):
+        session.clustering("Per Tahun", years[(session.number + i) % len(years)])
+
+
+def admin_flow(session, iterations, years):
+    session.login_admin()
+    for i in range(iterations):
+        session.clustering("Total (Agregasi)")
+
+
+def make_upload_flow(work_dir, original):
+    """Alur upload: setiap iterasi menaikkan jumlah_lansia satu baris sehingga selalu ada yang ditulis"""
+    from core import ingest
+
+    def upload_flow(session, iterations, years):
+        session.login_admin()
+        row = session.number % len(original)
+        for i in range(iterations):
+            df = original.copy()
+            df.loc[row, "jumlah_lansia"] = df.loc[row, "jumlah_lansia"] + i + 1
+            df[ingest.YEAR_COLUMN] = UPLOAD_YEAR
+            path = os.path.join(work_dir, f"upload_{session.number}_{i}.csv")
+            df.to_csv(path, index=False)
+            session.upload(path)
+
+    return upload_flow
+
+
+# ===== DATABASE =====
+
+def prepare_database(work_dir, secrets, pool_size, max_overflow, log=print):
+    """Pakai secrets (database yang sudah ada) atau buat SQLite sementara berisi workbook bawaan"""
+    from core import db, seed
+    from core.backend import get_backend
+
+    if secrets:
+        db.configure(secrets)
+    else:
+        secrets = os.path.join(work_dir, "secrets.toml")
+        with open(secrets, "w", encoding="utf-8") as file:
+            file.write(
+                "[database]\n"
+                f'connection_string = "sqlite:///{work_dir}/loadtest.sqlite"\n'
+                f'snapshot_dir = "{work_dir}/snapshots"\n'
+                f"pool_size = {pool_size}\n"
+                f"max_overflow = {max_overflow}\n"
+            )
+        db.configure(secrets)
+        seed.seed(log=lambda message: log(f"  seed: {message}"))
+    get_backend().create_admin(ADMIN_USERNAME, ADMIN_PASSWORD)
+    return secrets
+
+
+def original_upload_frame():
+    """Isi workbook bawaan untuk UPLOAD_YEAR (kolom seperti file upload)"""
+    from core import ingest, seed
+
+    path = seed.find_workbooks()[UPLOAD_YEAR]
+    with open(path, "rb") as file:
+        return ingest.read_upload(file, UPLOAD_YEAR)[UPLOAD_YEAR]
+
+
+def restore_upload_year(original):
+    from core import ingest
+    from core.backend import get_backend
+
+    backend = get_backend()
+    df = original.copy()
+    valid_codes = backend.valid_codes(UPLOAD_YEAR)
+    ingest.validate(df, valid_codes)
+    backend.apply_upload({UPLOAD_YEAR: df}, {UPLOAD_YEAR: valid_codes})
+
+
+# ===== SKENARIO =====
+
+def run_scenario(name, flow, n_sessions, iterations, years):
+    from core import db
+
+    engine = db.get_engine()
+    monitor = DbMonitor(engine)
+    sampler = Sampler(engine.url)
+    sampler.start()
+    sessions = [Session(number) for number in range(n_sessions)]
+
+    def run_session(session):
+        try:
+            flow(session, iterations, years)
+        except Exception as e:
+            if not session.errors:
+                session.errors.append({"step": "flow", "error": f"{type(e).__name__}: {e}"})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_sessions) as executor:
+        list(executor.map(run_session, sessions))
+    wall = time.perf_counter() - start
+    sampler.stop()
+    monitor.close()
+
+    timings = [(step, seconds) for session in sessions for step, seconds in session.timings]
+    steps = {}
+    for step, seconds in timings:
+        steps.setdefault(step, []).append(seconds)
+    errors = [dict(session=session.number, **error) for session in sessions for error in session.errors]
+    db_report = monitor.report()
+    db_report["peak_pg_connections"] = sampler.peak_pg_connections
+    return {
+        "scenario": name,
+        "sessions": n_sessions,
+        "iterations": iterations,
+        "wall_seconds": round(wall, 2),
+        "reruns": len(timings),
+        "errors": len(errors),
+        "error_samples": errors[:10],
+        "latency": percentiles([seconds for _, seconds in timings]),
+        "steps": {step: percentiles(values) for step, values in steps.items()},
+        "peak_rss_mb": round(sampler.peak_rss_mb, 1),
+        "db": db_report,
+    }
+
+
+def print_report(record):
+    latency = record["latency"]
+    db_report = record["db"]
+    pg = f" pg={db_report['peak_pg_connections']}" if db_report["peak_pg_connections"] is not None else ""
+    print(
+        f"  {record['scenario']:<7} {record['sessions']:>4} sesi  "
+        f"p50 {latency.get('p50_ms', 0):8.1f}  p95 {latency.get('p95_ms', 0):8.1f}  "
+        f"p99 {latency.get('p99_ms', 0):8.1f} ms  rss {record['peak_rss_mb']:7.1f} MB  "
+        f"koneksi {db_report['peak_checked_out']}/{db_report['new_connections']}{pg}  "
+        f"error {record['errors']}"
+    )
+
+
+def run(scenarios, session_counts, iterations, secrets=None, pool_size=5, max_overflow=5, log=print):
+    from core.backend import get_backend
+
+    meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "iterations": iterations,
+    }
+    # Relatif terhadap direktori pemanggil, bukan root repo (lihat shared_apptest_state)
+    secrets = os.path.abspath(secrets) if secrets else None
+    results = []
+    with shared_apptest_state(), tempfile.TemporaryDirectory(prefix="loadtest-") as work_dir:
+        secrets = prepare_database(work_dir, secrets, pool_size, max_overflow, log)
+        backend = get_backend()
+        meta["backend"] = backend.name
+        years = backend.available_years()
+        original = original_upload_frame()
+        flows = {"guest": guest_flow, "admin": admin_flow, "upload": make_upload_flow(work_dir, original)}
+
+        for name in scenarios:
+            for n_sessions in session_counts:
+                try:
+                    record = run_scenario(name, flows[name], n_sessions, iterations, years)
+                finally:
+                    if name == "upload":
+                        restore_upload_year(original)
+                print_report(record)
+                results.append(record)
+    return {"meta": meta, "results": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Uji beban sesi Streamlit bersamaan dengan AppTest")
+    parser.add_argument("--scenario", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--sessions", type=int, nargs="+", default=list(DEFAULT_SESSIONS))
+    parser.add_argument("--iterations", type=int, default=3, help="pengulangan alur per sesi")
+    parser.add_argument("--secrets", help="secrets.toml database yang dipakai (default: SQLite sementara)")
+    parser.add_argument("--pool-size", type=int, default=5, help="pool_size untuk SQLite sementara")
+    parser.add_argument("--max-overflow", type=int, default=5, help="max_overflow untuk SQLite sementara")
+    parser.add_argument("--out", help=f"file JSON (default: {DEFAULT_OUT_DIR}/loadtest-<waktu>.json)")
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.scenario, args.sessions, args.iterations,
+        args.secrets, args.pool_size, args.max_overflow,
+    )
+    out = args.out or os.path.join(DEFAULT_OUT_DIR, f"loadtest-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Hasil: {out}")
+
+
+if __name__ == "__main__":
+    main()
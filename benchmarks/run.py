@@ -0,0 +1,259 @@
+"""
+Benchmark per tahap untuk dataset sintetis (lihat benchmarks.synthetic).
+
+Tahap yang diukur untuk setiap ukuran:
+    load.seed, load.fetch_year, load.total   database SQLite sementara (core.backend)
+    scale                                     MinMaxScaler
+    kmedoids.fit, dbscan.fit
+    silhouette.score, silhouette.samples
+    categorize                                core.engine.categorize_clusters
+    pca
+    geometry.store                            build store .npz dari GeoJSON sintetis
+    map.geometry_export                       file geometri statis untuk browser (sekali)
+    map.build, map.render                     core.maps + serialisasi HTML folium per hasil
+    upload                                    validasi + tulis delta seperti DATA.py
+
+Tahap O(n^2) (K-Medoids, silhouette) dilewati di atas --max-pairwise-rows dan
+dicatat sebagai "skipped"; error (mis. MemoryError) dicatat sebagai "error",
+sehingga titik patah terlihat di hasil. Hasil ditulis sebagai JSON.
+
+Contoh:
+    python -m benchmarks.run
+    python -m benchmarks.run --rows 44 267 --repeat 5 --out hasil.json
+    python -m benchmarks.run compare lama.json baru.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import synthetic
+
+DEFAULT_OUT_DIR = os.path.join("benchmarks", "results")
+DEFAULT_MAX_PAIRWISE_ROWS = 20000
+UPLOAD_YEAR = 2019
+CHANGED_FRACTION = 0.1
+
+
+def peak_rss_mb():
+    # ru_maxrss dalam KB di Linux, byte di macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def measure(func, repeat):
+    """Jalankan func() repeat kali; (daftar detik, hasil terakhir)"""
+    seconds = []
+    result = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = func(i)
+        seconds.append(time.perf_counter() - start)
+    return seconds, result
+
+
+class Recorder:
+    def __init__(self, repeat, log=print):
+        self.repeat = repeat
+        self.log = log
+        self.results = []
+
+    def run(self, rows, stage, func, repeat=None, skip=None, **extra):
+        """Ukur satu tahap; mengembalikan hasil func atau None jika dilewati / error"""
+        record = {"rows": rows, "stage": stage, **extra}
+        result = None
+        if skip:
+            record.update(status="skipped", reason=skip)
+        else:
+            try:
+                seconds, result = measure(func, repeat or self.repeat)
+                record.update(
+                    status="ok",
+                    seconds=seconds,
+                    median=statistics.median(seconds),
+                    min=min(seconds),
+                )
+            except Exception as e:  # MemoryError juga: catat lalu lanjut ke tahap berikutnya
+                record.update(status="error", error=f"{type(e).__name__}: {e}")
+        record["peak_rss_mb"] = round(peak_rss_mb(), 1)
+        self.results.append(record)
+
+        if record["status"] == "ok":
+            self.log(f"  {stage:<20} {record['median'] * 1000:10.1f} ms")
+        else:
+            self.log(f"  {stage:<20} {record['status']}: {record.get('reason') or record.get('error')}")
+        return result
+
+
+def bench_size(n, source, work_dir, recorder, max_pairwise_rows, max_vertices):
+    import numpy as np
+    from sklearn.cluster import DBSCAN
+    from sklearn.decomposition import PCA
+    from sklearn.metrics import silhouette_samples, silhouette_score
+    from sklearn.preprocessing import MinMaxScaler
+    from sklearn_extra.cluster import KMedoids
+
+    from core import aggregate, db, engine, ingest, kecamatan, maps, seed
+    from core.backend import get_backend
+    from core.geometry import load_store
+
+    geojson_path, frames = synthetic.write_dataset(n, work_dir, source, max_vertices)
+    pairwise_skip = (
+        f"O(n^2) di atas {max_pairwise_rows} baris" if n > max_pairwise_rows else None
+    )
+
+    # Database SQLite sementara sebagai pengganti database server
+    secrets_path = os.path.join(work_dir, f"secrets_{n}.toml")
+    with open(secrets_path, "w", encoding="utf-8") as file:
+        file.write(f'[database]\nconnection_string = "sqlite:///{work_dir}/bench_{n}.sqlite"\n')
+    db.configure(secrets_path)
+    backend = get_backend()
+
+    store = recorder.run(n, "geometry.store", lambda i: load_store(geojson_path), repeat=1)
+    index = kecamatan.KecamatanIndex(store) if store is not None else kecamatan.get_index(geojson_path)
+    normalized = {tahun: seed.normalize(df, index) for tahun, df in frames.items()}
+
+    recorder.run(n, "load.seed", lambda i: backend.load_years(normalized, index, log=lambda message: None), repeat=1)
+    recorder.run(n, "load.fetch_year", lambda i: backend.fetch(f"kejadian_{UPLOAD_YEAR}"))
+    total = recorder.run(
+        n, "load.total",
+        lambda i: aggregate.total_from_frames(
+            {tahun: backend.fetch(f"kejadian_{tahun}") for tahun in backend.available_years()}
+        ),
+    )
+    if total is None:
+        return
+
+    X_scaled = recorder.run(n, "scale", lambda i: MinMaxScaler().fit_transform(total[engine.FEATURE_COLUMNS]))
+    kmedoids_labels = recorder.run(
+        n, "kmedoids.fit",
+        lambda i: KMedoids(n_clusters=3, random_state=42, max_iter=300, metric="euclidean").fit_predict(X_scaled),
+        skip=pairwise_skip,
+    )
+    dbscan_labels = recorder.run(
+        n, "dbscan.fit", lambda i: DBSCAN(eps=0.05, min_samples=5, metric="euclidean").fit_predict(X_scaled)
+    )
+    labels = kmedoids_labels if kmedoids_labels is not None else dbscan_labels
+    few_labels = labels is None or len(set(labels)) < 2
+    silhouette_skip = pairwise_skip or ("butuh > 1 cluster" if few_labels else None)
+    recorder.run(n, "silhouette.score", lambda i: silhouette_score(X_scaled, labels), skip=silhouette_skip)
+    recorder.run(n, "silhouette.samples", lambda i: silhouette_samples(X_scaled, labels), skip=silhouette_skip)
+
+    clustered = total.assign(cluster=labels if labels is not None else np.zeros(len(total), dtype=int))
+    categorized = recorder.run(n, "categorize", lambda i: engine.categorize_clusters(clustered.copy())[0])
+    recorder.run(n, "pca", lambda i: PCA(n_components=2).fit_transform(X_scaled))
+
+    if categorized is None:
+        # Kategorisasi gagal: peta tetap diukur dengan nomor cluster sebagai kategori
+        categorized = clustered.assign(kategori=clustered["cluster"].astype(str))
+    if store is not None:
+        static_dir = os.path.join(work_dir, f"static_{n}")
+        geometry_url = recorder.run(n, "map.geometry_export", lambda i: maps.export_geometry(store, static_dir), repeat=1)
+        if geometry_url is not None:
+            path = os.path.join(static_dir, geometry_url.split("/")[-1].split("?")[0])
+            recorder.results[-1]["geometry_mb"] = round(os.path.getsize(path) / 1024 / 1024, 2)
+        cluster_map = recorder.run(
+            n, "map.build",
+            lambda i: maps.build_cluster_map(categorized, store, index, "K-Medoids", geometry_url=geometry_url)
+        )
+        if cluster_map is not None:
+            html = recorder.run(n, "map.render", lambda i: cluster_map.get_root().render())
+            if html is not None:
+                recorder.results[-1]["html_mb"] = round(len(html.encode()) / 1024 / 1024, 2)
+
+    # Jalur DATA.py: validasi nama + tulis hanya baris yang berubah (10% per ulangan)
+    valid_codes = backend.valid_codes(UPLOAD_YEAR)
+    changed = max(1, int(n * CHANGED_FRACTION))
+
+    def upload(i):
+        df = frames[UPLOAD_YEAR].copy()
+        df.loc[: changed - 1, "jumlah_lansia"] = df.loc[: changed - 1, "jumlah_lansia"] + i + 1
+        validation = ingest.validate(df, valid_codes, index)
+        return backend.apply_upload({UPLOAD_YEAR: df}, {UPLOAD_YEAR: valid_codes}), validation
+
+    recorder.run(n, "upload", upload, changed_rows=changed)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, repeat, max_pairwise_rows, max_vertices, log=print):
+    meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+        "max_pairwise_rows": max_pairwise_rows,
+        "max_vertices": max_vertices,
+    }
+    source = synthetic.load_source()
+    recorder = Recorder(repeat, log)
+    with tempfile.TemporaryDirectory(prefix="bench-") as work_dir:
+        for n in sizes:
+            log(f"{n} baris")
+            bench_size(n, source, work_dir, recorder, max_pairwise_rows, max_vertices)
+    return {"meta": meta, "results": recorder.results}
+
+
+def compare(old_path, new_path):
+    """Tabel median lama vs baru per (rows, stage)"""
+    with open(old_path, encoding="utf-8") as file:
+        old = {(r["rows"], r["stage"]): r for r in json.load(file)["results"]}
+    with open(new_path, encoding="utf-8") as file:
+        new = json.load(file)["results"]
+    print(f"{'rows':>7}  {'stage':<20} {'lama ms':>10} {'baru ms':>10} {'rasio':>7}")
+    for record in new:
+        before = old.get((record["rows"], record["stage"]))
+        if not before or before["status"] != "ok" or record["status"] != "ok":
+            status = f"{before['status'] if before else '-'} -> {record['status']}"
+            print(f"{record['rows']:>7}  {record['stage']:<20} {status:>29}")
+            continue
+        ratio = record["median"] / before["median"] if before["median"] else float("inf")
+        print(
+            f"{record['rows']:>7}  {record['stage']:<20} "
+            f"{before['median'] * 1000:10.1f} {record['median'] * 1000:10.1f} {ratio:7.2f}"
+        )
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["compare"]:
+        parser = argparse.ArgumentParser(description="Bandingkan dua hasil benchmark")
+        parser.add_argument("old")
+        parser.add_argument("new")
+        args = parser.parse_args(argv[1:])
+        compare(args.old, args.new)
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmark per tahap dengan dataset sintetis")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(synthetic.DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-pairwise-rows", type=int, default=DEFAULT_MAX_PAIRWISE_ROWS)
+    parser.add_argument("--max-vertices", type=int, default=synthetic.DEFAULT_MAX_VERTICES)
+    parser.add_argument("--out", help=f"file JSON (default: {DEFAULT_OUT_DIR}/bench-<waktu>.json)")
+    args = parser.parse_args(argv)
+
+    report = run(args.rows, args.repeat, args.max_pairwise_rows, args.max_vertices)
+    out = args.out or os.path.join(DEFAULT_OUT_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Hasil: {out}")
+
+
+if __name__ == "__main__":
+    main()
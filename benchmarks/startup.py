@@ -0,0 +1,164 @@
+"""
+Waktu cold start per halaman: setiap halaman dijalankan sekali di interpreter
+Python baru (AppTest, python -X importtime), seperti sesi pertama setelah
+container bangun dari nol. Streamlit sendiri di-import sebelum pengukuran,
+sama seperti server yang sudah berjalan sebelum sesi pertama masuk.
+
+Per halaman dilaporkan (median dari --repeat proses):
+    first_run_s   rerun pertama halaman: import modul halaman + render
+    import_s      total waktu import modul baru selama rerun pertama
+    modules       jumlah modul baru yang di-load
+    heavy         paket berat yang ter-load (sklearn, matplotlib, folium, ...)
+    top           import top-level terlama (importtime kumulatif)
+
+Halaman login (BERANDA belum login) diberi batas --login-budget detik; exit
+code 1 jika terlampaui sehingga bisa dipakai di CI.
+Cache OS (file .pyc di page cache) tidak dibersihkan; container yang benar-benar
+dingin bisa sedikit lebih lambat.
+
+Contoh:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --repeat 5 --out startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.run import DEFAULT_OUT_DIR, git_revision
+
+# (nama, script, session_state)
+PAGES = [
+    ("login", "BERANDA.py", {}),
+    ("beranda", "BERANDA.py", {"logged_in": True, "user_type": "guest", "username": "Guest"}),
+    ("clustering", "pages/CLUSTERING.py", {"logged_in": True, "user_type": "guest", "username": "Guest"}),
+    ("data", "pages/DATA.py", {"logged_in": True, "user_type": "admin", "username": "admin"}),
+    ("faq", "pages/FAQ.py", {"logged_in": True, "user_type": "guest", "username": "Guest"}),
+    ("tentang", "pages/TENTANG.py", {"logged_in": True, "user_type": "guest", "username": "Guest"}),
+]
+HEAVY_PACKAGES = (
+    "sklearn", "sklearn_extra", "scipy", "matplotlib", "folium", "PIL",
+    "pandas", "pyarrow", "sqlalchemy", "psycopg2", "openpyxl",
+)
+DEFAULT_LOGIN_BUDGET = 1.0
+MARKER = "#startup-page-run"
+
+CHILD = f"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+script, state = sys.argv[1], json.loads(sys.argv[2])
+at = AppTest.from_file(script, default_timeout=120)
+for key, value in state.items():
+    at.session_state[key] = value
+before = set(sys.modules)
+sys.stderr.write({MARKER!r} + "\\n")
+sys.stderr.flush()
+start = time.perf_counter()
+at.run()
+seconds = time.perf_counter() - start
+new = sorted(set(sys.modules) - before)
+print(json.dumps({{
+    "seconds": seconds,
+    "modules": new,
+    "exceptions": [e.value for e in at.exception],
+}}))
+"""
+
+
+def parse_importtime(stderr):
+    """[(paket top-level, detik kumulatif)] dari output -X importtime setelah MARKER"""
+    lines = stderr.splitlines()
+    if MARKER in lines:
+        lines = lines[lines.index(MARKER) + 1:]
+    imports = []
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line.split("|")
+        name = parts[2]
+        cumulative = parts[1].strip()
+        # Import top-level: satu spasi sebelum nama (modul anak diberi indentasi)
+        if not cumulative.isdigit() or name.startswith("  "):
+            continue
+        imports.append((name.strip(), int(cumulative) / 1e6))
+    return imports
+
+
+def measure_page(script, state):
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, script, json.dumps(state)],
+        capture_output=True, text=True, check=True,
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(completed.stderr)
+    loaded = {name.split(".")[0] for name in result["modules"]}
+    return {
+        "first_run_s": result["seconds"],
+        "import_s": sum(seconds for _, seconds in imports),
+        "modules": len(result["modules"]),
+        "heavy": [name for name in HEAVY_PACKAGES if name in loaded],
+        "top": sorted(imports, key=lambda item: item[1], reverse=True)[:5],
+        "exceptions": result["exceptions"],
+    }
+
+
+def run(repeat, log=print):
+    results = []
+    for name, script, state in PAGES:
+        runs = [measure_page(script, state) for _ in range(repeat)]
+        record = {
+            "page": name,
+            "script": script,
+            "first_run_s": round(statistics.median(r["first_run_s"] for r in runs), 3),
+            "import_s": round(statistics.median(r["import_s"] for r in runs), 3),
+            "modules": runs[-1]["modules"],
+            "heavy": runs[-1]["heavy"],
+            "top": [(module, round(seconds, 3)) for module, seconds in runs[-1]["top"]],
+            "exceptions": runs[-1]["exceptions"],
+        }
+        results.append(record)
+        log(
+            f"  {name:<11} first run {record['first_run_s']:6.2f}s  import {record['import_s']:6.2f}s  "
+            f"{record['modules']:5d} modul  berat: {', '.join(record['heavy']) or '-'}"
+        )
+        if record["exceptions"]:
+            log(f"    exception: {record['exceptions'][0][:200]}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ukur waktu cold start (import + render pertama) per halaman")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--login-budget", type=float, default=DEFAULT_LOGIN_BUDGET,
+                        help="batas detik rerun pertama halaman login")
+    parser.add_argument("--out", help=f"file JSON (default: {DEFAULT_OUT_DIR}/startup-<waktu>.json)")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git": git_revision(),
+            "python": sys.version.split()[0],
+            "repeat": args.repeat,
+            "login_budget_s": args.login_budget,
+        },
+        "results": results,
+    }
+    out = args.out or os.path.join(DEFAULT_OUT_DIR, f"startup-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Hasil: {out}")
+
+    login = next(record for record in results if record["page"] == "login")
+    if login["first_run_s"] > args.login_budget:
+        print(f"Halaman login {login['first_run_s']:.2f}s melebihi batas {args.login_budget:.2f}s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
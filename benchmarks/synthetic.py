@@ -0,0 +1,186 @@
+"""
+Data sintetis untuk benchmark: N "kecamatan" dengan distribusi fitur yang sama
+dengan workbook bawaan (Dataset dengan demografi) dan geometri grid yang
+batasnya saling berimpit seperti KECAMATAN.geojson.
+
+- Baris diambil ulang (bootstrap) utuh dari tahun yang sama di data asli, jadi
+  korelasi antar kolom dan porsi nol (mis. tahun 2025 yang hampir semuanya 0)
+  tetap sama. Nilai bukan nol diberi jitter log-normal kecil agar tidak ada
+  baris yang identik persis.
+- Geometri: grid persegi di atas bbox Jakarta; setiap sisi punya titik
+  bergerigi yang sama untuk kedua kecamatan yang berbagi sisi tersebut.
+  Jumlah titik per kecamatan mengikuti data asli, dibatasi max_vertices total.
+
+Contoh:
+    python -m benchmarks.synthetic --rows 3000 --out /tmp/sintetis
+"""
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from core import ingest, seed, upload
+
+BBOX = (106.68, -6.37, 106.98, -6.08)  # lon_min, lat_min, lon_max, lat_max
+REAL_VERTICES_PER_FEATURE = 1840       # KECAMATAN.geojson: 81.067 titik / 44 kecamatan
+DEFAULT_MAX_VERTICES = 2_000_000
+DEFAULT_SIZES = (44, 267, 3000, 100000)
+
+
+def load_source(data_dir=seed.DATA_DIR):
+    """{tahun: DataFrame kolom angka} dari workbook bawaan"""
+    source = {}
+    for tahun, path in sorted(seed.find_workbooks(data_dir).items()):
+        with open(path, "rb") as file:
+            for year, df in ingest.read_upload(file, tahun).items():
+                source[year] = upload.prepare_values(df)
+    return source
+
+
+def codes(n):
+    return [f"99.{i // 10000:02d}.{i % 10000:04d}" for i in range(n)]
+
+
+def names(n):
+    return [f"KECAMATAN SINTETIS {i:06d}" for i in range(n)]
+
+
+def generate_year(source_df, n, rng, jitter=0.1):
+    """n baris fitur dengan distribusi source_df (bootstrap baris + jitter bukan nol)"""
+    rows = source_df.iloc[rng.integers(0, len(source_df), n)].reset_index(drop=True)
+    for col in upload.INT_COLUMNS + upload.FLOAT_COLUMNS:
+        values = rows[col].astype(float)
+        noise = rng.lognormal(0.0, jitter, n)
+        values = values.where(values == 0, values * noise)
+        if col in upload.INT_COLUMNS:
+            rows[col] = values.round().astype("Int64")
+        else:
+            rows[col] = values.round(2)
+    return rows
+
+
+def generate_frames(source, n, seed_value=0):
+    """
+    {tahun: DataFrame kecamatan + kolom angka} untuk n kecamatan sintetis.
+    Demografi (jumlah_jiwa, disabilitas, lansia) per kecamatan dibuat sekali
+    lalu dipakai di semua tahun, seperti di data asli.
+    """
+    rng = np.random.default_rng(seed_value)
+    kecamatan = names(n)
+    demographics = ["jumlah_jiwa", "jumlah_disabilitas", "jumlah_lansia"]
+    base_year = max(source)
+    demo = generate_year(source[base_year], n, rng)[demographics]
+    frames = {}
+    for tahun, source_df in sorted(source.items()):
+        df = generate_year(source_df, n, rng)
+        df[demographics] = demo.values
+        df.insert(0, "kecamatan", kecamatan)
+        frames[tahun] = df
+    return frames
+
+
+def _grid_shape(n):
+    width, height = BBOX[2] - BBOX[0], BBOX[3] - BBOX[1]
+    cols = max(1, math.ceil(math.sqrt(n * width / height)))
+    rows = math.ceil(n / cols)
+    return rows, cols
+
+
+def _edge_points(start, end, count, amplitude, rng):
+    """count titik di antara start dan end (tanpa ujung), digeser tegak lurus"""
+    if count <= 0:
+        return np.empty((0, 2))
+    t = np.linspace(0, 1, count + 2)[1:-1]
+    points = start + np.outer(t, end - start)
+    direction = end - start
+    normal = np.array([-direction[1], direction[0]]) / (np.hypot(*direction) or 1)
+    return points + np.outer(rng.uniform(-amplitude, amplitude, count), normal)
+
+
+def generate_geojson(n, max_vertices=DEFAULT_MAX_VERTICES, seed_value=0):
+    """
+    FeatureCollection n persegi bergerigi dengan properti kode_kec, kecamatan, kab_kota.
+    Titik di sisi bersama dihasilkan sekali sehingga batas tetangga berimpit.
+    """
+    rng = np.random.default_rng(seed_value)
+    rows, cols = _grid_shape(n)
+    per_feature = max(4, min(REAL_VERTICES_PER_FEATURE, max_vertices // max(n, 1)))
+    per_edge = max(0, per_feature // 4 - 1)
+
+    lon = np.linspace(BBOX[0], BBOX[2], cols + 1)
+    lat = np.linspace(BBOX[1], BBOX[3], rows + 1)
+    amplitude = 0.15 * min(lon[1] - lon[0], lat[1] - lat[0]) if n > 0 else 0
+
+    def node(r, c):
+        return np.array([lon[c], lat[r]])
+
+    horizontal, vertical = {}, {}
+
+    def h_edge(r, c):
+        if (r, c) not in horizontal:
+            jag = 0 if r in (0, rows) else amplitude
+            horizontal[r, c] = _edge_points(node(r, c), node(r, c + 1), per_edge, jag, rng)
+        return horizontal[r, c]
+
+    def v_edge(r, c):
+        if (r, c) not in vertical:
+            jag = 0 if c in (0, cols) else amplitude
+            vertical[r, c] = _edge_points(node(r, c), node(r + 1, c), per_edge, jag, rng)
+        return vertical[r, c]
+
+    features = []
+    kecamatan, kode = names(n), codes(n)
+    for i in range(n):
+        r, c = divmod(i, cols)
+        ring = np.vstack([
+            node(r, c), h_edge(r, c),
+            node(r, c + 1), v_edge(r, c + 1),
+            node(r + 1, c + 1), h_edge(r + 1, c)[::-1],
+            node(r + 1, c), v_edge(r, c)[::-1],
+            node(r, c),
+        ])
+        features.append({
+            "type": "Feature",
+            "properties": {"kode_kec": kode[i], "kecamatan": kecamatan[i], "kab_kota": f"KOTA SINTETIS {r % 5 + 1}"},
+            "geometry": {"type": "Polygon", "coordinates": [np.round(ring, 6).tolist()]},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def write_dataset(n, out_dir, source=None, max_vertices=DEFAULT_MAX_VERTICES, seed_value=0):
+    """
+    Tulis <out_dir>/kecamatan_<n>.geojson dan <out_dir>/data_<n>.parquet (kolom tahun).
+    Mengembalikan (path geojson, {tahun: DataFrame}).
+    """
+    source = source or load_source()
+    os.makedirs(out_dir, exist_ok=True)
+    geojson_path = os.path.join(out_dir, f"kecamatan_{n}.geojson")
+    with open(geojson_path, "w", encoding="utf-8") as file:
+        json.dump(generate_geojson(n, max_vertices, seed_value), file)
+
+    frames = generate_frames(source, n, seed_value)
+    pd.concat(
+        [df.assign(**{ingest.YEAR_COLUMN: tahun}) for tahun, df in frames.items()], ignore_index=True
+    ).to_parquet(os.path.join(out_dir, f"data_{n}.parquet"), index=False)
+    return geojson_path, frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Buat dataset + geometri sintetis untuk benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--out", default="benchmarks/data")
+    parser.add_argument("--max-vertices", type=int, default=DEFAULT_MAX_VERTICES)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    source = load_source()
+    for n in args.rows:
+        path, frames = write_dataset(n, args.out, source, args.max_vertices, args.seed)
+        print(f"{n} kecamatan x {len(frames)} tahun -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""
+Modul pendukung aplikasi clustering banjir (geometri, database, cache, dll).
+Modul di sini tidak bergantung pada halaman Streamlit sehingga bisa
+diimpor dari halaman mana pun maupun dari skrip baris perintah.
+"""
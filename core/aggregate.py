@@ -0,0 +1,61 @@
+"""
+Aturan "Total (Agregasi)", satu-satunya tempat aturan ini ditulis:
+SUM untuk jumlah_*, AVG untuk rata_ketinggian_air, MAX untuk ketinggian_air_max
+dari semua tahun per kode_kec, ditambah data demografi dari tahun terbaru
+(atau demographics_year di secrets.toml).
+
+Total dihitung di proses dari DataFrame per tahun (total_from_frames): halaman
+CLUSTERING memakai frame yang sudah ada di cache per tahun, backend memakai
+frame yang dibaca dari database (fetch("total")). Tidak ada tabel ringkasan
+yang perlu diperbarui saat upload.
+"""
+import pandas as pd
+
+from core import schema
+
+# Tabel ringkasan lama; dihapus oleh core.kecamatan install jika masih ada
+LEGACY_TOTAL_TABLE = "kejadian_total"
+
+def resolve_demographics_year(years, configured=None):
+    """
+    Tahun sumber kolom demografi: demographics_year di secrets.toml jika diisi,
+    selain itu tahun terbaru di katalog tahun (None jika belum ada tahun).
+    """
+    if configured:
+        return int(configured)
+    return max(years) if len(years) else None
+
+
+def total_from_frames(frames, demographics_year=None):
+    """
+    Total (Agregasi) dari {tahun: DataFrame}:
+    SUM / AVG / MAX per kode_kec (NULL diabaikan, hasil kosong menjadi 0)
+    ditambah kolom demografi dari tahun demographics_year (default: tahun
+    terbaru di frames, lihat resolve_demographics_year). Urut menurut kecamatan.
+    """
+    if demographics_year is None:
+        demographics_year = resolve_demographics_year(list(frames))
+    all_data = pd.concat(
+        [df[df["kode_kec"].notna()] for df in frames.values()], ignore_index=True
+    )
+    sums = ["jumlah_rw_terdampak", "jumlah_kk_terdampak", "jumlah_jiwa_terdampak"]
+    grouped = all_data.groupby("kode_kec", sort=False)
+    total = grouped.agg(
+        kecamatan=("kecamatan", "min"),
+        **{col: (col, "sum") for col in sums},
+        rata_ketinggian_air=("rata_ketinggian_air", "mean"),
+        ketinggian_air_max=("ketinggian_air_max", "max"),
+    )
+    value_columns = sums + ["rata_ketinggian_air", "ketinggian_air_max"]
+    total[value_columns] = total[value_columns].astype(float).fillna(0)
+
+    demographics = ["jumlah_jiwa", "jumlah_disabilitas", "jumlah_lansia"]
+    if demographics_year in frames:
+        demo = frames[demographics_year].drop_duplicates("kode_kec").set_index("kode_kec")[demographics]
+        total = total.join(demo, how="left")
+    else:
+        for col in demographics:
+            total[col] = None
+
+    total = total.reset_index()[[schema.KEY_COLUMN] + schema.DATA_COLUMNS]
+    return total.sort_values("kecamatan", kind="stable", ignore_index=True)
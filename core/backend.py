@@ -0,0 +1,363 @@
+"""
+Backend penyimpanan: satu API untuk semua akses data aplikasi.
+
+Dipilih dari URL di secrets.toml ([database] connection_string):
+- postgresql://...            -> PostgresBackend (tabel per tahun / partisi,
+                                 data_version + NOTIFY)
+- sqlite:///data/banjir.db    -> SQLiteBackend (satu file lokal tanpa server,
+                                 untuk pengembangan lokal, benchmark, dan
+                                 deployment lapangan tanpa koneksi jaringan)
+
+API yang dipakai halaman:
+    available_years(), get_version(scope), fetch(scope), check_login(u, p),
+    valid_codes(tahun), apply_upload(sheets, valid_codes), load_years(frames),
+    create_admin(u, p), supports_notify
+
+Database SQLite diisi dari workbook bawaan dengan:
+    python -m core.seed   (connection_string = "sqlite:///data/banjir.db")
+"""
+import os
+import threading
+
+from core import db, schema, versioning
+
+
+
+def _year_of(scope):
+    return int(scope.split("_")[1])
+
+
+def _fetch_total(backend):
+    """Total (Agregasi) dari data per tahun backend (aturan di core.aggregate)"""
+    from core import aggregate
+
+    frames = {
+        tahun: backend.fetch(versioning.scope_for("Per Tahun", tahun))
+        for tahun in backend.available_years()
+    }
+    year = aggregate.resolve_demographics_year(list(frames), db.load_config()["demographics_year"])
+    return aggregate.total_from_frames(frames, year)
+
+
+def _sqlite_rows(frame):
+    """Baris DataFrame sebagai tuple nilai Python (NA -> None) untuk executemany"""
+    values = frame.astype(object).where(frame.notna(), None)
+    return [
+        tuple(v.item() if hasattr(v, "item") else v for v in row)
+        for row in values.itertuples(index=False, name=None)
+    ]
+
+
+class PostgresBackend:
+    """Postgres lewat pool core.db; memakai modul schema / versioning / upload"""
+
+    name = "postgresql"
+    supports_notify = True
+
+    def available_years(self):
+        return schema.available_years()
+
+    def get_version(self, scope):
+        return versioning.get_version(scope)
+
+    def query_for(self, scope):
+        """Query data untuk scope "kejadian_<tahun>" """
+        columns = ", ".join([schema.KEY_COLUMN] + schema.DATA_COLUMNS)
+        # Tabel per tahun atau partisi tahun tersebut (partition pruning)
+        source_table, year_condition = schema.year_source(_year_of(scope))
+        return f"SELECT {columns} FROM {source_table} WHERE {year_condition} ORDER BY kecamatan ASC"
+
+    def fetch(self, scope):
+        if scope == versioning.TOTAL_SCOPE:
+            return _fetch_total(self)
+        return db.read_sql(self.query_for(scope))
+
+    def check_login(self, username, password):
+        query = "SELECT * FROM admin WHERE username = :username AND password = :password"
+        return len(db.read_sql(query, params={"username": username, "password": password})) > 0
+
+    def valid_codes(self, tahun):
+        source_table, year_condition = schema.year_source(tahun)
+        query = f"SELECT DISTINCT kode_kec FROM {source_table} WHERE {year_condition} AND kode_kec IS NOT NULL"
+        return set(db.read_sql(query)["kode_kec"])
+
+    def apply_upload(self, sheets, valid_codes):
+        """
+        Tulis semua tahun upload dalam satu transaksi (hanya baris yang berubah)
+        dan naikkan versi tahun yang berubah.
+        Mengembalikan {tahun: result upload.bulk_update}.
+        """
+        from core import upload
+
+        conn = db.raw_connection()
+        try:
+            cursor = conn.cursor()
+            results = {}
+            for tahun in sorted(sheets):
+                source_table, year_condition = schema.year_source(tahun)
+                results[tahun] = upload.bulk_update(
+                    cursor, source_table, year_condition, sheets[tahun], valid_codes[tahun]
+                )
+            for tahun, result in results.items():
+                if result["changed"]:
+                    versioning.bump(cursor, versioning.scope_for("Per Tahun", tahun))
+            conn.commit()
+            return results
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _load_year(self, cursor, tahun, frame):
+        from core import upload
+
+        table, condition = schema.ensure_year_storage(cursor, tahun)
+        columns = list(frame.columns)
+        upload.copy_stage(cursor, frame)
+        cursor.execute(f"DELETE FROM {table} WHERE {condition}")
+        if schema.storage_mode() == schema.PARTITIONED:
+            cursor.execute(
+                f"INSERT INTO {table} (tahun, {', '.join(columns)}) "
+                f"SELECT {int(tahun)}, {', '.join(columns)} FROM {upload.STAGE_TABLE}"
+            )
+        else:
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) SELECT {', '.join(columns)} FROM {upload.STAGE_TABLE}"
+            )
+        return cursor.rowcount
+
+    def load_years(self, frames, index, log=print):
+        """
+        Ganti seluruh isi tahun-tahun di frames (hasil core.seed.normalize) dalam
+        satu transaksi: COPY ke temp table lalu DELETE + INSERT ... SELECT, kemudian
+        pasang dimensi kecamatan, row_hash, dan data_version.
+        """
+        from core import kecamatan, upload
+
+        conn = db.raw_connection()
+        try:
+            cursor = conn.cursor()
+            for tahun, frame in sorted(frames.items()):
+                log(f"  {tahun}: {self._load_year(cursor, tahun, frame)} baris")
+            kecamatan.install(cursor, index)
+            upload.install(cursor)
+            versioning.install(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def create_admin(self, username, password):
+        with db.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE TABLE IF NOT EXISTS admin (username TEXT PRIMARY KEY, password TEXT NOT NULL)"
+            )
+            conn.exec_driver_sql("DELETE FROM admin WHERE username = %s", (username,))
+            conn.exec_driver_sql("INSERT INTO admin (username, password) VALUES (%s, %s)", (username, password))
+
+
+class SQLiteBackend:
+    """
+    Satu file SQLite: tabel kejadian (tahun, kode_kec) untuk semua tahun,
+    kecamatan_dim, data_version, dan admin. Total dihitung saat dibaca
+    dari data per tahun (core.aggregate.total_from_frames).
+    Versi dinaikkan oleh backend sendiri; tidak ada NOTIFY antar proses.
+    """
+
+    name = "sqlite"
+    supports_notify = False
+
+    SCHEMA_SQL = f"""
+    CREATE TABLE IF NOT EXISTS kecamatan_dim (
+        kode_kec TEXT PRIMARY KEY,
+        kecamatan TEXT NOT NULL,
+        nama_norm TEXT NOT NULL UNIQUE,
+        kab_kota TEXT
+    );
+    CREATE TABLE IF NOT EXISTS kejadian (
+        tahun INTEGER NOT NULL,
+        kode_kec TEXT NOT NULL REFERENCES kecamatan_dim (kode_kec),
+        kecamatan TEXT NOT NULL,
+        jumlah_rw_terdampak INTEGER,
+        jumlah_kk_terdampak INTEGER,
+        jumlah_jiwa_terdampak INTEGER,
+        rata_ketinggian_air REAL,
+        ketinggian_air_max REAL,
+        jumlah_jiwa INTEGER,
+        jumlah_disabilitas INTEGER,
+        jumlah_lansia INTEGER,
+        {schema.HASH_COLUMN} INTEGER,
+        PRIMARY KEY (tahun, kode_kec)
+    );
+    CREATE TABLE IF NOT EXISTS data_version (
+        scope TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 1,
+        updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS admin (
+        username TEXT PRIMARY KEY,
+        password TEXT NOT NULL
+    );
+    """
+
+    def __init__(self, url):
+        self.path = url.database
+        self._schema_ready = False
+
+    def _connect(self):
+        """Koneksi DBAPI (sqlite3); tabel dibuat saat pertama kali dipakai"""
+        if not self._schema_ready:
+            if self.path and os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = db.raw_connection()
+            try:
+                conn.driver_connection.executescript(self.SCHEMA_SQL)
+                conn.commit()
+            finally:
+                conn.close()
+            self._schema_ready = True
+        return db.raw_connection()
+
+    def _read(self, query, params=None):
+        if not self._schema_ready:
+            self._connect().close()
+        return db.read_sql(query, params=params)
+
+    def _fetch_all(self, query, params=None):
+        if not self._schema_ready:
+            self._connect().close()
+        return db.fetch_all(query, params)
+
+    def available_years(self):
+        return [int(tahun) for (tahun,) in self._fetch_all("SELECT DISTINCT tahun FROM kejadian ORDER BY tahun")]
+
+    def get_version(self, scope):
+        rows = self._fetch_all("SELECT version FROM data_version WHERE scope = :scope", {"scope": scope})
+        return int(rows[0][0]) if rows else 0
+
+    def fetch(self, scope):
+        columns = ", ".join([schema.KEY_COLUMN] + schema.DATA_COLUMNS)
+        if scope != versioning.TOTAL_SCOPE:
+            return self._read(
+                f"SELECT {columns} FROM kejadian WHERE tahun = :tahun ORDER BY kecamatan ASC",
+                {"tahun": _year_of(scope)},
+            )
+        return _fetch_total(self)
+
+    def check_login(self, username, password):
+        query = "SELECT * FROM admin WHERE username = :username AND password = :password"
+        return len(self._read(query, {"username": username, "password": password})) > 0
+
+    def valid_codes(self, tahun):
+        result = self._read("SELECT DISTINCT kode_kec FROM kejadian WHERE tahun = :tahun", {"tahun": int(tahun)})
+        return set(result["kode_kec"])
+
+    def _bump(self, cursor, scope):
+        cursor.executemany(
+            """
+            INSERT INTO data_version (scope, version, updated_at) VALUES (?, 1, CURRENT_TIMESTAMP)
+            ON CONFLICT (scope) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+            """,
+            [(scope,), (versioning.TOTAL_SCOPE,)],
+        )
+
+    def apply_upload(self, sheets, valid_codes):
+        """Seperti PostgresBackend.apply_upload: satu transaksi, hanya baris yang berubah"""
+        from core import upload
+
+        columns = upload.VALUE_COLUMNS + [upload.HASH_COLUMN]
+        assignments = ", ".join(f"{col} = ?" for col in columns)
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            results = {}
+            for tahun in sorted(sheets):
+                def stored_hashes(kode_list, tahun=tahun):
+                    cursor.execute(
+                        f"SELECT kode_kec, {upload.HASH_COLUMN} FROM kejadian WHERE tahun = ?", (int(tahun),)
+                    )
+                    wanted = set(kode_list)
+                    return {kode: h for kode, h in cursor.fetchall() if kode in wanted}
+
+                changed, results[tahun] = upload.diff_upload(sheets[tahun], valid_codes[tahun], stored_hashes)
+                if len(changed):
+                    cursor.executemany(
+                        f"UPDATE kejadian SET {assignments} WHERE tahun = ? AND kode_kec = ?",
+                        [
+                            (*values, int(tahun), kode)
+                            for values, kode in zip(_sqlite_rows(changed[columns]), changed["kode_kec"])
+                        ],
+                    )
+                    self._bump(cursor, versioning.scope_for("Per Tahun", tahun))
+            conn.commit()
+            return results
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def load_years(self, frames, index, log=print):
+        """Ganti seluruh isi tahun-tahun di frames dan isi kecamatan_dim, dalam satu transaksi"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.executemany(
+                """
+                INSERT INTO kecamatan_dim (kode_kec, kecamatan, nama_norm, kab_kota) VALUES (?, ?, ?, ?)
+                ON CONFLICT (kode_kec) DO UPDATE SET kecamatan = excluded.kecamatan,
+                    nama_norm = excluded.nama_norm, kab_kota = excluded.kab_kota
+                """,
+                index.rows(),
+            )
+            for tahun, frame in sorted(frames.items()):
+                columns = ["tahun"] + list(frame.columns)
+                placeholders = ", ".join("?" for _ in columns)
+                rows = [(int(tahun), *values) for values in _sqlite_rows(frame)]
+                cursor.execute("DELETE FROM kejadian WHERE tahun = ?", (int(tahun),))
+                cursor.executemany(
+                    f"INSERT INTO kejadian ({', '.join(columns)}) VALUES ({placeholders})", rows
+                )
+                self._bump(cursor, versioning.scope_for("Per Tahun", tahun))
+                log(f"  {tahun}: {len(rows)} baris")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def create_admin(self, username, password):
+        conn = self._connect()
+        try:
+            conn.cursor().execute(
+                "INSERT INTO admin (username, password) VALUES (?, ?) "
+                "ON CONFLICT (username) DO UPDATE SET password = excluded.password",
+                (username, password),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+_backend = None
+_backend_url = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Backend tunggal per proses sesuai URL database di secrets.toml (lihat db.configure)"""
+    global _backend, _backend_url
+    url = db.load_config()["url"]
+    if _backend is None or _backend_url != url:
+        with _backend_lock:
+            if _backend is None or _backend_url != url:
+                if url.get_backend_name() == "sqlite":
+                    _backend = SQLiteBackend(url)
+                else:
+                    _backend = PostgresBackend()
+                _backend_url = url
+    return _backend
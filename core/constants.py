@@ -0,0 +1,17 @@
+"""
+Pilihan tipe data dan metode clustering (tanpa dependensi).
+
+Dipakai halaman CLUSTERING saat halaman dimuat dan oleh core.invalidation /
+core.engine, sehingga membaca pilihan ini tidak ikut memuat numpy, pandas,
+atau SQLAlchemy.
+"""
+
+# Tipe data (juga key cache halaman CLUSTERING, lihat core.invalidation)
+PER_TAHUN = "Per Tahun"
+TOTAL = "Total (Agregasi)"
+
+KMEDOIDS = "K-Medoids"
+DBSCAN_METHOD = "DBSCAN"
+# Tahun yang tidak bisa di-cluster dengan K-Medoids (banyak kecamatan bernilai 0
+# sehingga data identik setelah normalisasi); halaman CLUSTERING memakai DBSCAN
+KMEDOIDS_EXCLUDED_YEARS = frozenset({2025})
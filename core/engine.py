@@ -0,0 +1,291 @@
+"""
+Mesin clustering tanpa Streamlit: normalisasi, K-Medoids / DBSCAN, silhouette,
+kategorisasi cluster, dan koordinat PCA 2D.
+
+Halaman CLUSTERING hanya membaca data lalu memanggil run(); hasil yang sama
+bisa dihitung dari skrip atau terjadwal (misalnya hitung ulang setiap malam):
+
+    python -m core.engine --tahun 2019 2020 total --metode K-Medoids DBSCAN
+    python -m core.engine --tahun all --metode K-Medoids --k 4 --out hasil_clustering
+
+Per kombinasi tahun/metode ditulis <out>/<nama>.csv (data + cluster, kategori,
+koordinat PCA) dan <out>/<nama>.json (parameter, skor, kategori, rata-rata
+cluster, medoid).
+"""
+import argparse
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from core.constants import DBSCAN_METHOD, KMEDOIDS, PER_TAHUN, TOTAL
+
+FEATURE_COLUMNS = [
+    "jumlah_rw_terdampak", "jumlah_kk_terdampak", "jumlah_jiwa_terdampak",
+    "rata_ketinggian_air", "ketinggian_air_max",
+]
+NOISE_LABEL = "Noise/Outlier bernilai ekstrim"
+
+# ===== LABEL CLUSTER =====
+CLUSTER_LABELS = {
+    2: ['Tingkat Kerawanan Rendah', 'Tingkat Kerawanan Tinggi'],
+    3: ['Tingkat Kerawanan Rendah', 'Tingkat Kerawanan Sedang', 'Tingkat Kerawanan Tinggi'],
+    4: ['Tingkat Kerawanan Sangat Rendah', 'Tingkat Kerawanan Rendah', 'Tingkat Kerawanan Sedang', 'Tingkat Kerawanan Tinggi'],
+    5: ['STingkat Kerawanan sangat Rendah', 'Tingkat Kerawanan Rendah', 'Tingkat Kerawanan Sedang', 'Tingkat Kerawanan Tinggi', 'Tingkat Kerawanan Sangat Tinggi'],
+    6: ['Tingkat Kerawanan Sangat Rendah', 'Tingkat Kerawanan Rendah', 'Tingkat Kerawanan Cukup Rendah', 'Tingkat Kerawanan Sedang', 'Tingkat Kerawanan Tinggi', 'Tingkat Kerawanan Sangat Tinggi'],
+    7: ['Tingkat Kerawanan Sangat Rendah', 'Tingkat Kerawanan Rendah', 'Tingkat Kerawanan Cukup Rendah', 'Tingkat Kerawanan Sedang', 'Tingkat Kerawanan Cukup Tinggi', 'Tingkat Kerawanan Tinggi', 'Tingkat Kerawanan Sangat Tinggi'],
+}
+
+
+def get_cluster_labels(n_clusters):
+    """Dapatkan label sesuai jumlah cluster"""
+    if n_clusters in CLUSTER_LABELS:
+        return CLUSTER_LABELS[n_clusters]
+    else:
+        return [f'Cluster {i}' for i in range(n_clusters)]
+
+
+def categorize_clusters(df):
+    """
+    Kategorisasi cluster berdasarkan tingkat keparahan banjir
+    dari Rendah ke Tinggi berdasarkan rata-rata fitur per cluster.
+    Mengembalikan (df dengan kolom kategori, cluster_means, {cluster: kategori}).
+    """
+    available_cols = [col for col in FEATURE_COLUMNS if col in df.columns]
+
+    cluster_means = df.groupby('cluster')[available_cols].mean()
+    cluster_means['skor_agregat'] = cluster_means.mean(axis=1)
+    cluster_means = cluster_means.sort_values(by='skor_agregat').reset_index()
+
+    clusters_without_noise = cluster_means[cluster_means['cluster'] != -1]
+    n_clusters = len(clusters_without_noise)
+    labels = get_cluster_labels(n_clusters)
+
+    cluster_label_map = {}
+    for i, row in clusters_without_noise.iterrows():
+        cluster_label_map[row['cluster']] = labels[i]
+
+    if -1 in df['cluster'].values:
+        cluster_label_map[-1] = NOISE_LABEL
+
+    df['kategori'] = df['cluster'].map(cluster_label_map)
+
+    return df, cluster_means, {int(c): label for c, label in cluster_label_map.items()}
+
+
+# ===== REQUEST / RESULT =====
+
+@dataclass
+class ClusteringRequest:
+    """Parameter satu kali clustering (nilai default sama dengan halaman CLUSTERING)"""
+    metode: str = KMEDOIDS
+    tipe_data: str = PER_TAHUN
+    tahun: Optional[int] = None
+    k: int = 3
+    max_iter: int = 300
+    random_state: int = 42
+    epsilon: float = 0.05
+    min_pts: int = 5
+    metric: str = "euclidean"
+
+    @property
+    def name(self):
+        """Nama singkat untuk file hasil, mis. "2019_k-medoids_k3" """
+        data = str(self.tahun) if self.tipe_data == PER_TAHUN else "total"
+        if self.metode == KMEDOIDS:
+            return f"{data}_k-medoids_k{self.k}"
+        return f"{data}_dbscan_eps{self.epsilon:g}_minpts{self.min_pts}"
+
+
+@dataclass
+class ClusteringResult:
+    request: ClusteringRequest
+    df: pd.DataFrame                      # data + kolom cluster dan kategori
+    labels: np.ndarray
+    X_scaled: np.ndarray
+    n_clusters: int
+    n_noise: int
+    score: Optional[float]                # None jika silhouette tidak bisa dihitung
+    score_error: Optional[str]            # alasan score None
+    category_map: dict
+    cluster_means: pd.DataFrame
+    pca_coords: np.ndarray
+    pca_explained_variance: np.ndarray
+    medoids: Optional[np.ndarray] = None  # koordinat ter-normalisasi (K-Medoids)
+    medoid_indices: Optional[np.ndarray] = None
+    pca_medoids: Optional[np.ndarray] = None
+    timings: dict = field(default_factory=dict)
+
+    def summary(self):
+        """Ringkasan yang bisa di-serialize ke JSON"""
+        return {
+            "request": asdict(self.request),
+            "n_rows": len(self.df),
+            "n_clusters": self.n_clusters,
+            "n_noise": self.n_noise,
+            "score": self.score,
+            "score_error": self.score_error,
+            "category_map": {str(c): label for c, label in self.category_map.items()},
+            "cluster_means": self.cluster_means.to_dict(orient="records"),
+            "medoids": None if self.medoids is None else self.medoids.tolist(),
+            "medoid_kecamatan": (
+                None if self.medoid_indices is None
+                else self.df["kecamatan"].iloc[self.medoid_indices].tolist()
+            ),
+            "pca_explained_variance": self.pca_explained_variance.tolist(),
+            "timings": self.timings,
+        }
+
+
+# ===== PIPELINE =====
+
+def run(request, df):
+    """
+    Jalankan clustering pada df (kolom FEATURE_COLUMNS, satu baris per kecamatan).
+    df tidak diubah. DBSCAN yang tidak membentuk cluster tetap menghasilkan
+    result dengan n_clusters 0 (semua noise); pemanggil yang memutuskan tampilannya.
+    """
+    # scikit-learn dimuat saat clustering pertama, bukan saat modul di-import halaman
+    from sklearn.cluster import DBSCAN
+    from sklearn.decomposition import PCA
+    from sklearn.metrics import silhouette_score
+    from sklearn.preprocessing import MinMaxScaler
+    from sklearn_extra.cluster import KMedoids
+
+    timings = {}
+    df = df.copy()
+
+    start = time.perf_counter()
+    X_scaled = MinMaxScaler().fit_transform(df[FEATURE_COLUMNS])
+    timings["scale"] = time.perf_counter() - start
+
+    medoids = medoid_indices = None
+    start = time.perf_counter()
+    if request.metode == KMEDOIDS:
+        model = KMedoids(
+            n_clusters=request.k,
+            random_state=int(request.random_state),
+            max_iter=int(request.max_iter),
+            metric="euclidean",
+        )
+        labels = model.fit_predict(X_scaled)
+        medoids = model.cluster_centers_
+        medoid_indices = model.medoid_indices_
+    elif request.metode == DBSCAN_METHOD:
+        model = DBSCAN(eps=request.epsilon, min_samples=int(request.min_pts), metric=request.metric)
+        labels = model.fit_predict(X_scaled)
+    else:
+        raise ValueError(f"metode tidak dikenal: {request.metode!r}")
+    timings["fit"] = time.perf_counter() - start
+    df["cluster"] = labels
+
+    n_clusters = len(set(labels) - {-1})
+    n_noise = int((labels == -1).sum())
+
+    start = time.perf_counter()
+    score = score_error = None
+    # Noise DBSCAN tidak ikut dihitung; K-Medoids tidak punya noise
+    mask = labels != -1
+    if n_clusters < 2:
+        score_error = "butuh > 1 cluster"
+    else:
+        try:
+            score = float(silhouette_score(X_scaled[mask], labels[mask]))
+        except ValueError as e:
+            score_error = str(e)
+    timings["silhouette"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df, cluster_means, category_map = categorize_clusters(df)
+    timings["categorize"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pca = PCA(n_components=2)
+    pca_coords = pca.fit_transform(X_scaled)
+    pca_medoids = pca.transform(medoids) if medoids is not None else None
+    timings["pca"] = time.perf_counter() - start
+
+    return ClusteringResult(
+        request=request,
+        df=df,
+        labels=labels,
+        X_scaled=X_scaled,
+        n_clusters=n_clusters,
+        n_noise=n_noise,
+        score=score,
+        score_error=score_error,
+        category_map=category_map,
+        cluster_means=cluster_means,
+        pca_coords=pca_coords,
+        pca_explained_variance=pca.explained_variance_ratio_,
+        medoids=medoids,
+        medoid_indices=medoid_indices,
+        pca_medoids=pca_medoids,
+        timings=timings,
+    )
+
+
+# ===== DATA & OUTPUT (CLI) =====
+
+def load_frame(tipe_data, tahun=None):
+    """Data untuk request langsung dari backend (tanpa cache halaman)"""
+    from core import versioning
+    from core.backend import get_backend
+
+    return get_backend().fetch(versioning.scope_for(tipe_data, tahun))
+
+
+def save(result, out_dir):
+    """Tulis <out_dir>/<nama>.csv dan .json; mengembalikan path csv"""
+    os.makedirs(out_dir, exist_ok=True)
+    base = os.path.join(out_dir, result.request.name)
+    df = result.df.copy()
+    df["pca_1"] = result.pca_coords[:, 0]
+    df["pca_2"] = result.pca_coords[:, 1]
+    df.to_csv(f"{base}.csv", index=False)
+    with open(f"{base}.json", "w", encoding="utf-8") as file:
+        json.dump(result.summary(), file, indent=2, ensure_ascii=False, default=float)
+    return f"{base}.csv"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Jalankan clustering tanpa Streamlit dan simpan hasilnya")
+    parser.add_argument("--tahun", nargs="+", default=["all"],
+                        help='tahun, "total", atau "all" (semua tahun + total)')
+    parser.add_argument("--metode", nargs="+", default=[KMEDOIDS], choices=[KMEDOIDS, DBSCAN_METHOD])
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--epsilon", type=float, default=0.05)
+    parser.add_argument("--min-pts", type=int, default=5)
+    parser.add_argument("--out", default="hasil_clustering")
+    args = parser.parse_args(argv)
+
+    targets = []
+    for tahun in args.tahun:
+        if tahun == "all":
+            from core.backend import get_backend
+
+            targets += [(PER_TAHUN, t) for t in get_backend().available_years()] + [(TOTAL, None)]
+        elif tahun == "total":
+            targets.append((TOTAL, None))
+        else:
+            targets.append((PER_TAHUN, int(tahun)))
+
+    for tipe_data, tahun in targets:
+        df = load_frame(tipe_data, tahun)
+        for metode in args.metode:
+            request = ClusteringRequest(
+                metode=metode, tipe_data=tipe_data, tahun=tahun,
+                k=args.k, epsilon=args.epsilon, min_pts=args.min_pts,
+            )
+            result = run(request, df)
+            path = save(result, args.out)
+            score = f"{result.score:.3f}" if result.score is not None else f"N/A ({result.score_error})"
+            print(f"{request.name}: {result.n_clusters} cluster, {result.n_noise} noise, silhouette {score} -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Cache gambar grafik (PNG) hasil matplotlib, bersama per proses.
+
+Grafik halaman CLUSTERING (silhouette, distribusi, PCA) digambar sekali per
+hasil clustering lalu disimpan sebagai byte PNG dengan key (identitas hasil,
+jenis grafik). Rerun berikutnya dan sesi lain dengan hasil yang sama memakai
+PNG dari cache tanpa matplotlib. Figure langsung ditutup (plt.close) setelah
+di-render sehingga tidak menumpuk di proses server yang berumur panjang.
+
+Batas LRU (opsional, di [database] secrets.toml, lihat core.db):
+    figure_cache_entries = 64, figure_cache_mb = 32
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+from core import db, metrics
+from core.memory import register_shared
+
+# Sama dengan st.pyplot: PNG tajam di layar high-DPI, tepi dipotong rapat
+SAVEFIG_OPTIONS = {"format": "png", "bbox_inches": "tight", "dpi": 200}
+# Lebar maksimum st.image; gambar yang lebih lebar di-resize Streamlit di setiap
+# rerun, jadi diperkecil sekali saja sebelum masuk cache
+MAX_WIDTH = 1460
+
+
+def result_key(clustering):
+    """
+    Identitas hasil clustering: parameter + label + data ter-normalisasi.
+    Hasil yang sama dari sesi lain (atau dihitung ulang) mendapat key yang sama.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(clustering.request).encode("utf-8"))
+    digest.update(clustering.labels.tobytes())
+    digest.update(clustering.X_scaled.tobytes())
+    digest.update(clustering.pca_coords.tobytes())
+    return digest.hexdigest()
+
+
+def render_png(fig):
+    """Byte PNG dari figure (lebar paling besar MAX_WIDTH), lalu figure ditutup"""
+    import matplotlib.pyplot as plt
+    from PIL import Image
+
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, **SAVEFIG_OPTIONS)
+    finally:
+        plt.close(fig)
+
+    image = Image.open(buffer)
+    if image.width <= MAX_WIDTH:
+        return buffer.getvalue()
+    height = int(image.height * MAX_WIDTH / image.width)
+    resized = io.BytesIO()
+    image.resize((MAX_WIDTH, height), resample=Image.BILINEAR).save(resized, format="PNG")
+    return resized.getvalue()
+
+
+class FigureCache:
+    """LRU byte (PNG grafik, juga HTML peta di core.maps) per key, dibatasi jumlah entri dan total byte"""
+
+    def __init__(self, max_entries, max_bytes, name="figures"):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            png = self._entries.get(key)
+            if png is not None:
+                self._entries.move_to_end(key)
+            return png
+
+    def put(self, key, png):
+        if len(png) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = png
+            self._bytes += len(png)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                metrics.inc("floof_cache_evictions_total", cache=self.name)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """FigureCache bersama per proses (batas dari konfigurasi)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = db.load_config()
+                _cache = register_shared("grafik (PNG)", FigureCache(
+                    int(config["figure_cache_entries"]),
+                    int(float(config["figure_cache_mb"]) * 1024 ** 2),
+                ))
+    return _cache
+
+
+def cached_png(key, kind, build):
+    """
+    PNG untuk (key, kind): dari cache, atau build() -> figure matplotlib yang
+    di-render dan disimpan. build() boleh mengembalikan None (tidak ada grafik).
+    """
+    cache = get_cache()
+    png = cache.get((key, kind))
+    if png is not None:
+        metrics.cache_result("figures", "hit")
+        return png
+    metrics.cache_result("figures", "miss")
+    fig = build()
+    if fig is None:
+        return None
+    png = render_png(fig)
+    cache.put((key, kind), png)
+    return png
@@ -0,0 +1,358 @@
+"""
+Penyimpanan geometri ringkas untuk batas wilayah (KECAMATAN.geojson).
+
+GeoJSON asli menyimpan setiap titik dengan 9+ digit desimal ditambah
+koordinat z=0 yang tidak terpakai, dan harus di-parse ulang dengan json.load.
+Modul ini mengubahnya sekali menjadi file .npz berisi:
+- koordinat terkuantisasi int32 (1e-6 derajat, sekitar 0.1 m),
+- offset feature -> part -> ring -> titik untuk merekonstruksi MultiPolygon,
+- versi tersimplifikasi per level zoom (batas bersama tetap berimpit),
+- tabel properti kecil (kode_kec, kecamatan, kab_kota).
+
+Build manual:
+    python -m core.geometry KECAMATAN.geojson
+"""
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+
+from core.memory import register_shared
+
+FORMAT_VERSION = 1
+SCALE = 10**6  # unit kuantisasi = 1e-6 derajat
+DEFAULT_ZOOM_LEVELS = (10, 12, 14)
+PROPERTY_FIELDS = ("kode_kec", "kecamatan", "kab_kota")
+FULL = "full"
+
+
+def zoom_tolerance(zoom):
+    """Toleransi simplifikasi (derajat) = setengah piksel pada level zoom"""
+    return 0.5 * 360.0 / (256 * 2 ** zoom)
+
+
+def store_path_for(geojson_path):
+    """Lokasi default file store untuk sebuah file GeoJSON"""
+    root, _ = os.path.splitext(geojson_path)
+    return root + ".geom.npz"
+
+
+# ===== PARSING & KUANTISASI =====
+
+def _iter_polygons(geometry):
+    if geometry is None:
+        return []
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    if geometry["type"] == "MultiPolygon":
+        return geometry["coordinates"]
+    raise ValueError(f"Tipe geometri tidak didukung: {geometry['type']}")
+
+
+def _quantize_ring(ring):
+    """Kuantisasi satu ring, buang z, titik duplikat berurutan, dan titik penutup"""
+    q = np.rint(np.asarray(ring, dtype=np.float64)[:, :2] * SCALE).astype(np.int32)
+    if len(q) > 1:
+        dup = np.all(q[1:] == q[:-1], axis=1)
+        q = q[np.concatenate([[True], ~dup])]
+    if len(q) > 1 and np.array_equal(q[0], q[-1]):
+        q = q[:-1]
+    return q
+
+
+# ===== SIMPLIFIKASI YANG MENJAGA TOPOLOGI =====
+
+def _douglas_peucker(points, tol):
+    """Mask titik yang dipertahankan oleh Douglas-Peucker (ujung selalu dipertahankan)"""
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    pts = points.astype(np.float64)
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end <= start + 1:
+            continue
+        a, b = pts[start], pts[end]
+        seg = pts[start + 1:end]
+        dx, dy = b - a
+        norm = np.hypot(dx, dy)
+        if norm == 0:
+            dist = np.hypot(seg[:, 0] - a[0], seg[:, 1] - a[1])
+        else:
+            dist = np.abs(dx * (seg[:, 1] - a[1]) - dy * (seg[:, 0] - a[0])) / norm
+        k = int(np.argmax(dist))
+        if dist[k] > tol:
+            mid = start + 1 + k
+            keep[mid] = True
+            stack.append((start, mid))
+            stack.append((mid, end))
+    return keep
+
+
+def _junction_masks(rings):
+    """
+    Tandai titik junction untuk setiap ring: titik di mana himpunan ring yang
+    memakai koordinat tersebut berubah, atau titik yang tetangganya berbeda
+    di ring lain. Titik ini menjadi ujung busur yang selalu dipertahankan
+    agar batas antar kecamatan tetap berimpit setelah simplifikasi.
+    """
+    lengths = [len(r) for r in rings]
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    all_coords = np.concatenate(rings)
+    ring_id = np.repeat(np.arange(len(rings)), lengths)
+    keys = (all_coords[:, 0].astype(np.int64) << 32) | (all_coords[:, 1].astype(np.int64) & 0xFFFFFFFF)
+    _, inverse = np.unique(keys, return_inverse=True)
+    n_points = inverse.max() + 1
+
+    # Id himpunan ring per titik unik
+    pairs = np.unique(np.stack([inverse, ring_id], axis=1), axis=0)
+    bounds = np.flatnonzero(np.diff(pairs[:, 0])) + 1
+    signature_ids = {}
+    point_signature = np.empty(n_points, dtype=np.int64)
+    for group in np.split(pairs, bounds):
+        ring_set = tuple(group[:, 1])
+        point_signature[group[0, 0]] = signature_ids.setdefault(ring_set, len(signature_ids))
+
+    # Pasangan tetangga (tanpa arah) per kemunculan titik
+    prev_uid = np.concatenate([np.roll(inverse[offsets[i]:offsets[i + 1]], 1) for i in range(len(rings))])
+    next_uid = np.concatenate([np.roll(inverse[offsets[i]:offsets[i + 1]], -1) for i in range(len(rings))])
+    neighbours = np.unique(
+        np.stack([inverse, np.minimum(prev_uid, next_uid), np.maximum(prev_uid, next_uid)], axis=1), axis=0
+    )
+    neighbour_variants = np.bincount(neighbours[:, 0], minlength=n_points)
+
+    masks = []
+    for i in range(len(rings)):
+        uid = inverse[offsets[i]:offsets[i + 1]]
+        sig = point_signature[uid]
+        masks.append(
+            (sig != np.roll(sig, 1)) | (sig != np.roll(sig, -1)) | (neighbour_variants[uid] > 1)
+        )
+    return masks
+
+
+def _simplify_ring(ring, junctions, tol):
+    n = len(ring)
+    if n <= 3 or tol <= 0:
+        return ring
+
+    fixed = np.flatnonzero(junctions)
+    if len(fixed) == 0:
+        fixed = np.array([0])
+    if len(fixed) == 1:
+        # Ring tanpa tetangga (pulau): tambahkan titik terjauh sebagai jangkar kedua
+        d = np.hypot(*(ring - ring[fixed[0]]).T.astype(np.float64))
+        fixed = np.unique(np.append(fixed, int(np.argmax(d))))
+
+    keep = np.zeros(n, dtype=bool)
+    keep[fixed] = True
+    for i, start in enumerate(fixed):
+        end = fixed[(i + 1) % len(fixed)]
+        idx = np.arange(start, end + 1) if end > start else np.concatenate([np.arange(start, n), np.arange(0, end + 1)])
+        arc = ring[idx]
+        # Arah busur dikanonikkan agar busur yang sama di dua ring disimplifikasi identik
+        reverse = tuple(arc[0]) > tuple(arc[-1])
+        arc_keep = _douglas_peucker(arc[::-1] if reverse else arc, tol)
+        keep[idx[arc_keep[::-1] if reverse else arc_keep]] = True
+
+    if keep.sum() < 3:
+        return ring
+    return ring[keep]
+
+
+# ===== BUILD =====
+
+def build_store(geojson_path, zoom_levels=DEFAULT_ZOOM_LEVELS):
+    """Baca GeoJSON dan kembalikan dict array siap disimpan ke .npz"""
+    with open(geojson_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    props = {field: [] for field in PROPERTY_FIELDS}
+    part_offsets = [0]
+    ring_offsets = [0]
+    rings = []
+    for feature in data["features"]:
+        properties = feature.get("properties") or {}
+        for field in PROPERTY_FIELDS:
+            props[field].append(str(properties.get(field) or ""))
+        for polygon in _iter_polygons(feature.get("geometry")):
+            for ring in polygon:
+                rings.append(_quantize_ring(ring))
+            ring_offsets.append(len(rings))
+        part_offsets.append(len(ring_offsets) - 1)
+
+    arrays = {field: np.array(values, dtype=str) for field, values in props.items()}
+    arrays["part_offsets"] = np.array(part_offsets, dtype=np.int32)
+    arrays["ring_offsets"] = np.array(ring_offsets, dtype=np.int32)
+
+    junctions = _junction_masks(rings)
+    levels = [(FULL, 0.0)] + [(f"z{z}", zoom_tolerance(z) * SCALE) for z in sorted(zoom_levels)]
+    for name, tol in levels:
+        simplified = [_simplify_ring(r, j, tol) for r, j in zip(rings, junctions)]
+        arrays[f"vertex_offsets_{name}"] = np.concatenate(
+            [[0], np.cumsum([len(r) for r in simplified])]
+        ).astype(np.int32)
+        arrays[f"coords_{name}"] = np.concatenate(simplified).astype(np.int32)
+
+    stat = os.stat(geojson_path)
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "scale": SCALE,
+        "levels": [name for name, _ in levels],
+        "source": os.path.basename(geojson_path),
+        "source_size": stat.st_size,
+        "source_mtime": int(stat.st_mtime),
+    }
+    arrays["meta"] = np.array(json.dumps(meta))
+    return arrays
+
+
+def save_store(arrays, store_path):
+    tmp_path = store_path + ".tmp.npz"
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, store_path)
+
+
+# ===== LOADER =====
+
+class GeometryStore:
+    """
+    Geometri wilayah dalam bentuk array numpy read-only.
+    Gunakan to_geojson() untuk mendapatkan FeatureCollection yang siap dipakai folium.
+    """
+
+    def __init__(self, arrays):
+        self._arrays = dict(arrays)
+        for array in self._arrays.values():
+            array.flags.writeable = False
+        self.meta = json.loads(str(self._arrays["meta"]))
+        self.levels = self.meta["levels"]
+        self.properties = {field: self._arrays[field] for field in PROPERTY_FIELDS}
+
+    def __len__(self):
+        return len(self._arrays["part_offsets"]) - 1
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self._arrays.values())
+
+    def vertex_count(self, level=FULL):
+        return len(self._arrays[f"coords_{level}"])
+
+    def level_for_zoom(self, zoom):
+        """Level tersimplifikasi paling kasar yang masih akurat untuk zoom tersebut"""
+        if zoom is None:
+            return FULL
+        candidates = sorted(int(name[1:]) for name in self.levels if name != FULL)
+        for z in candidates:
+            if z >= zoom:
+                return f"z{z}"
+        return FULL
+
+    def feature_coordinates(self, i, level=FULL):
+        """Koordinat MultiPolygon (list bersarang, derajat) untuk feature ke-i"""
+        part_offsets = self._arrays["part_offsets"]
+        ring_offsets = self._arrays["ring_offsets"]
+        vertex_offsets = self._arrays[f"vertex_offsets_{level}"]
+        coords = self._arrays[f"coords_{level}"]
+
+        polygons = []
+        for part in range(part_offsets[i], part_offsets[i + 1]):
+            polygon = []
+            for ring in range(ring_offsets[part], ring_offsets[part + 1]):
+                q = coords[vertex_offsets[ring]:vertex_offsets[ring + 1]]
+                closed = np.vstack([q, q[:1]]) / SCALE
+                polygon.append(np.round(closed, 6).tolist())
+            polygons.append(polygon)
+        return polygons
+
+    def to_geojson(self, zoom=None, level=None):
+        """
+        Bangun FeatureCollection baru (dict) dari store.
+        Dict selalu baru karena folium menulis style ke dalam properties.
+        """
+        level = level or self.level_for_zoom(zoom)
+        features = []
+        for i in range(len(self)):
+            features.append({
+                "type": "Feature",
+                "properties": {field: str(self.properties[field][i]) for field in PROPERTY_FIELDS},
+                "geometry": {"type": "MultiPolygon", "coordinates": self.feature_coordinates(i, level)},
+            })
+        return {"type": "FeatureCollection", "features": features}
+
+
+def _is_current(meta, geojson_path):
+    if meta.get("format_version") != FORMAT_VERSION:
+        return False
+    if not os.path.exists(geojson_path):
+        return True
+    stat = os.stat(geojson_path)
+    return meta.get("source_size") == stat.st_size and meta.get("source_mtime") == int(stat.st_mtime)
+
+
+def load_store(geojson_path, store_path=None, zoom_levels=DEFAULT_ZOOM_LEVELS):
+    """
+    Muat GeometryStore. File .npz dibangun ulang otomatis jika belum ada
+    atau sudah tidak sesuai dengan file GeoJSON sumber.
+    """
+    store_path = store_path or store_path_for(geojson_path)
+    if os.path.exists(store_path):
+        with np.load(store_path, allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+        if _is_current(json.loads(str(arrays["meta"])), geojson_path):
+            return GeometryStore(arrays)
+
+    arrays = build_store(geojson_path, zoom_levels)
+    try:
+        save_store(arrays, store_path)
+    except OSError:
+        # Filesystem read-only: tetap jalan dengan store di memori
+        pass
+    return GeometryStore(arrays)
+
+
+_shared_stores = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_store(geojson_path):
+    """
+    GeometryStore tunggal per proses untuk sebuah file GeoJSON.
+    Store bersifat immutable sehingga aman dipakai bersama oleh semua sesi;
+    sesi cukup menyimpan path-nya sebagai handle.
+    """
+    key = os.path.abspath(geojson_path)
+    store = _shared_stores.get(key)
+    if store is None:
+        with _shared_lock:
+            store = _shared_stores.get(key)
+            if store is None:
+                store = load_store(geojson_path)
+                _shared_stores[key] = register_shared(f"geometri:{os.path.basename(key)}", store)
+    return store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build store geometri ringkas dari file GeoJSON")
+    parser.add_argument("geojson", help="Path file GeoJSON sumber")
+    parser.add_argument("-o", "--output", help="Path file .npz (default: <geojson>.geom.npz)")
+    parser.add_argument("--zoom", type=int, nargs="*", default=list(DEFAULT_ZOOM_LEVELS),
+                        help="Level zoom untuk simplifikasi")
+    args = parser.parse_args(argv)
+
+    output = args.output or store_path_for(args.geojson)
+    arrays = build_store(args.geojson, args.zoom)
+    save_store(arrays, output)
+
+    store = GeometryStore(arrays)
+    print(f"{len(store)} feature -> {output} ({os.path.getsize(output) / 1024:.0f} KB)")
+    for level in store.levels:
+        print(f"  {level}: {store.vertex_count(level)} titik")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Membaca dan memvalidasi file upload DATA.py.
+
+- Excel dibaca dengan openpyxl mode read-only (streaming baris demi baris,
+  tanpa memuat seluruh workbook ke memori); CSV dan Parquet dibaca langsung.
+- Workbook boleh berisi satu sheet per tahun (nama sheet = tahun, mis. "2018"),
+  sehingga beberapa tahun bisa di-upload sekaligus. Workbook satu sheet
+  dengan nama lain memakai tahun yang dipilih di halaman.
+- CSV / Parquet boleh punya kolom `tahun` untuk beberapa tahun sekaligus.
+- Validasi kolom, tipe angka, dan nama kecamatan memakai operasi set / array.
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from core import kecamatan, schema
+
+EXPECTED_ROWS = 44
+REQUIRED_COLUMNS = list(schema.DATA_COLUMNS)
+NUMERIC_COLUMNS = [col for col in schema.DATA_COLUMNS if col != "kecamatan"]
+YEAR_COLUMN = "tahun"
+
+
+def _sheet_year(sheet_name):
+    match = re.fullmatch(r"\s*(\d{4})\s*", str(sheet_name))
+    return int(match.group(1)) if match else None
+
+
+def _read_sheet(ws):
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+    columns = [str(col).strip() if col is not None else f"kolom_{i}" for i, col in enumerate(header)]
+    # Baris kosong di akhir sheet (sering ada di Excel) diabaikan
+    data = [row for row in rows if any(value is not None for value in row)]
+    return pd.DataFrame.from_records(data, columns=columns)
+
+
+def _read_workbook(file, default_year):
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        sheets = {}
+        for ws in wb.worksheets:
+            tahun = _sheet_year(ws.title)
+            if tahun is None and len(wb.worksheets) == 1:
+                tahun = default_year
+            if tahun is None:
+                continue
+            sheets[tahun] = _read_sheet(ws)
+        return sheets
+    finally:
+        wb.close()
+
+
+def _split_years(df, default_year):
+    if YEAR_COLUMN not in df.columns:
+        return {default_year: df}
+    years = pd.to_numeric(df[YEAR_COLUMN], errors="coerce")
+    return {
+        int(tahun): part.drop(columns=YEAR_COLUMN).reset_index(drop=True)
+        for tahun, part in df.groupby(years.fillna(default_year).astype(int), sort=True)
+    }
+
+
+def read_upload(file, default_year):
+    """
+    Baca file upload menjadi {tahun: DataFrame}.
+    file adalah objek file (UploadedFile Streamlit) dengan atribut name.
+    """
+    ext = os.path.splitext(file.name)[1].lower()
+    if ext == ".csv":
+        return _split_years(pd.read_csv(file), default_year)
+    if ext == ".parquet":
+        return _split_years(pd.read_parquet(file), default_year)
+    if ext == ".xls":
+        # Format lama tidak didukung openpyxl
+        return {default_year: pd.read_excel(file)}
+    return _read_workbook(file, default_year)
+
+
+def validate(df, valid_codes, index=None):
+    """
+    Validasi satu tahun data upload terhadap kode_kec yang ada di database.
+
+    Menambahkan kolom kecamatan_normalized dan kode_kec ke df, lalu
+    mengembalikan dict berisi hasil validasi (semua daftar sudah terurut).
+    """
+    index = index or kecamatan.get_index()
+    result = {
+        "rows": len(df),
+        "row_count_ok": len(df) == EXPECTED_ROWS,
+        "missing_columns": [col for col in REQUIRED_COLUMNS if col not in df.columns],
+        "bad_values": {},
+        "invalid": [],
+        "missing": [],
+        "valid_names": [],
+    }
+    if result["missing_columns"]:
+        return result
+
+    # Nilai yang terisi tetapi bukan angka
+    for col in NUMERIC_COLUMNS:
+        filled = df[col].notna() & (df[col].astype(str).str.strip() != "")
+        bad = filled & pd.to_numeric(df[col], errors="coerce").isna()
+        if bad.any():
+            result["bad_values"][col] = int(bad.sum())
+
+    df["kecamatan_normalized"] = kecamatan.normalize_names(df["kecamatan"])
+    df["kode_kec"] = index.codes_for_names(df["kecamatan"])
+
+    valid_codes = np.asarray(sorted(valid_codes), dtype=object)
+    is_valid = df["kode_kec"].isin(valid_codes).to_numpy()
+    valid_names = np.array([kecamatan.normalize_name(index.name_for_code(kode)) for kode in valid_codes])
+    result["valid_names"] = sorted(valid_names.tolist())
+    result["is_valid"] = is_valid
+    result["invalid"] = sorted(df.loc[~is_valid, "kecamatan_normalized"].unique().tolist())
+    # Selisih himpunan: np.setdiff1d pada array object berjalan O(n*m)
+    result["missing"] = sorted(set(valid_names.tolist()) - set(df["kecamatan_normalized"]))
+    return result
+
+
+def is_ready(result):
+    """True jika data lolos validasi dan boleh ditulis ke database"""
+    return result["row_count_ok"] and not result["missing_columns"] and not result["invalid"]
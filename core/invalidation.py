@@ -0,0 +1,63 @@
+"""
+Bus invalidasi cache yang dipakai bersama oleh semua halaman.
+
+Halaman yang punya cache mendaftarkan handler(scope) lewat subscribe().
+Scope sama dengan scope di core.versioning: "kejadian_<tahun>", "total",
+atau "*" (semua). Handler hanya menghapus key cache milik scope tersebut,
+sehingga upload satu tahun tidak membuang cache tahun lain.
+
+publish() memanggil handler di proses ini secara langsung. Proses aplikasi
+lain menerima scope yang sama lewat NOTIFY data_version yang dikirim
+bump_data_version di transaksi upload (lihat core.versioning), sehingga
+tidak perlu meng-import halaman lain untuk membersihkan cache-nya.
+Backend tanpa NOTIFY (SQLite) mengandalkan TTL pengecekan versi untuk proses lain.
+"""
+import threading
+
+from core import versioning
+from core.backend import get_backend
+from core.constants import PER_TAHUN, TOTAL
+
+_handlers = {}
+_handlers_lock = threading.Lock()
+
+
+def affected_keys(scope):
+    """
+    Pasangan (tipe, tahun) di halaman CLUSTERING yang terpengaruh oleh scope.
+    None berarti semua key (scope "*").
+    """
+    if scope == versioning.ALL_SCOPES:
+        return None
+    keys = [(TOTAL, None)]
+    if scope.startswith("kejadian_"):
+        keys.append((PER_TAHUN, int(scope.split("_")[1])))
+    return keys
+
+
+def subscribe(name, handler):
+    """
+    Daftarkan handler(scope). Nama yang sama menimpa handler sebelumnya
+    (aman dipanggil setiap rerun halaman).
+    """
+    with _handlers_lock:
+        _handlers[name] = handler
+    if get_backend().supports_notify:
+        versioning.on_change("invalidation", dispatch)
+
+
+def dispatch(scope):
+    with _handlers_lock:
+        handlers = list(_handlers.values())
+    for handler in handlers:
+        try:
+            handler(scope)
+        except Exception:
+            # Satu handler yang gagal tidak boleh menghalangi handler lain
+            pass
+
+
+def publish(*scopes):
+    """Hapus cache untuk scope yang berubah di proses ini (proses lain lewat NOTIFY)"""
+    for scope in scopes:
+        dispatch(scope)
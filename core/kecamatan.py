@@ -0,0 +1,179 @@
+"""
+Dimensi kecamatan yang dikunci dengan kode_kec (mis. "31.73.07").
+
+- Tabel kecamatan_dim di database berisi kode, nama, nama ternormalisasi, dan kota.
+- Data tahunan menyimpan kolom kode_kec (foreign key + index), sehingga update
+  dan join memakai kode, bukan UPPER(TRIM(kecamatan)) yang tidak bisa memakai index.
+- KecamatanIndex adalah pemetaan kode <-> nama <-> index geometri di memori,
+  dibangun sekali per proses dari GeometryStore dan dipakai renderer peta.
+
+Instalasi / backfill (idempotent):
+    python -m core.kecamatan install
+"""
+import argparse
+import os
+import threading
+
+import numpy as np
+
+from core import db, schema
+from core.geometry import get_shared_store
+
+GEOJSON_PATH = "KECAMATAN.geojson"
+DIM_TABLE = "kecamatan_dim"
+
+CREATE_DIM_SQL = f"""
+CREATE TABLE IF NOT EXISTS {DIM_TABLE} (
+    kode_kec TEXT PRIMARY KEY,
+    kecamatan TEXT NOT NULL,
+    nama_norm TEXT NOT NULL UNIQUE,
+    kab_kota TEXT
+)
+"""
+
+
+def normalize_name(name):
+    """Nama kecamatan untuk pencocokan: spasi dirapikan dan huruf besar"""
+    return " ".join(str(name).split()).upper()
+
+
+def normalize_names(series):
+    """Versi vektor dari normalize_name untuk pandas Series"""
+    return series.astype(str).str.split().str.join(" ").str.upper()
+
+
+class KecamatanIndex:
+    """Pemetaan kode_kec <-> nama <-> index feature di GeometryStore"""
+
+    def __init__(self, store):
+        self.codes = np.asarray(store.properties["kode_kec"])
+        self.names = np.asarray(store.properties["kecamatan"])
+        self.cities = np.asarray(store.properties["kab_kota"])
+        self.normalized = np.array([normalize_name(n) for n in self.names])
+        self._by_code = {code: i for i, code in enumerate(self.codes)}
+        self._by_name = {name: i for i, name in enumerate(self.normalized)}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def geometry_index(self, kode_kec):
+        return self._by_code.get(kode_kec)
+
+    def code_for_name(self, name):
+        i = self._by_name.get(normalize_name(name))
+        return None if i is None else str(self.codes[i])
+
+    def codes_for_names(self, series):
+        """Series kode_kec untuk Series nama (None jika nama tidak dikenal)"""
+        code_map = dict(zip(self.normalized, self.codes))
+        return normalize_names(series).map(code_map)
+
+    def name_for_code(self, kode_kec):
+        i = self._by_code.get(kode_kec)
+        return None if i is None else str(self.names[i])
+
+    def rows(self):
+        """(kode_kec, kecamatan, nama_norm, kab_kota) untuk mengisi kecamatan_dim"""
+        return [
+            (str(code), str(name), str(norm), str(city))
+            for code, name, norm, city in zip(self.codes, self.names, self.normalized, self.cities)
+        ]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(geojson_path=GEOJSON_PATH):
+    """KecamatanIndex tunggal per proses (dibangun dari store geometri bersama)"""
+    key = os.path.abspath(geojson_path)
+    index = _indexes.get(key)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(key)
+            if index is None:
+                index = KecamatanIndex(get_shared_store(geojson_path))
+                _indexes[key] = index
+    return index
+
+
+# ===== INSTALASI =====
+
+def _add_code_column(cursor, table, index_columns):
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS kode_kec TEXT")
+    cursor.execute(
+        f"""
+        UPDATE {table} t SET kode_kec = d.kode_kec
+        FROM {DIM_TABLE} d
+        WHERE t.kode_kec IS DISTINCT FROM d.kode_kec
+          AND regexp_replace(UPPER(TRIM(t.kecamatan)), '\\s+', ' ', 'g') = d.nama_norm
+        """
+    )
+    cursor.execute("SELECT 1 FROM pg_constraint WHERE conname = %s", (f"fk_{table}_kode_kec",))
+    if cursor.fetchone() is None:
+        cursor.execute(
+            f"ALTER TABLE {table} ADD CONSTRAINT fk_{table}_kode_kec "
+            f"FOREIGN KEY (kode_kec) REFERENCES {DIM_TABLE} (kode_kec)"
+        )
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_kode_kec ON {table} ({', '.join(index_columns)})"
+    )
+
+
+def install(cursor, index=None):
+    """
+    Isi kecamatan_dim dari GeoJSON, tambahkan + backfill kolom kode_kec
+    di tabel tahunan / tabel partisi, lalu hapus tabel ringkasan Total lama.
+    """
+    from core import aggregate
+
+    index = index or get_index()
+    cursor.execute(CREATE_DIM_SQL)
+    for row in index.rows():
+        cursor.execute(
+            f"""
+            INSERT INTO {DIM_TABLE} (kode_kec, kecamatan, nama_norm, kab_kota)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (kode_kec) DO UPDATE
+                SET kecamatan = EXCLUDED.kecamatan, nama_norm = EXCLUDED.nama_norm, kab_kota = EXCLUDED.kab_kota
+            """,
+            row,
+        )
+
+    tables = []
+    cursor.execute(schema.YEAR_TABLES_SQL)
+    for (table,) in cursor.fetchall():
+        _add_code_column(cursor, table, ["kode_kec"])
+        tables.append(table)
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (schema.FACT_TABLE,))
+    if cursor.fetchone()[0]:
+        _add_code_column(cursor, schema.FACT_TABLE, ["tahun", "kode_kec"])
+        tables.append(schema.FACT_TABLE)
+
+    # Total dihitung dari data per tahun (core.aggregate); tabel ringkasan lama tidak dipakai lagi
+    cursor.execute(f"DROP TABLE IF EXISTS {aggregate.LEGACY_TOTAL_TABLE}")
+    return tables
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kelola dimensi kecamatan (kode_kec)")
+    parser.add_argument("command", choices=["install"])
+    parser.parse_args(argv)
+
+    conn = db.raw_connection()
+    try:
+        cursor = conn.cursor()
+        tables = install(cursor)
+        cursor.execute(f"SELECT COUNT(*) FROM {DIM_TABLE}")
+        count = cursor.fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    print(f"{DIM_TABLE}: {count} kecamatan, kode_kec terpasang di: {', '.join(tables)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Peta hasil clustering (folium) tanpa Streamlit, dipakai halaman CLUSTERING
+dan benchmark. Geometri diambil dari GeometryStore bersama (core.geometry)
+dan dicocokkan ke hasil clustering lewat KecamatanIndex (kode_kec).
+
+Geometri dikirim ke browser sekali sebagai file statis (export_geometry,
+disajikan Streamlit di /app/static dengan server.enableStaticServing) dan
+di-cache browser. HTML peta per hasil hanya berisi nomor cluster per feature;
+warna, tooltip dan highlight diterapkan di browser. HTML per hasil di-cache di
+server (cached_map_html). Tanpa geometry_url geometri ikut di-embed di HTML.
+"""
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from core import metrics
+from core.figures import FigureCache
+from core.memory import register_shared
+
+MAP_CENTER = [-6.2088, 106.8456]
+MAP_ZOOM_START = 11
+CLUSTER_COLORS = ['#e41a1c', '#377eb8', '#4daf4a', '#984ea3', '#ff7f00',
+                  '#ffff33', '#a65628', '#f781bf', '#999999', '#66c2a5']
+NOISE_COLOR = '#333333'
+
+STATIC_DIR = "static"
+STATIC_URL = "app/static"
+# Presisi koordinat file statis: 5 desimal (~1 m), jauh di bawah toleransi simplifikasi
+COORDINATE_DECIMALS = 5
+MAP_CACHE_ENTRIES = 32
+MAP_CACHE_BYTES = 8 * 1024 ** 2
+
+_exported = {}
+_export_lock = threading.Lock()
+_html_cache = register_shared("peta (HTML)", FigureCache(MAP_CACHE_ENTRIES, MAP_CACHE_BYTES, name="map_html"))
+
+
+def geometry_geojson(geometry_store, zoom_start=MAP_ZOOM_START):
+    """
+    FeatureCollection ringkas untuk browser: geometri tersimplifikasi yang tetap
+    akurat hingga 2 level zoom-in, hanya properti yang dipakai tooltip.
+    Urutan feature = index geometri (dipakai sebagai id di peta).
+    """
+    geojson_data = geometry_store.to_geojson(zoom=zoom_start + 2)
+    for feature in geojson_data['features']:
+        coordinates = feature['geometry']['coordinates']
+        feature['geometry']['coordinates'] = [
+            [np.round(ring, COORDINATE_DECIMALS).tolist() for ring in polygon] for polygon in coordinates
+        ]
+        properties = feature['properties']
+        feature['properties'] = {'kecamatan': properties['kecamatan'], 'kab_kota': properties['kab_kota']}
+    return geojson_data
+
+
+def export_geometry(geometry_store, static_dir=STATIC_DIR, zoom_start=MAP_ZOOM_START):
+    """
+    Tulis geometry_geojson ke <static_dir>/geometri-<hash>.json (sekali per proses
+    per store) dan kembalikan URL relatifnya. Nama file mengikuti isi sehingga
+    aman di-cache browser selamanya; ?v= membuat Streamlit (tornado) mengirim
+    header cache jangka panjang.
+    """
+    key = (id(geometry_store), os.path.abspath(static_dir), zoom_start)
+    url = _exported.get(key)
+    if url is not None:
+        return url
+    with _export_lock:
+        url = _exported.get(key)
+        if url is None:
+            payload = json.dumps(geometry_geojson(geometry_store, zoom_start), separators=(",", ":")).encode("utf-8")
+            digest = hashlib.blake2b(payload, digest_size=8).hexdigest()
+            filename = f"geometri-{digest}.json"
+            path = os.path.join(static_dir, filename)
+            if not os.path.exists(path):
+                os.makedirs(static_dir, exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "wb") as file:
+                    file.write(payload)
+                os.replace(tmp_path, path)
+            url = _exported[key] = f"{STATIC_URL}/{filename}?v={digest}"
+    return url
+
+
+# Dipanggil di browser dengan (peta leaflet, cluster per feature, warna, warna noise,
+# URL geometri atau FeatureCollection); id feature = urutan di FeatureCollection
+CLUSTER_LAYER_JS = """function(map, clusters, colors, noiseColor, source) {
+    function style(feature) {
+        var cluster = clusters[feature.id];
+        return {
+            fillColor: cluster === -1 ? noiseColor : colors[cluster % colors.length],
+            color: 'black',
+            weight: 1,
+            fillOpacity: 0.7
+        };
+    }
+    function escape(text) {
+        var div = document.createElement('div');
+        div.textContent = text;
+        return div.innerHTML;
+    }
+    function addLayer(data) {
+        data.features.forEach(function(feature, i) { feature.id = i; });
+        var layer = L.geoJson(data, {
+            style: style,
+            onEachFeature: function(feature, featureLayer) {
+                var html = '<b>Kecamatan:</b> ' + escape(feature.properties.kecamatan)
+                    + '<br><b>Kota:</b> ' + escape(feature.properties.kab_kota);
+                featureLayer.bindTooltip(html, {sticky: true});
+                featureLayer.bindPopup(html);
+                featureLayer.on({
+                    mouseover: function(e) {
+                        e.target.setStyle({fillColor: '#ffff00', color: 'black', weight: 3, fillOpacity: 0.9});
+                    },
+                    mouseout: function(e) { layer.resetStyle(e.target); }
+                });
+            }
+        }).addTo(map);
+    }
+    if (typeof source === 'string') {
+        fetch(source).then(function(response) { return response.json(); }).then(addLayer);
+    } else {
+        addLayer(source);
+    }
+}"""
+
+
+def add_cluster_layer(m, clusters, source):
+    """
+    Layer GeoJSON yang di-style di browser (dirender setelah script peta).
+    source: URL geometri (fetch, di-cache browser) atau FeatureCollection.
+    """
+    import folium
+    from jinja2 import Template
+
+    layer = folium.MacroElement()
+    layer._name = "ClusterLayer"
+    layer._template = Template("{% macro script(this, kwargs) %}{{ this.js }}{% endmacro %}")
+    layer.js = (
+        f"({CLUSTER_LAYER_JS})({m.get_name()}, {json.dumps(clusters)}, "
+        f"{json.dumps(CLUSTER_COLORS)}, {json.dumps(NOISE_COLOR)}, {json.dumps(source, separators=(',', ':'))});"
+    )
+    layer.add_to(m)
+    return layer
+
+
+def build_cluster_map(df, geometry_store, kecamatan_index, metode_name, zoom_start=MAP_ZOOM_START,
+                      geometry_url=None):
+    """
+    Peta folium dengan warna per cluster dan legenda kategori.
+    df berisi kolom kode_kec, cluster, dan kategori (hasil core.engine.run).
+    geometry_url: URL geometri dari export_geometry; None = geometri di-embed.
+    """
+    import folium
+
+    m = folium.Map(
+        location=MAP_CENTER,
+        zoom_start=zoom_start,
+        tiles='OpenStreetMap'
+    )
+
+    # Cluster dipetakan ke feature lewat index kode_kec -> index geometri (tanpa pencocokan string)
+    feature_cluster = np.full(len(geometry_store), -1)
+    for kode, cluster in zip(df['kode_kec'], df['cluster']):
+        i = kecamatan_index.geometry_index(kode)
+        if i is not None:
+            feature_cluster[i] = cluster
+
+    add_cluster_layer(m, feature_cluster.tolist(), geometry_url or geometry_geojson(geometry_store, zoom_start))
+
+    colors = CLUSTER_COLORS
+    legend_html = f'''
+    <div style="position: fixed;
+                bottom: 50px; right: 50px; width: 220px; height: auto;
+                background-color: white; z-index:9999; font-size:14px;
+                border:2px solid grey; border-radius: 5px; padding: 10px">
+        <p style="margin: 0; font-weight: bold;">{metode_name} Clusters</p>
+    '''
+
+    # Satu groupby untuk semua cluster: kategori dan jumlah kecamatan
+    legend = df.groupby('cluster')['kategori'].agg(['first', 'size'])
+    for cluster, (kategori, count) in legend.iterrows():
+        color = colors[cluster % len(colors)] if cluster >= 0 else NOISE_COLOR
+        legend_html += f'<p style="margin: 3px 0;"><i style="background:{color}; width: 18px; height: 18px; display: inline-block; margin-right: 5px;"></i>{kategori} ({count})</p>'
+
+    legend_html += '</div>'
+    m.get_root().html.add_child(folium.Element(legend_html))
+
+    return m
+
+
+def cached_map_html(key, build):
+    """
+    HTML lengkap peta untuk key (identitas hasil + URL geometri): dari cache,
+    atau build() -> peta folium yang di-render lalu disimpan.
+    """
+    cached = _html_cache.get(key)
+    if cached is not None:
+        metrics.cache_result("map_html", "hit")
+        return cached.decode("utf-8")
+    metrics.cache_result("map_html", "miss")
+    html = build().get_root().render()
+    _html_cache.put(key, html.encode("utf-8"))
+    return html
@@ -0,0 +1,118 @@
+"""
+Pelaporan pemakaian memori per sesi Streamlit dan per objek bersama (shared).
+
+Objek yang dipakai bersama oleh semua sesi (misalnya GeometryStore) didaftarkan
+lewat register_shared(); ukurannya dilaporkan sekali dan tidak dihitung ulang
+di setiap sesi yang hanya menyimpan referensi/handle ke objek tersebut.
+"""
+import sys
+import threading
+import weakref
+
+import numpy as np
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def register_shared(name, obj):
+    """Daftarkan objek bersama agar muncul di laporan memori"""
+    with _shared_lock:
+        _shared[name] = obj
+    return obj
+
+
+def _shared_ids():
+    return {id(obj) for obj in _shared.values()}
+
+
+def deep_sizeof(obj, exclude=None, _seen=None):
+    """
+    Perkiraan ukuran objek (byte) termasuk isinya.
+    Objek dengan id di `exclude` (objek bersama) tidak dihitung.
+    """
+    seen = _seen if _seen is not None else set()
+    exclude = exclude or set()
+    obj_id = id(obj)
+    if obj_id in seen or obj_id in exclude:
+        return 0
+    seen.add(obj_id)
+
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj) + (obj.nbytes if obj.base is None else 0)
+    if hasattr(obj, "memory_usage") and hasattr(obj, "columns"):
+        # pandas DataFrame
+        return int(obj.memory_usage(deep=True).sum())
+    if hasattr(obj, "memory_usage") and hasattr(obj, "dtype"):
+        # pandas Series
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return sys.getsizeof(obj)
+    if isinstance(obj, (weakref.ref, type)):
+        return 0
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_sizeof(key, exclude, seen) + deep_sizeof(value, exclude, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += deep_sizeof(item, exclude, seen)
+    elif hasattr(obj, "nbytes") and not callable(obj.nbytes):
+        size += int(obj.nbytes)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), exclude, seen)
+    return size
+
+
+def shared_report():
+    """List dict {objek, bytes} untuk setiap objek bersama terdaftar"""
+    with _shared_lock:
+        items = list(_shared.items())
+    return [{"objek": name, "bytes": deep_sizeof(obj)} for name, obj in items]
+
+
+def _active_sessions():
+    """
+    Sesi aktif dari session manager Streamlit. _session_mgr bukan API publik,
+    jadi setiap atribut diperiksa dengan getattr; None jika tidak tersedia.
+    """
+    try:
+        from streamlit.runtime import Runtime
+        runtime = Runtime.instance()
+    except Exception:
+        return None
+    session_mgr = getattr(runtime, "_session_mgr", None)
+    list_active = getattr(session_mgr, "list_active_sessions", None)
+    if list_active is None:
+        return None
+    return list_active()
+
+
+def session_report():
+    """
+    (list dict {sesi, jumlah_key, bytes, key_terbesar} untuk setiap sesi aktif, catatan).
+    Objek bersama dikecualikan sehingga angka = memori privat sesi.
+    Catatan berisi alasan jika daftar sesi tidak bisa dibaca dari versi
+    Streamlit ini (laporan kosong), selain itu None.
+    """
+    try:
+        sessions = _active_sessions()
+        if sessions is None:
+            return [], "Daftar sesi tidak tersedia di versi Streamlit ini"
+
+        exclude = _shared_ids()
+        report = []
+        for info in sessions:
+            state = info.session.session_state.filtered_state
+            sizes = {key: deep_sizeof(value, exclude) for key, value in state.items()}
+            largest = max(sizes, key=sizes.get) if sizes else None
+            report.append({
+                "sesi": info.session.id[:8],
+                "jumlah_key": len(sizes),
+                "bytes": sum(sizes.values()),
+                "key_terbesar": largest,
+            })
+    except Exception as e:
+        return [], f"Gagal membaca daftar sesi: {type(e).__name__}: {e}"
+    return report, None
@@ -0,0 +1,268 @@
+"""
+Metrik performa ringan per proses: durasi per tahap, counter cache, dan trace
+per rerun halaman. Tanpa dependensi tambahan dan tanpa fungsi st.*.
+
+- stage(nama) / observe(nama, detik): durasi masuk histogram
+  floof_stage_seconds{stage="..."} dan ke trace thread yang sedang aktif.
+- start_trace(halaman) / finish_trace(): satu trace per rerun halaman
+  (durasi total = page.<halaman>); 20 trace terakhir disimpan untuk panel admin.
+- cache_call(): hit / miss fungsi st.cache_data; fungsi ber-cache memanggil
+  cache_miss() di badannya. cache_result() untuk cache lain (SWR store).
+- render(): teks format Prometheus (exposition format 0.0.4).
+
+Ekspor (opsional, di [database] secrets.toml, lihat core.db):
+    metrics_textfile = "/var/lib/node_exporter/textfile/floof.prom"
+    metrics_port = 9464, metrics_host = "127.0.0.1"   (GET /metrics)
+File ditulis ulang (atomic) paling sering sekali per detik saat trace selesai.
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+MAX_TRACES = 20
+EXPORT_INTERVAL = 1.0
+
+STAGE_METRIC = "floof_stage_seconds"
+CACHE_METRIC = "floof_cache_requests_total"
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_traces = deque(maxlen=MAX_TRACES)
+_local = threading.local()
+
+_server = None
+_last_export = 0.0
+
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "sum", "max", "last")
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+
+
+# ===== PENCATATAN =====
+
+def observe(name, seconds):
+    """Catat durasi satu tahap (detik)"""
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = _Histogram()
+        histogram.add(seconds)
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace["stages"].append((name, seconds))
+
+
+def observe_timings(prefix, timings):
+    """Catat dict {tahap: detik} yang sudah diukur sendiri, mis. ClusteringResult.timings"""
+    for name, seconds in timings.items():
+        observe(f"{prefix}.{name}", seconds)
+
+
+@contextmanager
+def stage(name):
+    """with metrics.stage("data.load"): ...  (durasi tetap dicatat jika terjadi error)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def inc(name, amount=1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def cache_result(cache, result):
+    """result: "hit", "miss", atau "stale" (data lama dipakai, dibaca ulang di background)"""
+    inc(CACHE_METRIC, cache=cache, result=result)
+
+
+def cache_miss():
+    """Dipanggil di badan fungsi ber-cache: badan hanya berjalan saat cache miss"""
+    _local.cache_missed = True
+
+
+def cache_call(cache, func, *args, **kwargs):
+    """Panggil fungsi st.cache_data dan catat hit / miss"""
+    _local.cache_missed = False
+    result = func(*args, **kwargs)
+    cache_result(cache, "miss" if _local.cache_missed else "hit")
+    return result
+
+
+# ===== TRACE PER RERUN =====
+
+def start_trace(page):
+    """Mulai trace rerun halaman di thread ini (trace lama yang tidak selesai dibuang)"""
+    _local.trace = {"page": page, "started_at": time.time(), "start": time.perf_counter(), "stages": []}
+
+
+def finish_trace():
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        return
+    _local.trace = None
+    total = time.perf_counter() - trace.pop("start")
+    observe(f"page.{trace['page']}", total)
+    trace["total"] = total
+    with _lock:
+        _traces.append(trace)
+    export()
+
+
+def current_trace():
+    """Trace rerun yang sedang berjalan di thread ini (None jika tidak ada)"""
+    return getattr(_local, "trace", None)
+
+
+def recent_traces():
+    """Trace terbaru lebih dulu: dict {page, started_at, total, stages: [(tahap, detik)]}"""
+    with _lock:
+        return list(reversed(_traces))
+
+
+# ===== LAPORAN =====
+
+def stage_report():
+    """List dict {tahap, jumlah, rata_ms, maks_ms, terakhir_ms}, urut total waktu terbesar"""
+    with _lock:
+        items = [(name, h.count, h.sum, h.max, h.last) for name, h in _histograms.items()]
+    items.sort(key=lambda item: item[2], reverse=True)
+    return [
+        {
+            "tahap": name,
+            "jumlah": count,
+            "rata_ms": round(total / count * 1000, 1),
+            "maks_ms": round(maximum * 1000, 1),
+            "terakhir_ms": round(last * 1000, 1),
+        }
+        for name, count, total, maximum, last in items
+    ]
+
+
+def cache_report():
+    """List dict {cache, hit, miss, stale, hit_ratio} dari floof_cache_requests_total"""
+    caches = {}
+    with _lock:
+        for (name, labels), value in _counters.items():
+            if name != CACHE_METRIC:
+                continue
+            labels = dict(labels)
+            caches.setdefault(labels["cache"], {"hit": 0, "miss": 0, "stale": 0})[labels["result"]] += value
+    report = []
+    for cache, counts in sorted(caches.items()):
+        total = sum(counts.values())
+        report.append({"cache": cache, **counts, "hit_ratio": round(counts["hit"] / total, 3) if total else None})
+    return report
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(items):
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+def render():
+    """Semua metrik dalam format teks Prometheus"""
+    with _lock:
+        histograms = sorted((name, h.buckets[:], h.count, h.sum) for name, h in _histograms.items())
+        counters = sorted(_counters.items())
+
+    lines = [
+        f"# HELP {STAGE_METRIC} Durasi tahap halaman / pipeline dalam detik",
+        f"# TYPE {STAGE_METRIC} histogram",
+    ]
+    for name, buckets, count, total in histograms:
+        for bound, value in zip(BUCKETS, buckets):
+            lines.append(f"{STAGE_METRIC}_bucket{_labels([('stage', name), ('le', repr(bound))])} {value}")
+        lines.append(f"{STAGE_METRIC}_bucket{_labels([('stage', name), ('le', '+Inf')])} {count}")
+        lines.append(f"{STAGE_METRIC}_sum{_labels([('stage', name)])} {total:.6f}")
+        lines.append(f"{STAGE_METRIC}_count{_labels([('stage', name)])} {count}")
+
+    names = sorted({name for (name, _), _ in counters})
+    for metric in names:
+        lines.append(f"# TYPE {metric} counter")
+        for (name, labels), value in counters:
+            if name == metric:
+                lines.append(f"{metric}{_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# ===== EKSPOR =====
+
+def write_textfile(path):
+    """Tulis render() ke path secara atomic (untuk textfile collector node_exporter)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(render())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, host="127.0.0.1"):
+    """Endpoint GET /metrics di thread daemon (sekali per proses)"""
+    global _server
+    with _lock:
+        if _server is not None:
+            return _server
+        _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+    threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
+
+
+def export():
+    """Ekspor sesuai konfigurasi; kegagalan ekspor tidak mengganggu halaman"""
+    global _last_export
+    from core import db
+
+    try:
+        config = db.load_config()
+        if config["metrics_port"] and _server is None:
+            start_http_server(config["metrics_port"], config["metrics_host"])
+        now = time.monotonic()
+        if config["metrics_textfile"] and now - _last_export >= EXPORT_INTERVAL:
+            _last_export = now
+            write_textfile(config["metrics_textfile"])
+    except Exception:
+        pass
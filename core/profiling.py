@@ -0,0 +1,165 @@
+"""
+Profil on-demand untuk admin: satu rerun CLUSTERING / DATA diprofil dengan
+cProfile dan sampling stack sekaligus, tanpa perlu mereproduksi di lokal.
+
+- Admin menyalakan lewat tombol "Profil aksi berikutnya" di sidebar BERANDA
+  (session state) atau query parameter ?profile=1 di halaman CLUSTERING / DATA.
+- Rerun yang diprofil baru disimpan jika benar-benar menjalankan clustering
+  atau upload (tahap cluster.* / upload.* di core.metrics); rerun lain dibuang
+  dan profil tetap menunggu aksi berikutnya.
+- Hasil di <profile_dir>/<waktu>_<halaman>.*:
+    .prof        statistik cProfile (python -m pstats, snakeviz)
+    .collapsed   stack "a;b;c jumlah_sampel" (flamegraph.pl, speedscope, inferno)
+    .json        halaman, parameter, versi data, durasi dan rincian tahap
+- Hanya thread script halaman yang diprofil; pembacaan paralel di thread pool
+  terlihat sebagai waktu tunggu di thread tersebut.
+"""
+import cProfile
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from core import db, metrics
+
+ARM_KEY = "profile_next"
+QUERY_PARAM = "profile"
+SAMPLE_INTERVAL = 0.005
+MAX_SECONDS = 300
+ACTION_PREFIXES = ("cluster.", "upload.")
+EXTENSIONS = (".prof", ".collapsed", ".json")
+
+
+def profile_dir():
+    return db.load_config()["profile_dir"]
+
+
+def _frame_name(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}".replace(";", ":").replace(" ", "_")
+
+
+def collapse(frame):
+    """Stack dari frame sampai root dalam format collapsed (root lebih dulu)"""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler(threading.Thread):
+    """Ambil stack satu thread setiap interval detik sampai stop() atau thread selesai"""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self.stop_event = threading.Event()
+
+    def run(self):
+        deadline = time.monotonic() + MAX_SECONDS
+        while not self.stop_event.wait(self.interval) and time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                # Thread script sudah selesai (mis. st.stop sebelum finish)
+                break
+            self.counts[collapse(frame)] += 1
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+class Capture:
+    def __init__(self, page):
+        self.page = page
+        self.started_at = time.time()
+        self.clock_start = time.perf_counter()
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident())
+
+    def begin(self):
+        self.sampler.start()
+        self.profile.enable()
+
+    def end(self):
+        self.profile.disable()
+        self.sampler.stop()
+        return time.perf_counter() - self.clock_start
+
+
+def requested(session_state, query_params):
+    return bool(session_state.get(ARM_KEY)) or query_params.get(QUERY_PARAM) in ("1", "true")
+
+
+def start(page, user_type, session_state, query_params):
+    """Mulai profil rerun ini jika admin memintanya; None jika tidak"""
+    if user_type != "admin" or not requested(session_state, query_params):
+        return None
+    capture = Capture(page)
+    capture.begin()
+    return capture
+
+
+def finish(capture, session_state, params=None, data_version=None):
+    """
+    Hentikan profil dan simpan jika rerun ini menjalankan clustering / upload.
+    data_version boleh berupa callable (hanya dipanggil saat menyimpan).
+    Mengembalikan nama dasar file yang disimpan, atau None.
+    """
+    if capture is None:
+        return None
+    seconds = capture.end()
+    trace = metrics.current_trace()
+    stages = list(trace["stages"]) if trace else []
+    if not any(name.startswith(ACTION_PREFIXES) for name, _ in stages):
+        return None
+
+    if callable(data_version):
+        try:
+            data_version = data_version()
+        except Exception as e:
+            data_version = f"tidak diketahui ({e})"
+
+    name = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(capture.started_at))}_{capture.page}"
+    base = os.path.join(profile_dir(), name)
+    os.makedirs(profile_dir(), exist_ok=True)
+    capture.profile.dump_stats(f"{base}.prof")
+    with open(f"{base}.collapsed", "w", encoding="utf-8") as file:
+        for stack, count in capture.sampler.counts.most_common():
+            file.write(f"{stack} {count}\n")
+    with open(f"{base}.json", "w", encoding="utf-8") as file:
+        json.dump({
+            "page": capture.page,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(capture.started_at)),
+            "seconds": round(seconds, 3),
+            "user": session_state.get("username"),
+            "params": params,
+            "data_version": data_version,
+            "stages": [{"tahap": stage, "ms": round(value * 1000, 1)} for stage, value in stages],
+            "samples": sum(capture.sampler.counts.values()),
+            "sample_interval": capture.sampler.interval,
+        }, file, indent=2, ensure_ascii=False, default=str)
+
+    session_state[ARM_KEY] = False
+    return name
+
+
+def list_captures(limit=5):
+    """Capture terbaru lebih dulu: dict isi .json + name + files {ekstensi: path}"""
+    captures = []
+    for path in sorted(glob.glob(os.path.join(profile_dir(), "*.json")), reverse=True)[:limit]:
+        base = path[: -len(".json")]
+        try:
+            with open(path, encoding="utf-8") as file:
+                info = json.load(file)
+        except (OSError, ValueError):
+            continue
+        info["name"] = os.path.basename(base)
+        info["files"] = {ext: base + ext for ext in EXTENSIONS if os.path.exists(base + ext)}
+        captures.append(info)
+    return captures
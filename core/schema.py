@@ -0,0 +1,201 @@
+"""
+Lokasi data kejadian di database dan daftar tahun yang tersedia.
+
+Dua mode penyimpanan (opsi `storage` di [database] secrets.toml):
+- "per_year" (default): satu tabel per tahun, kejadian_2018 ... kejadian_2025.
+- "partitioned": satu tabel `kejadian` yang dipartisi LIST per kolom `tahun`.
+  Query satu tahun memakai WHERE tahun = <n> sehingga Postgres hanya membaca
+  partisi tahun tersebut (partition pruning), dan query lintas tahun cukup
+  satu scan tanpa UNION ALL.
+
+Di kedua mode daftar tahun dibaca dari katalog database, sehingga
+menambah tahun baru (mis. 2026) tidak memerlukan perubahan kode.
+
+Migrasi dari tabel per tahun ke tabel partisi (idempotent):
+    python -m core.schema partition
+lalu set `storage = "partitioned"` di secrets.toml.
+"""
+import argparse
+import re
+
+from core import db
+
+PER_YEAR = "per_year"
+PARTITIONED = "partitioned"
+
+FACT_TABLE = "kejadian"
+KEY_COLUMN = "kode_kec"
+# Hash isi kolom angka per baris (lihat core.upload)
+HASH_COLUMN = "row_hash"
+DATA_COLUMNS = [
+    "kecamatan", "jumlah_rw_terdampak", "jumlah_kk_terdampak", "jumlah_jiwa_terdampak",
+    "rata_ketinggian_air", "ketinggian_air_max", "jumlah_jiwa", "jumlah_disabilitas", "jumlah_lansia",
+]
+
+YEAR_TABLES_SQL = r"""
+SELECT tablename FROM pg_tables
+WHERE schemaname = current_schema() AND tablename ~ '^kejadian_[0-9]{4}$'
+ORDER BY tablename
+"""
+
+PARTITION_BOUNDS_SQL = f"""
+SELECT pg_get_expr(c.relpartbound, c.oid) AS bound
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = to_regclass('{FACT_TABLE}')
+"""
+
+DATA_COLUMNS_SQL = """
+    kode_kec TEXT,
+    kecamatan TEXT NOT NULL,
+    jumlah_rw_terdampak BIGINT,
+    jumlah_kk_terdampak BIGINT,
+    jumlah_jiwa_terdampak BIGINT,
+    rata_ketinggian_air DOUBLE PRECISION,
+    ketinggian_air_max DOUBLE PRECISION,
+    jumlah_jiwa BIGINT,
+    jumlah_disabilitas BIGINT,
+    jumlah_lansia BIGINT,
+    row_hash BIGINT"""
+
+CREATE_FACT_SQL = f"""
+CREATE TABLE IF NOT EXISTS {FACT_TABLE} (
+    tahun INTEGER NOT NULL,{DATA_COLUMNS_SQL}
+) PARTITION BY LIST (tahun);
+CREATE INDEX IF NOT EXISTS idx_{FACT_TABLE}_kode_kec ON {FACT_TABLE} (tahun, kode_kec);
+"""
+
+CREATE_YEAR_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {{table}} ({DATA_COLUMNS_SQL}
+);
+CREATE INDEX IF NOT EXISTS idx_{{table}}_kode_kec ON {{table}} (kode_kec);
+"""
+
+
+def storage_mode():
+    return db.load_config()["storage"]
+
+
+def year_source(tahun):
+    """
+    (tabel, kondisi WHERE) untuk data satu tahun.
+    Tahun disisipkan sebagai literal integer agar partition pruning terjadi saat planning.
+    """
+    tahun = int(tahun)
+    if storage_mode() == PARTITIONED:
+        return FACT_TABLE, f"tahun = {tahun}"
+    return f"kejadian_{tahun}", "TRUE"
+
+
+def partition_name(tahun):
+    return f"{FACT_TABLE}_y{int(tahun)}"
+
+
+def _years_from_rows(mode, rows):
+    if mode == PARTITIONED:
+        years = [int(y) for (bound,) in rows for y in re.findall(r"\d{4}", bound or "")]
+    else:
+        years = [int(name.rsplit("_", 1)[1]) for (name,) in rows]
+    return sorted(set(years))
+
+
+def available_years():
+    """Daftar tahun yang ada di database (dari katalog, bukan hardcode)"""
+    mode = storage_mode()
+    sql = PARTITION_BOUNDS_SQL if mode == PARTITIONED else YEAR_TABLES_SQL
+    return _years_from_rows(mode, db.fetch_all(sql))
+
+
+def available_years_cursor(cursor):
+    """Seperti available_years() tetapi lewat cursor DBAPI (ikut transaksi pemanggil)"""
+    mode = storage_mode()
+    cursor.execute(PARTITION_BOUNDS_SQL if mode == PARTITIONED else YEAR_TABLES_SQL)
+    return _years_from_rows(mode, cursor.fetchall())
+
+
+def partition_years_cursor(cursor):
+    """Tahun yang sudah punya partisi di tabel `kejadian` (apa pun mode penyimpanannya)"""
+    cursor.execute(PARTITION_BOUNDS_SQL)
+    return _years_from_rows(PARTITIONED, cursor.fetchall())
+
+
+def ensure_partition(cursor, tahun):
+    """Buat partisi untuk tahun baru jika belum ada (mode partitioned)"""
+    tahun = int(tahun)
+    cursor.execute(CREATE_FACT_SQL)
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(tahun)} "
+        f"PARTITION OF {FACT_TABLE} FOR VALUES IN ({tahun})"
+    )
+
+
+def ensure_year_storage(cursor, tahun):
+    """
+    Pastikan tempat data satu tahun ada (partisi atau tabel kejadian_YYYY),
+    termasuk kolom kode_kec / row_hash di tabel lama. Mengembalikan year_source(tahun).
+    """
+    tahun = int(tahun)
+    if storage_mode() == PARTITIONED:
+        ensure_partition(cursor, tahun)
+    else:
+        cursor.execute(CREATE_YEAR_TABLE_SQL.format(table=f"kejadian_{tahun}"))
+    table, condition = year_source(tahun)
+    cursor.execute(
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS kode_kec TEXT, "
+        f"ADD COLUMN IF NOT EXISTS row_hash BIGINT"
+    )
+    return table, condition
+
+
+def migrate_to_partitioned(cursor):
+    """
+    Salin semua tabel kejadian_YYYY ke tabel partisi `kejadian`.
+    Partisi yang sudah berisi tidak disalin ulang. Tabel lama tidak dihapus.
+    """
+    cursor.execute(YEAR_TABLES_SQL)
+    legacy_tables = [row[0] for row in cursor.fetchall()]
+    columns = ", ".join(DATA_COLUMNS)
+    migrated = []
+    for table in legacy_tables:
+        tahun = int(table.rsplit("_", 1)[1])
+        ensure_partition(cursor, tahun)
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {partition_name(tahun)})")
+        if cursor.fetchone()[0]:
+            continue
+        cursor.execute(
+            f"INSERT INTO {FACT_TABLE} (tahun, {columns}) SELECT {tahun}, {columns} FROM {table}"
+        )
+        migrated.append(table)
+    return migrated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kelola skema penyimpanan data kejadian")
+    parser.add_argument("command", choices=["partition", "years"])
+    args = parser.parse_args(argv)
+
+    if args.command == "years":
+        print(f"mode={storage_mode()} tahun={available_years()}")
+        return
+
+    from core import kecamatan, upload, versioning
+
+    conn = db.raw_connection()
+    try:
+        cursor = conn.cursor()
+        migrated = migrate_to_partitioned(cursor)
+        kecamatan.install(cursor)
+        upload.install(cursor)
+        versioning.install(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    print(f"Tabel {FACT_TABLE} siap, disalin dari: {', '.join(migrated) or '-'}")
+    print('Set storage = "partitioned" di [database] secrets.toml untuk memakainya.')
+
+
+if __name__ == "__main__":
+    main()
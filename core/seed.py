@@ -0,0 +1,116 @@
+"""
+Isi database dari workbook di "Dataset dengan demografi" tanpa lewat UI.
+
+- Semua workbook dibaca paralel dengan process pool (file lock Office
+  seperti ~$2018.xlsx dilewati). Tahun diambil dari nama sheet atau nama file.
+- Nama kecamatan dinormalisasi dan dipetakan ke kode_kec dari KECAMATAN.geojson;
+  nama yang tidak dikenal membatalkan proses.
+- Setiap tahun menggantikan isi tahun tersebut, semuanya dalam satu transaksi,
+  sehingga perintah ini aman dijalankan berulang kali. Di Postgres data di-COPY
+  ke temporary table lalu dimensi kecamatan, row_hash, dan data_version
+  dipasang / dihitung ulang; di SQLite semua tabel dibuat
+  otomatis (lihat core.backend).
+
+Contoh (database kosong atau yang sudah berisi):
+    python -m core.seed
+    python -m core.seed --data-dir "Dataset dengan demografi" --workers 4
+    python -m core.seed --admin admin   (buat / ganti password akun admin)
+"""
+import argparse
+import getpass
+import glob
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from core import ingest, kecamatan, upload
+from core.backend import get_backend
+
+DATA_DIR = "Dataset dengan demografi"
+
+
+def find_workbooks(data_dir=DATA_DIR):
+    """{tahun: path} untuk setiap workbook YYYY.xlsx (file lock ~$ dilewati)"""
+    workbooks = {}
+    for path in sorted(glob.glob(os.path.join(data_dir, "*.xlsx"))):
+        name = os.path.basename(path)
+        match = re.fullmatch(r"(\d{4})\.xlsx", name)
+        if name.startswith("~$") or not match:
+            continue
+        workbooks[int(match.group(1))] = path
+    return workbooks
+
+
+def _parse_workbook(job):
+    tahun, path = job
+    with open(path, "rb") as file:
+        return ingest.read_upload(file, tahun)
+
+
+def parse_all(workbooks, workers=None):
+    """Baca semua workbook paralel; hasil {tahun: DataFrame}"""
+    sheets = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for parsed in pool.map(_parse_workbook, sorted(workbooks.items())):
+            sheets.update(parsed)
+    return sheets
+
+
+def normalize(df, index):
+    """
+    DataFrame siap COPY: kode_kec, kecamatan (nama ternormalisasi), kolom angka, row_hash.
+    Melempar ValueError jika ada kolom yang hilang atau nama kecamatan tidak dikenal.
+    """
+    missing = [col for col in ingest.REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"kolom tidak lengkap: {missing}")
+    kode = index.codes_for_names(df["kecamatan"])
+    if kode.isna().any():
+        unknown = sorted(set(df.loc[kode.isna(), "kecamatan"].astype(str)))
+        raise ValueError(f"kecamatan tidak dikenal: {unknown}")
+
+    values = upload.prepare_values(df)
+    frame = values.copy()
+    frame.insert(0, "kecamatan", kecamatan.normalize_names(df["kecamatan"]).values)
+    frame.insert(0, "kode_kec", kode.values)
+    frame[upload.HASH_COLUMN] = upload.row_hashes(values)
+    return frame.drop_duplicates("kode_kec", keep="last")
+
+
+def seed(data_dir=DATA_DIR, workers=None, log=print):
+    workbooks = find_workbooks(data_dir)
+    if not workbooks:
+        raise SystemExit(f"Tidak ada workbook YYYY.xlsx di {data_dir!r}")
+
+    start = time.perf_counter()
+    sheets = parse_all(workbooks, workers)
+    log(f"Dibaca {len(sheets)} tahun dalam {time.perf_counter() - start:.2f}s")
+
+    index = kecamatan.get_index()
+    frames = {}
+    for tahun, df in sorted(sheets.items()):
+        try:
+            frames[tahun] = normalize(df, index)
+        except ValueError as e:
+            raise SystemExit(f"{workbooks.get(tahun, tahun)}: {e}")
+
+    backend = get_backend()
+    backend.load_years(frames, index, log)
+    log(f"Selesai dalam {time.perf_counter() - start:.2f}s (backend={backend.name})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Isi database dari workbook Dataset dengan demografi")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="jumlah proses (default: jumlah CPU)")
+    parser.add_argument("--admin", metavar="USERNAME", help="buat akun admin (password ditanyakan)")
+    args = parser.parse_args(argv)
+    seed(args.data_dir, args.workers)
+    if args.admin:
+        get_backend().create_admin(args.admin, getpass.getpass(f"Password untuk {args.admin}: "))
+        print(f"Akun admin {args.admin!r} disimpan")
+
+
+if __name__ == "__main__":
+    main()
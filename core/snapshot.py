@@ -0,0 +1,155 @@
+"""
+Snapshot lokal (Arrow IPC) dari data yang dibaca halaman CLUSTERING.
+
+Satu file per tahun: snapshots/kejadian_<tahun>.arrow. Total (Agregasi)
+dihitung halaman dari data per tahun, jadi tidak punya snapshot sendiri
+(export scope "total" tetap bisa dilakukan secara eksplisit). Versi data
+("<scope>:<versi>", sama dengan data_hash di CLUSTERING) disimpan di metadata
+schema Arrow, sehingga tidak ada manifest bersama yang bisa bentrok antar proses.
+
+File dibuka dengan memory map (tanpa membaca seluruh file ke memori).
+load_data memakai snapshot jika versinya sama dengan versi di database;
+jika database tidak dapat dihubungi, snapshot terakhir tetap dipakai,
+sehingga tamu read-only tetap bisa dilayani tanpa akses database.
+
+Snapshot diperbarui setelah upload di DATA.py dan setiap kali data dibaca
+ulang dari database. Export penuh:
+    python -m core.snapshot export
+"""
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+import pyarrow as pa
+
+from core import db
+from core.backend import get_backend
+
+DATA_HASH_KEY = b"data_hash"
+EXPORTED_AT_KEY = b"exported_at"
+
+
+def snapshot_dir():
+    return db.load_config()["snapshot_dir"]
+
+
+def path_for(scope):
+    return os.path.join(snapshot_dir(), f"{scope}.arrow")
+
+
+def all_scopes():
+    return [f"kejadian_{tahun}" for tahun in get_backend().available_years()]
+
+
+def fetch(scope):
+    """Baca data scope dari backend penyimpanan (lihat core.backend)"""
+    return get_backend().fetch(scope)
+
+
+def write(scope, df, data_hash):
+    """Tulis snapshot satu scope (atomic: file sementara lalu os.replace)"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        DATA_HASH_KEY: str(data_hash).encode(),
+        EXPORTED_AT_KEY: str(time.time()).encode(),
+    })
+    path = path_for(scope)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Nama sementara unik per penulis: sesi lain (thread di proses yang sama)
+    # bisa menulis scope yang sama pada saat bersamaan
+    fd, tmp_path = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix=".tmp", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def open_table(scope):
+    """
+    Tabel Arrow ter-memory-map untuk scope, atau None jika belum ada snapshot
+    atau file rusak / terpotong (dianggap miss; pemanggil membaca ulang dari
+    database dan menulis snapshot baru).
+    """
+    path = path_for(scope)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    except (OSError, pa.ArrowException):
+        return None
+
+
+def data_hash_of(table):
+    return (table.schema.metadata or {}).get(DATA_HASH_KEY, b"").decode() or None
+
+
+def read(scope, data_hash=None):
+    """
+    DataFrame dari snapshot jika versinya sama dengan data_hash.
+    data_hash=None (versi tidak diketahui) menerima snapshot versi apa pun.
+    """
+    table = open_table(scope)
+    if table is None:
+        return None
+    if data_hash is not None and data_hash_of(table) != data_hash:
+        return None
+    try:
+        return table.to_pandas()
+    except (OSError, pa.ArrowException):
+        return None
+
+
+def available_years():
+    """Tahun yang punya snapshot (dipakai saat database tidak dapat dihubungi)"""
+    years = []
+    for path in glob.glob(os.path.join(snapshot_dir(), "kejadian_*.arrow")):
+        suffix = os.path.basename(path)[len("kejadian_"):-len(".arrow")]
+        if suffix.isdigit():
+            years.append(int(suffix))
+    return sorted(years)
+
+
+def export(scopes=None):
+    """Export scope (default semua tahun) dari database ke snapshot"""
+    exported = []
+    for scope in scopes or all_scopes():
+        # Versi dibaca sebelum data: jika data berubah di tengah export,
+        # snapshot tercatat dengan versi lama dan dianggap usang
+        data_hash = f"{scope}:{get_backend().get_version(scope)}"
+        df = fetch(scope)
+        write(scope, df, data_hash)
+        exported.append((scope, len(df)))
+    return exported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kelola snapshot lokal data clustering")
+    parser.add_argument("command", choices=["export", "show"])
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        start = time.perf_counter()
+        for scope, rows in export():
+            print(f"{scope}: {rows} baris")
+        print(f"Snapshot di {snapshot_dir()!r} selesai dalam {time.perf_counter() - start:.2f}s")
+        return
+
+    for path in sorted(glob.glob(os.path.join(snapshot_dir(), "*.arrow"))):
+        scope = os.path.basename(path)[:-len(".arrow")]
+        table = open_table(scope)
+        if table is None:
+            print(f"{scope}: rusak (akan dibuat ulang saat dibaca berikutnya)")
+            continue
+        print(f"{scope}: {table.num_rows} baris, versi {data_hash_of(table)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Cache stale-while-revalidate untuk DataFrame hasil query (bersama per proses).
+
+Per key disimpan DataFrame terakhir yang berhasil dibaca beserta versinya:
+- versi sama            -> langsung dipakai (segar);
+- versi berbeda         -> data lama langsung dipakai, pembacaan ulang
+                           berjalan di background thread (satu per key);
+- versi tidak diketahui -> (database tidak bisa dihubungi) data lama dipakai
+                           tanpa mencoba database lagi.
+Hanya jika belum ada data sama sekali pembacaan dilakukan langsung; sesi lain
+yang meminta key yang sama pada saat itu menunggu hasil pembacaan yang sama
+(satu loader per key, tanpa stampede ke database saat cold start).
+Setiap hasil disertai status (stale, umur data, alasan) untuk ditampilkan di UI;
+cached=False menandai data yang baru saja dibaca langsung (cache miss).
+"""
+import threading
+import time
+from concurrent.futures import Future
+
+REASON_REFRESHING = "sedang diperbarui di background"
+REASON_OFFLINE = "database tidak dapat dihubungi"
+
+
+class _Entry:
+    __slots__ = ("frame", "version", "fetched_at")
+
+    def __init__(self, frame, version):
+        self.frame = frame
+        self.version = version
+        self.fetched_at = time.time()
+
+
+class StaleWhileRevalidate:
+    def __init__(self):
+        self._entries = {}
+        self._refreshing = set()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.last_error = None
+
+    def _refresh(self, key, version, loader):
+        try:
+            entry = _Entry(loader(), version)
+            with self._lock:
+                self._entries[key] = entry
+            self.last_error = None
+        except Exception as e:
+            # Data lama tetap dipakai; dicoba lagi pada permintaan berikutnya
+            self.last_error = e
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _status(self, entry, reason=None, cached=True):
+        return {
+            "stale": reason is not None,
+            "cached": cached,
+            "age": time.time() - entry.fetched_at,
+            "version": entry.version,
+            "reason": reason,
+        }
+
+    def get(self, key, version, loader):
+        """
+        (salinan DataFrame, status) untuk key.
+        version=None berarti versi terkini tidak diketahui (database bermasalah).
+        loader() dipanggil tanpa argumen dan tidak boleh memakai fungsi st.*
+        karena bisa berjalan di background thread.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            pending = self._loading.get(key) if entry is None else None
+            leader = entry is None and pending is None
+            if leader:
+                pending = self._loading[key] = Future()
+
+        if entry is None:
+            if not leader:
+                # Pembacaan pertama key ini sedang berjalan di sesi lain
+                entry = pending.result()
+                return entry.frame.copy(), self._status(entry)
+            try:
+                entry = _Entry(loader(), version)
+            except BaseException as e:
+                pending.set_exception(e)
+                raise
+            else:
+                pending.set_result(entry)
+            finally:
+                with self._lock:
+                    if entry is not None:
+                        self._entries[key] = entry
+                    del self._loading[key]
+            return entry.frame.copy(), self._status(entry, cached=False)
+
+        if version is None:
+            return entry.frame.copy(), self._status(entry, REASON_OFFLINE)
+
+        if entry.version == version:
+            return entry.frame.copy(), self._status(entry)
+
+        with self._lock:
+            start = key not in self._refreshing
+            self._refreshing.add(key)
+        if start:
+            threading.Thread(
+                target=self._refresh, args=(key, version, loader), name=f"swr-{key}", daemon=True
+            ).start()
+        return entry.frame.copy(), self._status(entry, REASON_REFRESHING)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(name):
+    """Store stale-while-revalidate tunggal per proses untuk nama tersebut"""
+    with _stores_lock:
+        if name not in _stores:
+            _stores[name] = StaleWhileRevalidate()
+        return _stores[name]
+
+
+def format_age(seconds):
+    """Umur data dalam kalimat singkat, mis. "3 menit" """
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds} detik"
+    if seconds < 3600:
+        return f"{seconds // 60} menit"
+    if seconds < 86400:
+        return f"{seconds // 3600} jam"
+    return f"{seconds // 86400} hari"
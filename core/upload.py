@@ -0,0 +1,236 @@
+"""
+Jalur tulis upload DATA.py: hanya baris yang benar-benar berubah yang ditulis.
+
+Setiap baris data kejadian menyimpan row_hash (hash isi kolom angka).
+Saat upload, hash baris yang masuk dihitung sekaligus (vectorized) lalu
+dibandingkan dengan hash tersimpan; baris yang sama dilewati. Baris yang
+berubah di-COPY ke temporary table dan ditulis dengan satu UPDATE ... FROM
+(join lewat kode_kec) di dalam transaksi pemanggil.
+
+Trigger BEFORE UPDATE mengosongkan row_hash bila isi baris diubah di luar
+jalur upload, sehingga baris tersebut dianggap berubah pada upload berikutnya.
+
+Instalasi / backfill hash (idempotent):
+    python -m core.upload install
+"""
+import argparse
+import io
+
+import numpy as np
+import pandas as pd
+
+from core import db, schema
+
+STAGE_TABLE = "upload_stage"
+HASH_COLUMN = schema.HASH_COLUMN
+INT_COLUMNS = [
+    "jumlah_rw_terdampak", "jumlah_kk_terdampak", "jumlah_jiwa_terdampak",
+    "jumlah_jiwa", "jumlah_disabilitas", "jumlah_lansia",
+]
+FLOAT_COLUMNS = ["rata_ketinggian_air", "ketinggian_air_max"]
+VALUE_COLUMNS = [col for col in schema.DATA_COLUMNS if col != "kecamatan"]
+
+
+def _value_row(alias):
+    return f"({', '.join(f'{alias}.{col}' for col in VALUE_COLUMNS)})"
+
+
+HASH_TRIGGER_FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION clear_row_hash() RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.{HASH_COLUMN} IS NOT DISTINCT FROM OLD.{HASH_COLUMN}
+       AND {_value_row('NEW')} IS DISTINCT FROM {_value_row('OLD')} THEN
+        NEW.{HASH_COLUMN} := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+HASH_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS trg_{table}_row_hash ON {table};
+CREATE TRIGGER trg_{table}_row_hash BEFORE UPDATE ON {table}
+    FOR EACH ROW EXECUTE FUNCTION clear_row_hash();
+"""
+
+
+def prepare_values(df):
+    """
+    Kolom angka dari file upload dalam tipe database.
+    Nilai kosong / bukan angka menjadi NULL; kolom integer dipotong seperti int(float(x)).
+    """
+    values = pd.DataFrame(index=df.index)
+    for col in VALUE_COLUMNS:
+        numbers = pd.to_numeric(df[col], errors="coerce").astype(float)
+        if col in INT_COLUMNS:
+            numbers = np.trunc(numbers).astype("Int64")
+        values[col] = numbers
+    return values
+
+
+def row_hashes(values):
+    """Hash 64-bit per baris dari hasil prepare_values (sama untuk isi yang sama)"""
+    return pd.util.hash_pandas_object(values[VALUE_COLUMNS], index=False).values.view(np.int64)
+
+
+def copy_stage(cursor, frame):
+    """COPY frame (kode_kec + kolom lain) ke temporary table STAGE_TABLE (hilang saat commit)"""
+    types = {col: "BIGINT" if col in INT_COLUMNS else "DOUBLE PRECISION" for col in VALUE_COLUMNS}
+    types[HASH_COLUMN] = "BIGINT"
+    types["kecamatan"] = "TEXT"
+    columns = [col for col in frame.columns if col != "kode_kec"]
+    cursor.execute(f"DROP TABLE IF EXISTS pg_temp.{STAGE_TABLE}")
+    cursor.execute(
+        f"CREATE TEMP TABLE {STAGE_TABLE} (kode_kec TEXT PRIMARY KEY, "
+        f"{', '.join(f'{col} {types[col]}' for col in columns)}) ON COMMIT DROP"
+    )
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {STAGE_TABLE} (kode_kec, {', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+    )
+
+
+def _stored_hashes(cursor, source_table, year_condition, kode_list):
+    cursor.execute(
+        f"SELECT kode_kec, {HASH_COLUMN} FROM {source_table} WHERE {year_condition} AND kode_kec = ANY(%s)",
+        (list(kode_list),),
+    )
+    return dict(cursor.fetchall())
+
+
+def diff_upload(df, valid_codes, stored_hashes):
+    """
+    Bandingkan baris upload dengan hash tersimpan (tanpa menulis apa pun).
+
+    df harus punya kolom kecamatan dan kode_kec (None jika nama tidak dikenal).
+    stored_hashes(kode_list) mengembalikan {kode_kec: row_hash} dari database.
+    Mengembalikan (changed, result): changed adalah DataFrame kode_kec + kolom
+    angka + row_hash untuk baris yang perlu ditulis; result berisi changed
+    (daftar kode_kec), unchanged, skipped, dan details (laporan per kecamatan).
+    """
+    valid = df["kode_kec"].notna() & df["kode_kec"].isin(valid_codes)
+    rows = df[valid].drop_duplicates("kode_kec", keep="last")
+
+    values = prepare_values(rows)
+    stage = values.copy()
+    stage.insert(0, "kode_kec", rows["kode_kec"].values)
+    stage[HASH_COLUMN] = row_hashes(values)
+
+    stored = stored_hashes(list(stage["kode_kec"])) if len(stage) else {}
+    # Dibangun langsung sebagai Int64: lewat float, hash 64-bit kehilangan presisi
+    stored_hash = pd.Series(
+        pd.array([stored.get(kode) for kode in stage["kode_kec"]], dtype="Int64"), index=stage.index
+    )
+    is_changed = (stored_hash != stage[HASH_COLUMN]).fillna(True).astype(bool)
+    changed = stage[is_changed]
+
+    changed_codes = set(changed["kode_kec"])
+    details = []
+    for name, kode, is_valid in zip(df["kecamatan"], df["kode_kec"], valid):
+        if not is_valid:
+            details.append({"Kecamatan": name, "Status": "⏭️ Skipped", "Reason": "Tidak ditemukan di database"})
+        elif kode in changed_codes:
+            details.append({"Kecamatan": name, "Status": "✅ Changed", "Reason": "Data berubah, baris ditulis ulang"})
+        else:
+            details.append({"Kecamatan": name, "Status": "➖ Unchanged", "Reason": "Data sama dengan database"})
+
+    return changed, {
+        "changed": list(changed["kode_kec"]),
+        "unchanged": int((~is_changed).sum()),
+        "skipped": int((~valid).sum()),
+        "details": details,
+    }
+
+
+def bulk_update(cursor, source_table, year_condition, df, valid_codes):
+    """
+    Tulis baris upload yang valid dan berubah dalam satu UPDATE ... FROM (Postgres).
+    Mengembalikan result dari diff_upload.
+    """
+    changed, result = diff_upload(
+        df, valid_codes, lambda kode_list: _stored_hashes(cursor, source_table, year_condition, kode_list)
+    )
+
+    if len(changed):
+        copy_stage(cursor, changed)
+        assignments = ",\n            ".join(f"{col} = s.{col}" for col in VALUE_COLUMNS + [HASH_COLUMN])
+        cursor.execute(
+            f"""
+            UPDATE {source_table} AS t
+            SET {assignments}
+            FROM {STAGE_TABLE} s
+            WHERE {year_condition} AND t.kode_kec = s.kode_kec
+            """
+        )
+    return result
+
+
+# ===== INSTALASI =====
+
+def _backfill_hashes(cursor, table, condition):
+    cursor.execute(
+        f"SELECT kode_kec, {', '.join(VALUE_COLUMNS)} FROM {table} "
+        f"WHERE {condition} AND kode_kec IS NOT NULL AND {HASH_COLUMN} IS NULL"
+    )
+    rows = cursor.fetchall()
+    if not rows:
+        return 0
+    df = pd.DataFrame(rows, columns=["kode_kec"] + VALUE_COLUMNS)
+    stage = pd.DataFrame({"kode_kec": df["kode_kec"], HASH_COLUMN: row_hashes(prepare_values(df))})
+    copy_stage(cursor, stage)
+    cursor.execute(
+        f"""
+        UPDATE {table} AS t SET {HASH_COLUMN} = s.{HASH_COLUMN}
+        FROM {STAGE_TABLE} s
+        WHERE {condition} AND t.kode_kec = s.kode_kec
+        """
+    )
+    return len(rows)
+
+
+def install(cursor):
+    """
+    Tambahkan kolom row_hash + trigger di tabel kejadian_YYYY dan tabel partisi
+    `kejadian` (jika ada), lalu isi hash untuk baris yang belum punya.
+    Membutuhkan kolom kode_kec (python -m core.kecamatan install).
+    """
+    cursor.execute(HASH_TRIGGER_FUNCTION_SQL)
+    sources = []
+    cursor.execute(schema.YEAR_TABLES_SQL)
+    for (table,) in cursor.fetchall():
+        sources.append((table, [(table, "TRUE")]))
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (schema.FACT_TABLE,))
+    if cursor.fetchone()[0]:
+        years = schema.partition_years_cursor(cursor)
+        sources.append((schema.FACT_TABLE, [(schema.FACT_TABLE, f"tahun = {tahun}") for tahun in years]))
+
+    filled = 0
+    for table, parts in sources:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {HASH_COLUMN} BIGINT")
+        cursor.execute(HASH_TRIGGER_SQL.format(table=table))
+        for part_table, condition in parts:
+            filled += _backfill_hashes(cursor, part_table, condition)
+    return [table for table, _ in sources], filled
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kelola hash baris untuk upload delta")
+    parser.add_argument("command", choices=["install"])
+    parser.parse_args(argv)
+
+    conn = db.raw_connection()
+    try:
+        tables, filled = install(conn.cursor())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    print(f"{HASH_COLUMN} terpasang di: {', '.join(tables)} ({filled} baris di-backfill)")
+
+
+if __name__ == "__main__":
+    main()
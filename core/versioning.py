@@ -0,0 +1,260 @@
+"""
+Versi data per scope untuk cache-busting (pengganti checksum SUM di get_data_hash).
+
+Tabel data_version menyimpan satu baris per scope:
+- "kejadian_<tahun>" naik setiap kali tabel tahun tersebut berubah,
+- "total" naik setiap kali tabel tahun mana pun berubah.
+Pengecekan versi = satu lookup primary key, tidak tergantung jumlah tahun/baris.
+
+Versi dinaikkan oleh trigger statement-level di setiap tabel kejadian_YYYY
+(atau di tabel partisi `kejadian`, per tahun yang tersentuh) dan juga oleh
+jalur upload DATA.py (sehingga tetap benar tanpa trigger).
+Setiap kenaikan mengirim NOTIFY di channel "data_version" sehingga proses
+aplikasi bisa langsung menghapus cache versi tanpa menunggu TTL.
+
+Instalasi (idempotent):
+    python -m core.versioning install
+Jika belum dijalankan, pengecekan versi pertama di setiap proses memasangnya
+otomatis (ensure_installed), atau gagal dengan pesan yang menyebut perintah di atas.
+"""
+import argparse
+import select
+import threading
+import time
+
+from core import db
+from core.schema import FACT_TABLE, YEAR_TABLES_SQL
+
+CHANNEL = "data_version"
+TOTAL_SCOPE = "total"
+ALL_SCOPES = "*"
+
+SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS data_version (
+    scope TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION bump_data_version(changed_scope TEXT) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO data_version (scope, version, updated_at)
+    VALUES (changed_scope, 1, now()), ('{TOTAL_SCOPE}', 1, now())
+    ON CONFLICT (scope) DO UPDATE
+        SET version = data_version.version + 1, updated_at = now();
+    PERFORM pg_notify('{CHANNEL}', changed_scope);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bump_data_version_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_data_version(TG_TABLE_NAME::TEXT);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Untuk tabel partisi: naikkan versi setiap tahun yang ada di baris yang berubah
+CREATE OR REPLACE FUNCTION bump_data_version_rows() RETURNS TRIGGER AS $$
+DECLARE
+    changed_year INTEGER;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        FOR changed_year IN SELECT DISTINCT tahun FROM new_rows LOOP
+            PERFORM bump_data_version('kejadian_' || changed_year);
+        END LOOP;
+    ELSIF TG_OP = 'DELETE' THEN
+        FOR changed_year IN SELECT DISTINCT tahun FROM old_rows LOOP
+            PERFORM bump_data_version('kejadian_' || changed_year);
+        END LOOP;
+    ELSE
+        FOR changed_year IN SELECT tahun FROM new_rows UNION SELECT tahun FROM old_rows LOOP
+            PERFORM bump_data_version('kejadian_' || changed_year);
+        END LOOP;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bump_all_data_versions() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE data_version SET version = version + 1, updated_at = now();
+    PERFORM pg_notify('{CHANNEL}', '{ALL_SCOPES}');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS trg_{table}_version ON {table};
+CREATE TRIGGER trg_{table}_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version_trigger();
+"""
+
+PARTITIONED_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS trg_{table}_version_ins ON {table};
+CREATE TRIGGER trg_{table}_version_ins AFTER INSERT ON {table}
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version_rows();
+DROP TRIGGER IF EXISTS trg_{table}_version_upd ON {table};
+CREATE TRIGGER trg_{table}_version_upd AFTER UPDATE ON {table}
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version_rows();
+DROP TRIGGER IF EXISTS trg_{table}_version_del ON {table};
+CREATE TRIGGER trg_{table}_version_del AFTER DELETE ON {table}
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version_rows();
+DROP TRIGGER IF EXISTS trg_{table}_version_trunc ON {table};
+CREATE TRIGGER trg_{table}_version_trunc AFTER TRUNCATE ON {table}
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_all_data_versions();
+"""
+
+
+def scope_for(tipe, tahun_selected):
+    """Scope versi untuk pilihan di halaman CLUSTERING"""
+    if tipe == "Per Tahun":
+        return f"kejadian_{tahun_selected}"
+    return TOTAL_SCOPE
+
+
+def install(cursor):
+    """
+    Buat tabel versi dan fungsi, lalu pasang trigger di semua tabel kejadian_YYYY
+    dan di tabel partisi `kejadian` jika ada. Mengembalikan daftar tabel.
+    """
+    cursor.execute(SCHEMA_SQL)
+    cursor.execute(YEAR_TABLES_SQL)
+    tables = [row[0] for row in cursor.fetchall()]
+    for table in tables:
+        cursor.execute(TRIGGER_SQL.format(table=table))
+
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (FACT_TABLE,))
+    if cursor.fetchone()[0]:
+        cursor.execute(PARTITIONED_TRIGGER_SQL.format(table=FACT_TABLE))
+        tables.append(FACT_TABLE)
+
+    cursor.execute("INSERT INTO data_version (scope) VALUES (%s) ON CONFLICT DO NOTHING", (TOTAL_SCOPE,))
+    return tables
+
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def ensure_installed():
+    """
+    Pasang data_version (install) jika belum ada, sekali per proses.
+    Tanpa tabel ini setiap pengecekan versi gagal dan CLUSTERING diam-diam
+    terus memakai data tersimpan; jika pemasangan gagal (mis. role tanpa hak
+    DDL) dilempar RuntimeError yang menyebut langkah install manualnya.
+    """
+    global _installed
+    if _installed:
+        return
+    with _install_lock:
+        if _installed:
+            return
+        conn = db.raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT to_regclass('data_version') IS NOT NULL")
+            if not cursor.fetchone()[0]:
+                install(cursor)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise RuntimeError(
+                f"tabel data_version belum terpasang dan gagal dipasang otomatis ({e}); "
+                "jalankan: python -m core.versioning install"
+            ) from e
+        finally:
+            conn.close()
+        _installed = True
+
+
+def get_version(scope):
+    """Versi saat ini untuk sebuah scope (0 jika belum pernah tercatat)"""
+    ensure_installed()
+    rows = db.fetch_all("SELECT version FROM data_version WHERE scope = :scope", {"scope": scope})
+    return int(rows[0][0]) if rows else 0
+
+
+def bump(cursor, scope):
+    """Naikkan versi scope + total dari cursor DBAPI (ikut transaksi pemanggil)"""
+    cursor.execute("SELECT bump_data_version(%s)", (scope,))
+
+
+# ===== LISTEN/NOTIFY =====
+
+_listener_started = False
+_listener_lock = threading.Lock()
+_callbacks = {}
+
+
+def on_change(name, callback):
+    """
+    Daftarkan callback(scope) yang dipanggil saat ada NOTIFY perubahan versi.
+    Nama yang sama menimpa callback sebelumnya (aman dipanggil setiap rerun).
+    Listener background dijalankan sekali per proses.
+    """
+    global _listener_started
+    with _listener_lock:
+        _callbacks[name] = callback
+        if _listener_started:
+            return
+        _listener_started = True
+    threading.Thread(target=_listen_forever, name="data-version-listener", daemon=True).start()
+
+
+def _listen_forever():
+    delay = 1.0
+    while True:
+        try:
+            conn = db.get_engine().raw_connection()
+            dbapi_conn = conn.driver_connection
+            # Koneksi LISTEN dilepas dari pool agar tidak memakan slot pool
+            conn.detach()
+            try:
+                dbapi_conn.autocommit = True
+                dbapi_conn.cursor().execute(f"LISTEN {CHANNEL}")
+                delay = 1.0
+                while True:
+                    if select.select([dbapi_conn], [], [], 60) == ([], [], []):
+                        continue
+                    dbapi_conn.poll()
+                    while dbapi_conn.notifies:
+                        scope = dbapi_conn.notifies.pop(0).payload
+                        for callback in list(_callbacks.values()):
+                            try:
+                                callback(scope)
+                            except Exception:
+                                pass
+            finally:
+                conn.close()
+        except Exception:
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kelola tabel versi data")
+    parser.add_argument("command", choices=["install", "show"])
+    args = parser.parse_args(argv)
+
+    if args.command == "install":
+        conn = db.raw_connection()
+        try:
+            tables = install(conn.cursor())
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        print(f"data_version terpasang, trigger di {len(tables)} tabel: {', '.join(tables)}")
+    else:
+        print(db.read_sql("SELECT * FROM data_version ORDER BY scope").to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
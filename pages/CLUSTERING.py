@@ -1,21 +1,12 @@
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.decomposition import PCA
-from sklearn.metrics import silhouette_score, silhouette_samples
-from sklearn_extra.cluster import KMedoids
-from sklearn.cluster import DBSCAN
-import psycopg2
-from sqlalchemy import create_engine
-import folium
-from streamlit_folium import st_folium
-import json
-import numpy as np
-import toml
-import hashlib
+# engine, snapshot, figures, maps, aggregate, kecamatan (pyarrow, scikit-learn,
+# matplotlib, folium) di-import di fungsi yang memakainya, bukan saat halaman dimuat
+from core import constants, db, invalidation, metrics, profiling, swr, versioning
+from core.backend import get_backend
+from core.geometry import get_shared_store, store_path_for
 
 st.set_page_config(
     page_title="CLUSTERING",
@@ -32,73 +23,19 @@ if user_type == None:
 # Initialize session state
 if 'clustering_result' not in st.session_state:
     st.session_state.clustering_result = None
-if 'geojson_data' not in st.session_state:
-    st.session_state.geojson_data = None
+if 'geometry_key' not in st.session_state:
+    st.session_state.geometry_key = None
 if 'last_params' not in st.session_state:
     st.session_state.last_params = None
-
-# ===== LOAD DATABASE CONFIGURATION FROM secrets.toml =====
-
-secrets = toml.load(".streamlit/secrets.toml")
-db_host = secrets["database"]["db_host"]
-db_port = secrets["database"]["db_port"]
-db_name = secrets["database"]["db_name"]
-db_user = secrets["database"]["db_user"]
-db_password = secrets["database"]["db_password"]
-
-
-# ===== FUNGSI UNTUK LABELING CLUSTER =====
-CLUSTER_LABELS = {
-    2: ['Tingkat Kerawanan Rendah', 'Tingkat Kerawanan Tinggi'],
-    3: ['Tingkat Kerawanan Rendah', 'Tingkat Kerawanan Sedang', 'Tingkat Kerawanan Tinggi'],
-    4: ['Tingkat Kerawanan Sangat Rendah', 'Tingkat Kerawanan Rendah', 'Tingkat Kerawanan Sedang', 'Tingkat Kerawanan Tinggi'],
-    5: ['STingkat Kerawanan sangat Rendah', 'Tingkat Kerawanan Rendah', 'Tingkat Kerawanan Sedang', 'Tingkat Kerawanan Tinggi', 'Tingkat Kerawanan Sangat Tinggi'],
-    6: ['Tingkat Kerawanan Sangat Rendah', 'Tingkat Kerawanan Rendah', 'Tingkat Kerawanan Cukup Rendah', 'Tingkat Kerawanan Sedang', 'Tingkat Kerawanan Tinggi', 'Tingkat Kerawanan Sangat Tinggi'],
-    7: ['Tingkat Kerawanan Sangat Rendah', 'Tingkat Kerawanan Rendah', 'Tingkat Kerawanan Cukup Rendah', 'Tingkat Kerawanan Sedang', 'Tingkat Kerawanan Cukup Tinggi', 'Tingkat Kerawanan Tinggi', 'Tingkat Kerawanan Sangat Tinggi'],
-}
-
-def get_cluster_labels(n_clusters):
-    """Dapatkan label sesuai jumlah cluster"""
-    if n_clusters in CLUSTER_LABELS:
-        return CLUSTER_LABELS[n_clusters]
-    else:
-        return [f'Cluster {i}' for i in range(n_clusters)]
-
-def categorize_clusters(df):
-    """
-    Kategorisasi cluster berdasarkan tingkat keparahan banjir
-    dari Rendah ke Tinggi berdasarkan rata-rata fitur per cluster
-    """
-    feature_cols = ["jumlah_rw_terdampak", "jumlah_kk_terdampak", 
-                    "jumlah_jiwa_terdampak", "rata_ketinggian_air", 
-                    "ketinggian_air_max"]
-    
-    available_cols = [col for col in feature_cols if col in df.columns]
-    
-    cluster_means = df.groupby('cluster')[available_cols].mean()
-    cluster_means['skor_agregat'] = cluster_means.mean(axis=1)
-    cluster_means = cluster_means.sort_values(by='skor_agregat').reset_index()
-    
-    clusters_without_noise = cluster_means[cluster_means['cluster'] != -1]
-    n_clusters = len(clusters_without_noise)
-    labels = get_cluster_labels(n_clusters)
-    
-    cluster_label_map = {}
-    for i, row in clusters_without_noise.iterrows():
-        cluster_label_map[row['cluster']] = labels[i]
-    
-    if -1 in df['cluster'].values:
-        cluster_label_map[-1] = 'Noise/Outlier bernilai ekstrim'
-    
-    df['kategori'] = df['cluster'].map(cluster_label_map)
-    
-    return df, cluster_means
-
+if 'data_status' not in st.session_state:
+    st.session_state.data_status = None
 
 def plot_silhouette_analysis(X_scaled, cluster_labels, n_clusters):
     """
     Membuat silhouette plot untuk analisis kualitas cluster
     """
+    import numpy as np
+
     # Filter out noise points for DBSCAN
     mask = cluster_labels != -1
     X_filtered = X_scaled[mask]
@@ -108,6 +45,9 @@ def plot_silhouette_analysis(X_scaled, cluster_labels, n_clusters):
         st.warning("⚠️ Tidak cukup cluster untuk analisis silhouette")
         return None
     
+    import matplotlib.pyplot as plt
+    from sklearn.metrics import silhouette_samples, silhouette_score
+
     # Hitung silhouette score
     silhouette_avg = silhouette_score(X_filtered, labels_filtered)
     sample_silhouette_values = silhouette_samples(X_filtered, labels_filtered)
@@ -156,168 +96,273 @@ def plot_silhouette_analysis(X_scaled, cluster_labels, n_clusters):
     ax.set_xlim([-0.1, 1])
     ax.grid(True, alpha=0.3, axis='x')
     
-    plt.tight_layout()
+    fig.tight_layout()
+    return fig
+
+
+def plot_distribution_bar(kategori_counts):
+    import matplotlib.pyplot as plt
+
+    fig_bar, ax_bar = plt.subplots(figsize=(8, 5))
+    kategori_counts.plot(kind='bar', ax=ax_bar, color='steelblue')
+    ax_bar.set_xlabel("Kategori", fontsize=12)
+    ax_bar.set_ylabel("Jumlah Kecamatan", fontsize=12)
+    ax_bar.set_title("Distribusi Kecamatan per Cluster", fontsize=14, fontweight='bold')
+    ax_bar.tick_params(axis='x', rotation=45)
+    fig_bar.tight_layout()
+    return fig_bar
+
+
+def plot_distribution_pie(kategori_counts):
+    import matplotlib.pyplot as plt
+
+    fig_pie, ax_pie = plt.subplots(figsize=(8, 5))
+    kategori_counts.plot(kind='pie', ax=ax_pie, autopct='%1.1f%%', startangle=90)
+    ax_pie.set_ylabel("")
+    ax_pie.set_title("Proporsi Cluster", fontsize=14, fontweight='bold')
+    return fig_pie
+
+
+def plot_pca(clustering, rentang_tahun):
+    """
+    Scatter PCA 2D per cluster (dan medoid untuk K-Medoids)
+    """
+    import matplotlib.pyplot as plt
+
+    from core import maps
+
+    request = clustering.request
+    df = clustering.df
+    X_pca = clustering.pca_coords
+    
+    colors = maps.CLUSTER_COLORS
+    
+    unique_clusters = sorted(df['cluster'].unique())
+    
+    fig, ax = plt.subplots(figsize=(10, 6))
+    
+    for cluster_id in unique_clusters:
+        mask = df['cluster'] == cluster_id
+        if cluster_id == -1:
+            ax.scatter(
+                X_pca[mask, 0], 
+                X_pca[mask, 1], 
+                c='#333333', 
+                s=100, 
+                alpha=0.6, 
+                edgecolors='black',
+                linewidths=0.5,
+                label='Noise/Outlier'
+            )
+        else:
+            kategori = df[mask]['kategori'].iloc[0]
+            ax.scatter(
+                X_pca[mask, 0], 
+                X_pca[mask, 1], 
+                c=colors[cluster_id % len(colors)], 
+                s=100, 
+                alpha=0.6,
+                edgecolors='black',
+                linewidths=0.5,
+                label=f'{kategori} (Cluster {cluster_id})'
+            )
+    
+    if clustering.pca_medoids is not None:
+        medoids_pca = clustering.pca_medoids
+        ax.scatter(
+            medoids_pca[:,0], 
+            medoids_pca[:,1],
+            c="red", 
+            marker="X", 
+            s=300, 
+            edgecolors='black', 
+            linewidths=2, 
+            label="Medoids",
+            zorder=5
+        )
+    
+    ax.set_xlabel("PCA Component 1", fontsize=12)
+    ax.set_ylabel("PCA Component 2", fontsize=12)
+    
+    if request.tipe_data == constants.TOTAL:
+        title_tahun = f"Total (Agregasi {rentang_tahun})"
+    else:
+        title_tahun = f"Tahun {request.tahun}"
+    
+    if request.metode == constants.KMEDOIDS:
+        ax.set_title(f"K-Medoids Clustering (k={request.k}, {title_tahun})", 
+                     fontsize=14, fontweight='bold')
+    else:
+        ax.set_title(f"DBSCAN Clustering (ε={request.epsilon}, MinPts={request.min_pts}, {title_tahun})", 
+                     fontsize=14, fontweight='bold')
+    
+    ax.grid(True, alpha=0.3)
+    ax.legend(loc='best', fontsize=9, framealpha=0.9)
+    fig.tight_layout()
     return fig
 
 
-#Get hash dari database untuk cache-busting
-@st.cache_data(ttl=60, show_spinner=False)  # Cache hash hanya 1 menit
+#Get versi data dari database untuk cache-busting
+@st.cache_data(ttl=60, show_spinner=False)  # Jaring pengaman jika NOTIFY terlewat
 def get_data_hash(tipe, tahun_selected):
     """
-    Mengambil hash dari checksum database untuk deteksi perubahan data.
-    Hash ini digunakan untuk invalidate cache saat data berubah.
+    Mengambil versi data dari tabel data_version lewat backend (satu lookup primary key).
+    Versi ini digunakan untuk menentukan apakah data di load_data masih terkini.
+    Error tidak di-cache: pemanggil memakai data terakhir (lihat check_data_hash).
     """
+    metrics.cache_miss()
+    scope = versioning.scope_for(tipe, tahun_selected)
+    return f"{scope}:{get_backend().get_version(scope)}"
+
+
+def check_data_hash(tipe, tahun_selected):
+    """Versi data terkini, atau None jika database tidak dapat dihubungi"""
     try:
-        secrets = toml.load(".streamlit/secrets.toml")
-        db_host = secrets["database"]["db_host"]
-        db_port = secrets["database"]["db_port"]
-        db_name = secrets["database"]["db_name"]
-        db_user = secrets["database"]["db_user"]
-        db_password = secrets["database"]["db_password"]
-        
-        connection_string = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-        engine = create_engine(connection_string)
-        
-        if tipe == "Per Tahun":
-            table_name = f"kejadian_{tahun_selected}"
-            # Ambil checksum data (sum semua nilai numerik sebagai fingerprint)
-            query = f"""
-            SELECT 
-                COALESCE(SUM(
-                    COALESCE(jumlah_rw_terdampak, 0) + 
-                    COALESCE(jumlah_kk_terdampak, 0) + 
-                    COALESCE(jumlah_jiwa_terdampak, 0) + 
-                    COALESCE(rata_ketinggian_air, 0) + 
-                    COALESCE(ketinggian_air_max, 0)
-                ), 0) as checksum,
-                COUNT(*) as row_count
-            FROM {table_name}
-            """
-        else:
-            # Untuk Total, ambil checksum gabungan semua tahun
-            list_tahun = list(range(2018, 2026))
-            union_queries = []
-            for tahun in list_tahun:
-                union_queries.append(f"""
-                    SELECT 
-                        COALESCE(SUM(
-                            COALESCE(jumlah_rw_terdampak, 0) + 
-                            COALESCE(jumlah_kk_terdampak, 0) + 
-                            COALESCE(jumlah_jiwa_terdampak, 0) + 
-                            COALESCE(rata_ketinggian_air, 0) + 
-                            COALESCE(ketinggian_air_max, 0)
-                        ), 0) as checksum,
-                        COUNT(*) as row_count
-                    FROM kejadian_{tahun}
-                """)
-            query = f"""
-            SELECT 
-                SUM(checksum) as checksum,
-                SUM(row_count) as row_count
-            FROM (
-                {" UNION ALL ".join(union_queries)}
-            ) subq
-            """
-        
-        result = pd.read_sql(query, engine)
-        engine.dispose()
-        
-        # Generate hash dari checksum + row count
-        checksum_value = f"{result['checksum'].iloc[0]}_{result['row_count'].iloc[0]}"
-        data_hash = hashlib.md5(checksum_value.encode()).hexdigest()
-        
-        return data_hash
-        
+        return metrics.cache_call("get_data_hash", get_data_hash, tipe=tipe, tahun_selected=tahun_selected)
     except Exception as e:
-        # Jika gagal, return timestamp sebagai fallback
-        import time
-        fallback_hash = hashlib.md5(str(int(time.time())).encode()).hexdigest()
-        st.warning(f"⚠️ Gagal mengambil data hash: {str(e)}. Menggunakan fallback.")
-        return fallback_hash
+        st.warning(f"⚠️ Gagal mengambil versi data: {str(e)}. Memakai data terakhir yang tersimpan.")
+        return None
 
 
-@st.cache_data(ttl=600, show_spinner=False)  # Cache 10 menit
-def load_data(tipe, tahun_selected, data_hash):
+@st.cache_data(ttl=600, show_spinner=False)
+def get_available_years():
+    """Daftar tahun yang tersedia di backend penyimpanan"""
+    return get_backend().available_years()
+
+
+def invalidate_data_hash(scope):
+    """
+    Hapus cache versi hanya untuk scope yang berubah (dipanggil bus invalidasi).
+    Key load_data memuat versi data, jadi entri lama tidak pernah dibaca lagi
+    dan habis sendiri oleh TTL.
+    """
+    get_available_years.clear()
+    keys = invalidation.affected_keys(scope)
+    if keys is None:
+        get_data_hash.clear()
+        return
+    for tipe, tahun in keys:
+        get_data_hash.clear(tipe=tipe, tahun_selected=tahun)
+
+
+invalidation.subscribe("clustering.get_data_hash", invalidate_data_hash)
+
+
+def fetch_data(tahun_selected, data_hash):
+    """
+    Mengambil data satu tahun: dari snapshot lokal jika versinya sama dengan
+    data_hash (atau database tidak dapat dihubungi), selain itu dari database
+    lalu snapshot diperbarui.
+    Tanpa fungsi st.* karena dipanggil dari thread pool / background thread.
+    """
+    from core import snapshot
+
+    scope = versioning.scope_for("Per Tahun", tahun_selected)
+    with metrics.stage("data.snapshot_read"):
+        df = snapshot.read(scope, data_hash)
+    if df is not None:
+        return df
+    
+    with metrics.stage("data.db_read"):
+        df = snapshot.fetch(scope)
+    if data_hash is not None:
+        try:
+            snapshot.write(scope, df, data_hash)
+        except Exception:
+            # Snapshot hanya percepatan; kegagalan menulis file tidak menghentikan halaman
+            pass
+    return df
+
+
+def list_years():
+    """Tahun dari database, atau dari data tersimpan / snapshot jika database tidak dapat dihubungi"""
+    try:
+        return get_available_years()
+    except Exception:
+        from core import snapshot
+
+        return sorted(
+            {tahun for _, tahun in swr.get_store("clustering.load_data").keys() if tahun is not None}
+            | set(snapshot.available_years())
+        )
+
+
+def load_year_frames(tahun_list, online=True):
     """
-    Mengambil data dari database berdasarkan tipe (Per Tahun atau Total).
-    Parameter data_hash: Hash dari checksum database untuk cache-busting otomatis
+    DataFrame per tahun dari store stale-while-revalidate, dibaca paralel.
+    Setiap tahun di-cache dengan versinya sendiri, jadi hanya tahun yang
+    berubah yang dibaca ulang. Mengembalikan ({tahun: df}, [status]).
     """
-    # Baca konfigurasi database dari secrets.toml
-    secrets = toml.load(".streamlit/secrets.toml")
-    db_host = secrets["database"]["db_host"]
-    db_port = secrets["database"]["db_port"]
-    db_name = secrets["database"]["db_name"]
-    db_user = secrets["database"]["db_user"]
-    db_password = secrets["database"]["db_password"]
+    store = swr.get_store("clustering.load_data")
+    hashes = {}
+    for tahun in tahun_list:
+        try:
+            hashes[tahun] = (
+                metrics.cache_call("get_data_hash", get_data_hash, tipe="Per Tahun", tahun_selected=tahun)
+                if online else None
+            )
+        except Exception:
+            hashes[tahun] = None
     
+    def get(tahun):
+        df, status = store.get(("Per Tahun", tahun), hashes[tahun], lambda: fetch_data(tahun, hashes[tahun]))
+        metrics.cache_result("load_data", "miss" if not status['cached'] else "stale" if status['stale'] else "hit")
+        return df, status
     
-    connection_string = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-    engine = create_engine(connection_string)
-    query = ""
+    with ThreadPoolExecutor(max_workers=min(8, max(1, len(tahun_list)))) as pool:
+        loaded = list(pool.map(get, tahun_list))
+    return {tahun: df for tahun, (df, _) in zip(tahun_list, loaded)}, [status for _, status in loaded]
+
+
+def merge_status(statuses):
+    """Satu status untuk data gabungan: usang jika salah satu tahun usang"""
+    stale = [status for status in statuses if status['stale']]
+    return {
+        "stale": bool(stale),
+        "age": max(status['age'] for status in statuses),
+        "version": None,
+        "reason": stale[0]['reason'] if stale else None,
+    }
+
+
+def load_data(tipe, tahun_selected, data_hash):
+    """
+    Stale-while-revalidate: data terakhir per tahun langsung dipakai,
+    dibaca ulang di background jika data_hash berubah, dan tetap dipakai jika
+    database tidak dapat dihubungi (data_hash None). Total (Agregasi) dihitung
+    di proses dari DataFrame per tahun yang sama (core.aggregate.total_from_frames).
+    Status disimpan di st.session_state.data_status untuk ditampilkan bersama hasil.
+    """
+    if tipe == "Per Tahun" and tahun_selected is None:
+        st.error("Silakan pilih tahun terlebih dahulu.")
+        return None
     
-    if tipe == "Per Tahun":
-        if tahun_selected is None:
-            st.error("Silakan pilih tahun terlebih dahulu.")
-            return None
-        table_name = f"kejadian_{tahun_selected}"
-        query = f"SELECT * FROM {table_name} ORDER BY kecamatan ASC"
-        
-    else:
-        list_tahun = list(range(2018, 2026))
-        union_all_queries = []
-        
-        for tahun_loop in list_tahun:
-            table_name = f"kejadian_{tahun_loop}"
-            union_all_queries.append(
-                f"""
-                SELECT 
-                    kecamatan, 
-                    jumlah_rw_terdampak, 
-                    jumlah_kk_terdampak, 
-                    jumlah_jiwa_terdampak, 
-                    rata_ketinggian_air, 
-                    ketinggian_air_max 
-                FROM {table_name}
-                """
-            )
-        union_string = " UNION ALL ".join(union_all_queries)
-        
-        query = f"""
-        WITH all_data AS (
-            {union_string}
-        ),
-        aggregated_data AS (
-            SELECT
-                kecamatan,
-                COALESCE(SUM(jumlah_rw_terdampak), 0) AS jumlah_rw_terdampak,
-                COALESCE(SUM(jumlah_kk_terdampak), 0) AS jumlah_kk_terdampak,
-                COALESCE(SUM(jumlah_jiwa_terdampak), 0) AS jumlah_jiwa_terdampak,
-                COALESCE(AVG(rata_ketinggian_air), 0) AS rata_ketinggian_air,
-                COALESCE(MAX(ketinggian_air_max), 0) AS ketinggian_air_max
-            FROM all_data
-            GROUP BY kecamatan
-        ),
-        demo_data_2025 AS (
-            SELECT
-                kecamatan,
-                jumlah_jiwa,
-                jumlah_disabilitas,
-                jumlah_lansia
-            FROM kejadian_2025
-        )
-        SELECT
-            agg.*,
-            demo.jumlah_jiwa,
-            demo.jumlah_disabilitas,
-            demo.jumlah_lansia
-        FROM aggregated_data agg
-        LEFT JOIN demo_data_2025 demo ON agg.kecamatan = demo.kecamatan
-        ORDER BY agg.kecamatan ASC;  -- 
-        """
-
-    with st.spinner("Membaca data dari database..."):
-        df = pd.read_sql(query, engine)
-        engine.dispose()
+    try:
+        with st.spinner("Membaca data dari database..."):
+            if tipe == "Per Tahun":
+                frames, statuses = load_year_frames([tahun_selected], online=data_hash is not None)
+                df = frames[tahun_selected]
+            else:
+                tahun_list = list_years()
+                if not tahun_list:
+                    st.warning("⚠️ Data tidak ditemukan untuk parameter yang dipilih.")
+                    return None
+                frames, statuses = load_year_frames(tahun_list, online=data_hash is not None)
+                from core import aggregate
+
+                with metrics.stage("data.total"):
+                    demographics_year = aggregate.resolve_demographics_year(
+                        tahun_list, db.load_config()["demographics_year"]
+                    )
+                    df = aggregate.total_from_frames(frames, demographics_year)
+    except Exception as e:
+        st.error(f"❌ Gagal membaca data dari database: {str(e)}")
+        return None
+    
+    status = merge_status(statuses)
+    st.session_state.data_status = status
+    if status['stale']:
+        st.warning(f"⏳ Menampilkan data tersimpan ({swr.format_age(status['age'])} lalu), {status['reason']}.")
     
     if df.empty:
         st.warning("⚠️ Data tidak ditemukan untuk parameter yang dipilih.")
@@ -335,408 +380,297 @@ def show_footer():
     """, unsafe_allow_html=True)
 
 
-# Pemetaan
+# ===== BAGIAN HALAMAN =====
+# Bagian yang memiliki widget sendiri (parameter, tabel, distribusi) adalah
+# st.fragment: interaksi widget di dalamnya hanya menjalankan ulang bagian itu,
+# bukan seluruh halaman (grafik dan peta tidak digambar ulang saat parameter
+# digeser atau tabel disaring). Bagian tanpa widget ikut rerun halaman penuh.
+# Semua bagian hasil membaca st.session_state.clustering_result sendiri
+# sehingga selalu memakai hasil terbaru.
 
-geojson_path = os.path.join("KECAMATAN.geojson")
+@st.fragment
+def parameter_section(list_tahun, rentang_tahun):
+    """
+    Tipe data, tahun, metode dan parameter clustering.
+    Parameter terpilih disimpan di st.session_state.cluster_params; klik Jalankan
+    (atau parameter berubah saat hasil tampil) menjalankan ulang seluruh halaman.
+    """
+    # Pilihan Tipe Data
+    tipe_data = st.radio(
+        "Pilih Tipe Data",
+        options=["Per Tahun", "Total (Agregasi)"],
+        index=0,
+        horizontal=True
+    )
 
-if os.path.exists(geojson_path):
-    with open(geojson_path, "r", encoding="utf-8") as f:
-        st.session_state.geojson_data = json.load(f)
+    # Dropdown tahun kondisional (tahun dibaca dari database)
+    tahun = None
+    if tipe_data == "Per Tahun":
+        tahun = st.selectbox(
+            "Pilih Tahun Data",
+            options=list_tahun,
+            index=0
+        )
+        st.write(f"Tahun yang dipilih: **{tahun}**")
+    else:
+        st.write(f"Data agregasi dari **{rentang_tahun}** akan digunakan.")
+
+    # Radio button untuk metode clustering
+    if tipe_data == "Per Tahun" and tahun in constants.KMEDOIDS_EXCLUDED_YEARS:
+        tahun_lain = [t for t in list_tahun if t not in constants.KMEDOIDS_EXCLUDED_YEARS]
+        alternatif_tahun = f"\n        - Atau pilih tahun lain ({tahun_lain[0]}-{tahun_lain[-1]})" if tahun_lain else ""
+        st.warning(f"⚠️ **Metode K-Medoids tidak tersedia untuk tahun {tahun}**")
+        st.info(f"""
+        📌 **Alasan:**
+        - Data tahun {tahun} memiliki banyak kecamatan dengan nilai 0 (tidak terdampak banjir)
+        - Hal ini menyebabkan data menjadi identik setelah normalisasi
+        - K-Medoids kesulitan membentuk cluster yang valid dengan data seperti ini
+
+        💡 **Alternatif yang tersedia:**
+        - Gunakan **DBSCAN** yang lebih robust terhadap data dengan banyak nilai 0
+        - Atau pilih **Total (Agregasi)** untuk analisis keseluruhan {rentang_tahun}{alternatif_tahun}
+        """)
+        metode = "DBSCAN"  # Set default ke DBSCAN
+        st.success(f"✅ Menggunakan metode **DBSCAN** untuk tahun {tahun}")
+    else:
+        metode = st.radio(
+            "Pilih Metode Clustering",
+            options=["K-Medoids", "DBSCAN"],
+            horizontal=True
+        )
 
+    st.divider()
 
-# Pilihan Tipe Data
-tipe_data = st.radio(
-    "Pilih Tipe Data",
-    options=["Per Tahun", "Total (Agregasi)"],
-    index=0,
-    horizontal=True
-)
+    # Parameter berdasarkan metode yang dipilih
+    if metode == "K-Medoids":
+        st.subheader("Parameter K-Medoids")
 
-# Dropdown tahun kondisional
-tahun = None
-if tipe_data == "Per Tahun":
-    tahun = st.selectbox(
-        "Pilih Tahun Data",
-        options=list(range(2018, 2026)),
-        index=0
-    )
-    st.write(f"Tahun yang dipilih: **{tahun}**")
-else:
-    st.write("Data agregasi dari **2018-2025** akan digunakan.")
-
-# Radio button untuk metode clustering
-if tipe_data == "Per Tahun" and tahun == 2025:
-    st.warning("⚠️ **Metode K-Medoids tidak tersedia untuk tahun 2025**")
-    st.info("""
-    📌 **Alasan:**
-    - Data tahun 2025 memiliki banyak kecamatan dengan nilai 0 (tidak terdampak banjir)
-    - Hal ini menyebabkan data menjadi identik setelah normalisasi
-    - K-Medoids kesulitan membentuk cluster yang valid dengan data seperti ini
-    
-    💡 **Alternatif yang tersedia:**
-    - Gunakan **DBSCAN** yang lebih robust terhadap data dengan banyak nilai 0
-    - Atau pilih **Total (Agregasi)** untuk analisis keseluruhan 2018-2025
-    - Atau pilih tahun lain (2018-2024)
-    """)
-    metode = "DBSCAN"  # Set default ke DBSCAN
-    st.success("✅ Menggunakan metode **DBSCAN** untuk tahun 2025")
-else:
-    metode = st.radio(
-        "Pilih Metode Clustering",
-        options=["K-Medoids", "DBSCAN"],
-        horizontal=True
-    )
+        k = st.slider(
+            "Jumlah Cluster (k)",
+            min_value=2,
+            max_value=7,
+            value=3,
+            help="Tentukan jumlah cluster yang diinginkan"
+        )
 
-st.divider()
+        current_params = {'metode': metode, 'tipe_data': tipe_data, 'tahun': tahun, 'k': k}
+        info_text = f"K-Medoids dengan {k} cluster"
+    else:  # DBSCAN
+        st.subheader("Parameter DBSCAN")
+
+        epsilon = st.slider(
+            "Epsilon (ε)",
+            min_value=0.05,
+            max_value=0.5,
+            value=0.05,
+            step=0.01,
+            help="Jarak maksimum antara dua sampel untuk dianggap sebagai tetangga"
+        )
 
-# Fungsi untuk membuat peta dengan kategori
-def create_cluster_map(df, geojson_data, metode_name):
-    df['kecamatan_normalized'] = df['kecamatan'].str.upper().str.strip()
-    
-    m = folium.Map(
-        location=[-6.2088, 106.8456],
-        zoom_start=11,
-        tiles='OpenStreetMap'
-    )
-    
-    cluster_dict = dict(zip(df['kecamatan_normalized'], df['cluster']))
-    
-    colors = ['#e41a1c', '#377eb8', '#4daf4a', '#984ea3', '#ff7f00', 
-              '#ffff33', '#a65628', '#f781bf', '#999999', '#66c2a5']
-    
-    def style_function(feature):
-        kecamatan_name = feature['properties']['kecamatan'].upper().strip()
-        cluster = cluster_dict.get(kecamatan_name, -1)
-        
-        if cluster == -1:
-            color = '#333333'
-        else:
-            color = colors[cluster % len(colors)]
-        
-        return {
-            'fillColor': color,
-            'color': 'black',
-            'weight': 1,
-            'fillOpacity': 0.7
-        }
-    
-    def highlight_function(feature):
-        return {
-            'fillColor': '#ffff00',
-            'color': 'black',
-            'weight': 3,
-            'fillOpacity': 0.9
-        }
-    
-    folium.GeoJson(
-        geojson_data,
-        style_function=style_function,
-        highlight_function=highlight_function,
-        tooltip=folium.GeoJsonTooltip(
-            fields=['kecamatan', 'kab_kota'],
-            aliases=['Kecamatan:', 'Kota:'],
-            localize=True
-        ),
-        popup=folium.GeoJsonPopup(
-            fields=['kecamatan', 'kab_kota'],
-            aliases=['Kecamatan:', 'Kota:']
+        min_pts = st.slider(
+            "Min Points (MinPts)",
+            min_value=2,
+            max_value=10,
+            value=5,
+            help="Jumlah minimum sampel dalam neighborhood untuk membentuk core point"
         )
-    ).add_to(m)
-    
-    legend_html = f'''
-    <div style="position: fixed; 
-                bottom: 50px; right: 50px; width: 220px; height: auto; 
-                background-color: white; z-index:9999; font-size:14px;
-                border:2px solid grey; border-radius: 5px; padding: 10px">
-        <p style="margin: 0; font-weight: bold;">{metode_name} Clusters</p>
-    '''
-    
-    unique_clusters = sorted(df['cluster'].unique())
-    for cluster in unique_clusters:
-        kategori_series = df[df['cluster'] == cluster]['kategori']
-        if kategori_series.empty:
-            continue
-        kategori = kategori_series.iloc[0]
-        count = len(df[df['cluster'] == cluster])
-        
-        if cluster >= 0:
-            color = colors[cluster % len(colors)]
-            legend_html += f'<p style="margin: 3px 0;"><i style="background:{color}; width: 18px; height: 18px; display: inline-block; margin-right: 5px;"></i>{kategori} ({count})</p>'
-        else:
-            legend_html += f'<p style="margin: 3px 0;"><i style="background:#333333; width: 18px; height: 18px; display: inline-block; margin-right: 5px;"></i>{kategori} ({count})</p>'
-    
-    legend_html += '</div>'
-    m.get_root().html.add_child(folium.Element(legend_html))
-    
-    return m
 
-# Parameter berdasarkan metode yang dipilih
-if metode == "K-Medoids":
-    st.subheader("Parameter K-Medoids")
-    
-    k = st.slider(
-        "Jumlah Cluster (k)",
-        min_value=2,
-        max_value=7,
-        value=3,
-        help="Tentukan jumlah cluster yang diinginkan"
-    )
-    
-    max_iter = 300
-    random_state = 42
-    
-    current_params = {'metode': metode, 'tipe_data': tipe_data, 'tahun': tahun, 'k': k}
-    if st.session_state.last_params != current_params:
-        if st.session_state.last_params is not None:
-            st.session_state.clustering_result = None
-    
-    info_text = f"K-Medoids dengan {k} cluster"
+        current_params = {'metode': metode, 'tipe_data': tipe_data, 'tahun': tahun, 'epsilon': epsilon, 'min_pts': min_pts}
+        info_text = f"DBSCAN dengan ε={epsilon} dan MinPts={min_pts}"
+
     if tipe_data == "Per Tahun":
         info_text += f" pada data tahun {tahun}"
     else:
-        info_text += " pada data agregasi (2018-2025)"
+        info_text += f" pada data agregasi ({rentang_tahun})"
     st.info(f"📊 {info_text}")
-    
-    if st.button("🚀 Jalankan K-Medoids", type="primary"):
-        
-        # ✅ Dapatkan hash data terkini (menggantikan version_dummy)
-        with st.spinner("🔍 Memeriksa versi data..."):
-            data_hash = get_data_hash(tipe=tipe_data, tahun_selected=tahun)
-        
-        # ✅ Load data dengan hash
-        df = load_data(
-            tipe=tipe_data, 
-            tahun_selected=tahun, 
-            data_hash=data_hash
+
+    run_clicked = st.button(f"🚀 Jalankan {metode}", type="primary")
+    st.session_state.cluster_params = current_params
+
+    # Hasil lama tidak berlaku lagi: halaman dijalankan ulang agar bagian hasil hilang
+    if st.session_state.clustering_result is not None and st.session_state.last_params != current_params:
+        st.session_state.clustering_result = None
+        st.rerun()
+
+    # Clustering dijalankan di alur utama halaman (trace metrics & profil ikut tercatat)
+    if run_clicked and not st.session_state.get("run_requested"):
+        st.session_state.run_requested = True
+        st.rerun()
+
+
+def build_request(params):
+    """ClusteringRequest dari parameter yang dipilih di parameter_section"""
+    from core import engine
+
+    if params['metode'] == "K-Medoids":
+        return engine.ClusteringRequest(
+            metode=constants.KMEDOIDS, tipe_data=params['tipe_data'], tahun=params['tahun'],
+            k=params['k'], max_iter=300, random_state=42
         )
-        
-        if df is not None and not df.empty:
-            try:
-                X = df[["jumlah_rw_terdampak", "jumlah_kk_terdampak", "jumlah_jiwa_terdampak", 
-                        "rata_ketinggian_air", "ketinggian_air_max"]]
-                
-                with st.spinner("Menormalisasi data..."):
-                    scaler = MinMaxScaler()
-                    X_scaled = scaler.fit_transform(X)
-                
-                with st.spinner(f"⚡ Menjalankan K-Medoids dengan {k} cluster..."):
-                    kmedoids = KMedoids(
-                        n_clusters=k, 
-                        random_state=int(random_state), 
-                        max_iter=int(max_iter),
-                        metric="euclidean"
-                    )
-                    df["cluster"] = kmedoids.fit_predict(X_scaled)
-                
-                with st.spinner("Melakukan kategorisasi cluster..."):
-                    df, cluster_means = categorize_clusters(df)
-                
-                score = silhouette_score(X_scaled, df["cluster"])
-                
-                st.session_state.clustering_result = {
-                    'df': df,
-                    'score': score,
-                    'k': k,
-                    'metode': 'K-Medoids',
-                    'tipe_data': tipe_data,
-                    'tahun': tahun,
-                    'X_scaled': X_scaled,
-                    'kmedoids': kmedoids,
-                    'cluster_means': cluster_means
-                }
-                
-                st.session_state.last_params = current_params
-                                
-            except Exception as e:
-                st.error(f"❌ Terjadi kesalahan saat clustering: {str(e)}")
-
-else:  # DBSCAN
-    st.subheader("Parameter DBSCAN")
-    
-    epsilon = st.slider(
-        "Epsilon (ε)",
-        min_value=0.05,
-        max_value=0.5,
-        value=0.05,
-        step=0.01,
-        help="Jarak maksimum antara dua sampel untuk dianggap sebagai tetangga"
-    )
-    
-    min_pts = st.slider(
-        "Min Points (MinPts)",
-        min_value=2,
-        max_value=10,
-        value=5,
-        help="Jumlah minimum sampel dalam neighborhood untuk membentuk core point"
+    return engine.ClusteringRequest(
+        metode=constants.DBSCAN_METHOD, tipe_data=params['tipe_data'], tahun=params['tahun'],
+        epsilon=params['epsilon'], min_pts=int(params['min_pts']), metric="euclidean"
     )
-    
-    metric = "euclidean"
-    
-    current_params = {'metode': metode, 'tipe_data': tipe_data, 'tahun': tahun, 'epsilon': epsilon, 'min_pts': min_pts}
-    if st.session_state.last_params != current_params:
-        if st.session_state.last_params is not None:
-            st.session_state.clustering_result = None
-    
-    info_text = f"DBSCAN dengan ε={epsilon} dan MinPts={min_pts}"
-    if tipe_data == "Per Tahun":
-        info_text += f" pada data tahun {tahun}"
-    else:
-        info_text += " pada data agregasi (2018-2025)"
-    st.info(f"📊 {info_text}")
-    
-    if st.button("🚀 Jalankan DBSCAN", type="primary"):
-        
-        # ✅ Dapatkan hash data terkini (menggantikan version_dummy)
-        with st.spinner("🔍 Memeriksa versi data..."):
-            data_hash = get_data_hash(tipe=tipe_data, tahun_selected=tahun)
-        
-        # ✅ Load data dengan hash
+
+
+def run_clustering(params):
+    """
+    Baca data lalu jalankan clustering untuk params; hasil disimpan di
+    st.session_state.clustering_result. Mengembalikan versi data yang dipakai.
+    """
+    from core import engine, figures
+
+    tipe_data, tahun = params['tipe_data'], params['tahun']
+
+    # ✅ Dapatkan hash data terkini
+    with st.spinner("🔍 Memeriksa versi data..."), metrics.stage("data.hash"):
+        data_hash = check_data_hash(tipe=tipe_data, tahun_selected=tahun)
+
+    # ✅ Load data dengan hash
+    with metrics.stage("data.load"):
         df = load_data(
-            tipe=tipe_data, 
-            tahun_selected=tahun, 
+            tipe=tipe_data,
+            tahun_selected=tahun,
             data_hash=data_hash
         )
-        
-        if df is not None and not df.empty:
-            try:
-                X = df[["jumlah_rw_terdampak", "jumlah_kk_terdampak", "jumlah_jiwa_terdampak", 
-                        "rata_ketinggian_air", "ketinggian_air_max"]]
-                
-                with st.spinner("Menormalisasi data..."):
-                    scaler = MinMaxScaler()
-                    X_scaled = scaler.fit_transform(X)
-                
-                with st.spinner(f"⚡ Menjalankan DBSCAN..."):
-                    dbscan = DBSCAN(eps=epsilon, min_samples=int(min_pts), metric=metric)
-                    df["cluster"] = dbscan.fit_predict(X_scaled)
-                
-                unique_clusters = set(df["cluster"])
-                valid_clusters = unique_clusters - {-1}
-                n_clusters = len(valid_clusters)
-                n_noise = list(df["cluster"]).count(-1)
-                
-                if n_clusters == 0:
-                    st.error("❌ DBSCAN tidak membentuk cluster sama sekali (semua data adalah noise)")
-                    st.info("💡 **Saran:** Perbesar nilai Epsilon atau perkecil MinPts")
-                    st.stop()
-                
-                if n_clusters < 2:
-                    st.warning(f"⚠️ DBSCAN hanya membentuk {n_clusters} cluster ({len(df)-n_noise} data) dan {n_noise} noise")
-                    st.info("💡 **Saran:** Sesuaikan parameter Epsilon atau MinPts untuk membentuk lebih banyak cluster")
-                    score_text = "N/A (butuh > 1 cluster)"
-                else:
-                    mask = df["cluster"] != -1
-                    try:
-                        score = silhouette_score(X_scaled[mask], df[mask]["cluster"])
-                        score_text = f"{score:.3f}"
-                    except ValueError as e:
-                        st.warning(f"⚠️ Tidak dapat menghitung silhouette score: {str(e)}")
-                        score_text = "Null"
-                
-                with st.spinner("Melakukan kategorisasi cluster..."):
-                    df, cluster_means = categorize_clusters(df)
-                
-                st.session_state.clustering_result = {
-                    'df': df,
-                    'score': score_text,
-                    'epsilon': epsilon,
-                    'min_pts': min_pts,
-                    'n_clusters': n_clusters,
-                    'n_noise': n_noise,
-                    'metode': 'DBSCAN',
-                    'tipe_data': tipe_data,
-                    'tahun': tahun,
-                    'X_scaled': X_scaled,
-                    'cluster_means': cluster_means
-                }
-                
-                st.session_state.last_params = current_params
-                
-            except Exception as e:
-                st.error(f"❌ Terjadi kesalahan saat clustering: {str(e)}")
-
-
-# TAMPILKAN HASIL dari session state
-if st.session_state.clustering_result is not None:
+
+    if df is None or df.empty:
+        return data_hash
+
+    try:
+        request = build_request(params)
+        if request.metode == constants.KMEDOIDS:
+            spinner_text = f"⚡ Menjalankan K-Medoids dengan {request.k} cluster..."
+        else:
+            spinner_text = "⚡ Menjalankan DBSCAN..."
+        with st.spinner(spinner_text):
+            clustering = engine.run(request, df)
+        metrics.observe_timings("cluster", clustering.timings)
+
+        if request.metode == constants.DBSCAN_METHOD:
+            n_clusters = clustering.n_clusters
+            n_noise = clustering.n_noise
+
+            if n_clusters == 0:
+                st.error("❌ DBSCAN tidak membentuk cluster sama sekali (semua data adalah noise)")
+                st.info("💡 **Saran:** Perbesar nilai Epsilon atau perkecil MinPts")
+                # Tanpa st.stop(): trace metrics dan profil rerun ini tetap diselesaikan
+                return data_hash
+
+            if n_clusters < 2:
+                st.warning(f"⚠️ DBSCAN hanya membentuk {n_clusters} cluster ({len(df)-n_noise} data) dan {n_noise} noise")
+                st.info("💡 **Saran:** Sesuaikan parameter Epsilon atau MinPts untuk membentuk lebih banyak cluster")
+            elif clustering.score is None:
+                st.warning(f"⚠️ Tidak dapat menghitung silhouette score: {clustering.score_error}")
+
+        st.session_state.clustering_result = {
+            'clustering': clustering,
+            'data_status': st.session_state.data_status,
+            # Key cache grafik PNG (core.figures), sama untuk hasil identik di sesi lain
+            'figure_key': figures.result_key(clustering),
+        }
+
+        st.session_state.last_params = params
+
+    except Exception as e:
+        st.error(f"❌ Terjadi kesalahan saat clustering: {str(e)}")
+    return data_hash
+
+
+def result_summary_section():
+    """Metrik utama dan karakteristik setiap kategori"""
     result = st.session_state.clustering_result
-    df = result['df']
-    
+    if result is None:
+        return
+    clustering = result['clustering']
+    request = clustering.request
+    if clustering.score is not None:
+        score_text = f"{clustering.score:.3f}"
+    elif clustering.n_clusters < 2:
+        score_text = "N/A (butuh > 1 cluster)"
+    else:
+        score_text = "Null"
+
     st.divider()
     st.subheader("📊 Hasil Clustering")
-    
+
+    # Tandai hasil yang memakai data tersimpan (stale)
+    data_status = result.get('data_status')
+    if data_status and data_status['stale']:
+        st.caption(f"⏳ Dihitung dari data tersimpan berumur {swr.format_age(data_status['age'])} ({data_status['reason']})")
+
     # Metrik
-    if result['metode'] == 'K-Medoids':
+    if request.metode == constants.KMEDOIDS:
         col1, col2 = st.columns(2)
         with col1:
-            st.metric("Silhouette Score", f"{result['score']:.3f}")
+            st.metric("Silhouette Score", score_text)
         with col2:
-            st.metric("Jumlah Cluster", result['k'])
+            st.metric("Jumlah Cluster", request.k)
     else:  # DBSCAN
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Jumlah Cluster", result['n_clusters'])
+            st.metric("Jumlah Cluster", clustering.n_clusters)
         with col2:
-            st.metric("Noise Points", result['n_noise'])
+            st.metric("Noise Points", clustering.n_noise)
         with col3:
-            st.metric("Silhouette Score", result['score'])
-    
+            st.metric("Silhouette Score", score_text)
+
     # Tampilkan tabel statistik cluster dengan kategori
     st.subheader("📈 Karakteristik Setiap Kategori")
-    cluster_stats = result['cluster_means'].copy()
-    
+    cluster_stats = clustering.cluster_means.copy()
+
     if 'cluster' in cluster_stats.columns:
-        cluster_label_map = dict(zip(df['cluster'], df['kategori']))
-        cluster_stats['kategori'] = cluster_stats['cluster'].map(cluster_label_map)
-        
+        cluster_stats['kategori'] = cluster_stats['cluster'].map(clustering.category_map)
+
         cols = ['cluster', 'kategori'] + [col for col in cluster_stats.columns if col not in ['cluster', 'kategori']]
         cluster_stats = cluster_stats[cols]
-        
+
         st.dataframe(cluster_stats.round(2), use_container_width=True)
-    
-    
+
+
+def silhouette_section():
     # ===== VISUALISASI SILHOUETTE =====
+    from core import figures
+
+    result = st.session_state.clustering_result
+    if result is None:
+        return
+    clustering = result['clustering']
+    request = clustering.request
+
     st.divider()
     st.subheader("📉 Analisis Silhouette")
-    
+
     st.markdown("""
     **Silhouette Analysis** mengukur seberapa baik setiap data point cocok dengan cluster-nya dibandingkan dengan cluster lain.
     - **Nilai mendekati +1**: Data sangat cocok dengan cluster-nya
     - **Nilai mendekati 0**: Data berada di perbatasan antar cluster
     - **Nilai negatif**: Data mungkin salah ditempatkan ke cluster yang salah
     """)
-    
+
     # Hitung jumlah cluster yang valid (tanpa noise)
-    if result['metode'] == 'DBSCAN':
-        n_clusters_valid = result['n_clusters']
-        cluster_labels = df['cluster'].values
+    if request.metode == constants.DBSCAN_METHOD:
+        n_clusters_valid = clustering.n_clusters
     else:
-        n_clusters_valid = result['k']
-        cluster_labels = df['cluster'].values
-    
+        n_clusters_valid = request.k
+    cluster_labels = clustering.labels
+
     # Plot silhouette hanya jika ada cluster valid
     if n_clusters_valid >= 2:
-        fig_silhouette = plot_silhouette_analysis(
-            result['X_scaled'], 
-            cluster_labels, 
+        stage_start = time.perf_counter()
+        png_silhouette = figures.cached_png(result['figure_key'], "silhouette", lambda: plot_silhouette_analysis(
+            clustering.X_scaled,
+            cluster_labels,
             n_clusters_valid
-        )
-        if fig_silhouette:
-            st.pyplot(fig_silhouette)
-            
+        ))
+        if png_silhouette:
+            st.image(png_silhouette, width="stretch")
+            metrics.observe("render.silhouette_plot", time.perf_counter() - stage_start)
+
             # Interpretasi hasil
-            if result['metode'] == 'K-Medoids':
-                avg_score = result['score']
-            else:
-                # Untuk DBSCAN, hitung ulang atau ambil dari string
-                if isinstance(result['score'], str):
-                    if result['score'] != "N/A (butuh > 1 cluster)" and result['score'] != "Null":
-                        avg_score = float(result['score'])
-                    else:
-                        avg_score = None
-                else:
-                    avg_score = result['score']
-            
-            if avg_score is not None and isinstance(avg_score, (int, float)):
+            avg_score = clustering.score
+
+            if avg_score is not None:
                 st.markdown("### 📊 Interpretasi Silhouette Score:")
                 if avg_score >= 0.7:
                     st.success(f"✅ **Excellent** ({avg_score:.3f}): Struktur cluster sangat kuat dan jelas")
@@ -746,136 +680,193 @@ if st.session_state.clustering_result is not None:
                     st.warning(f"⚠️ **Fair** ({avg_score:.3f}): Struktur cluster lemah, overlap mungkin terjadi")
                 else:
                     st.error(f"❌ **Poor** ({avg_score:.3f}): Tidak ada struktur cluster substansial")
-                
+
                 st.info("💡 **Tips:** Jika silhouette score rendah, coba ubah jumlah cluster atau parameter clustering")
     else:
         st.warning("⚠️ Tidak cukup cluster untuk membuat analisis silhouette (minimal 2 cluster)")
-    
-    # Peta Clustering
-    if st.session_state.geojson_data is not None:
-        st.divider()
-        st.subheader("🗺️ Visualisasi Peta Clustering")
-        cluster_map = create_cluster_map(df, st.session_state.geojson_data, result['metode'])
-        st_folium(cluster_map, width=800, height=600)
-    
+
+
+def map_section():
+    """Peta clustering; geser / zoom peta berjalan di browser tanpa rerun"""
+    import streamlit.components.v1 as components
+
+    from core import kecamatan, maps
+
+    result = st.session_state.clustering_result
+    if result is None or st.session_state.geometry_key is None:
+        return
+    clustering = result['clustering']
+
+    st.divider()
+    st.subheader("🗺️ Visualisasi Peta Clustering")
+    geometry_store = get_shared_store(st.session_state.geometry_key)
+    kecamatan_index = kecamatan.get_index(st.session_state.geometry_key)
+    # Geometri dikirim sekali sebagai file statis (di-cache browser); tanpa
+    # static serving geometri ikut di-embed di HTML peta
+    geometry_url = None
+    if st.get_option("server.enableStaticServing"):
+        geometry_url = maps.export_geometry(geometry_store)
+    with metrics.stage("render.map_build"):
+        map_html = maps.cached_map_html(
+            (result['figure_key'], geometry_url),
+            lambda: maps.build_cluster_map(
+                clustering.df, geometry_store, kecamatan_index, clustering.request.metode, geometry_url=geometry_url
+            )
+        )
+    with metrics.stage("render.map_folium"):
+        components.html(map_html, width=800, height=600)
+
+
+@st.fragment
+def table_section():
+    """Tabel hasil clustering per wilayah; saring kategori / urutkan tanpa rerun halaman"""
+    result = st.session_state.clustering_result
+    if result is None:
+        return
+    df = result['clustering'].df
+
     # Tampilkan tabel hasil dengan kategori
     st.divider()
     st.subheader("📋 Hasil Clustering per Wilayah")
-    
+
     # Hanya tambahkan kolom jika ada di dataframe (untuk Per Tahun vs Total)
     all_cols = ["kecamatan", "cluster", "kategori"]
     for col in ["jumlah_jiwa", "jumlah_disabilitas", "jumlah_lansia"]:
         if col in df.columns:
             all_cols.append(col)
-            
+
     # Pastikan urutan benar
     ordered_cols = ["kecamatan"]
     if "jumlah_jiwa" in all_cols: ordered_cols.append("jumlah_jiwa")
     if "jumlah_disabilitas" in all_cols: ordered_cols.append("jumlah_disabilitas")
     if "jumlah_lansia" in all_cols: ordered_cols.append("jumlah_lansia")
     ordered_cols.extend(["cluster", "kategori"])
-    
-    st.dataframe(df[ordered_cols].sort_values("cluster"), use_container_width=True)
-    
-    # Visualisasi distribusi kategori
-    st.divider()
-    st.subheader("📊 Distribusi Kategori")
+
+    # Key memuat figure_key agar pilihan kembali ke awal untuk hasil baru
     col1, col2 = st.columns(2)
-    
     with col1:
-        kategori_counts = df['kategori'].value_counts().sort_index()
-        fig_bar, ax_bar = plt.subplots(figsize=(8, 5))
-        kategori_counts.plot(kind='bar', ax=ax_bar, color='steelblue')
-        ax_bar.set_xlabel("Kategori", fontsize=12)
-        ax_bar.set_ylabel("Jumlah Kecamatan", fontsize=12)
-        ax_bar.set_title("Distribusi Kecamatan per Cluster", fontsize=14, fontweight='bold')
-        ax_bar.tick_params(axis='x', rotation=45)
-        plt.tight_layout()
-        st.pyplot(fig_bar)
-    
+        kategori_options = sorted(df['kategori'].unique())
+        kategori_selected = st.multiselect(
+            "Saring Kategori",
+            options=kategori_options,
+            default=kategori_options,
+            key=f"table_kategori:{result['figure_key']}"
+        )
     with col2:
-        fig_pie, ax_pie = plt.subplots(figsize=(8, 5))
-        kategori_counts.plot(kind='pie', ax=ax_pie, autopct='%1.1f%%', startangle=90)
-        ax_pie.set_ylabel("")
-        ax_pie.set_title("Proporsi Cluster", fontsize=14, fontweight='bold')
-        st.pyplot(fig_pie)
-    
+        sort_col = st.selectbox(
+            "Urutkan Berdasarkan",
+            options=ordered_cols,
+            index=ordered_cols.index("cluster"),
+            key=f"table_sort:{result['figure_key']}"
+        )
+
+    table = df.loc[df['kategori'].isin(kategori_selected), ordered_cols]
+    st.dataframe(table.sort_values(sort_col), use_container_width=True)
+
+
+@st.fragment
+def distribution_section():
+    """Grafik batang dan/atau pie distribusi kategori; ganti tampilan tanpa rerun halaman"""
+    from core import figures
+
+    result = st.session_state.clustering_result
+    if result is None:
+        return
+    df = result['clustering'].df
+
+    # Visualisasi distribusi kategori
+    st.divider()
+    st.subheader("📊 Distribusi Kategori")
+    tampilan = st.radio(
+        "Tampilan Grafik",
+        options=["Batang & Pie", "Batang", "Pie"],
+        horizontal=True,
+        key="distribution_view"
+    )
+
+    stage_start = time.perf_counter()
+    kategori_counts = df['kategori'].value_counts().sort_index()
+    charts = []
+    if tampilan != "Pie":
+        charts.append(("distribution_bar", plot_distribution_bar))
+    if tampilan != "Batang":
+        charts.append(("distribution_pie", plot_distribution_pie))
+
+    for col, (name, plot) in zip(st.columns(len(charts)), charts):
+        with col:
+            st.image(
+                figures.cached_png(result['figure_key'], name, lambda: plot(kategori_counts)),
+                width="stretch"
+            )
+    metrics.observe("render.distribution_plot", time.perf_counter() - stage_start)
+
+
+def pca_section(rentang_tahun):
+    """Scatter PCA 2D dan variance yang dijelaskan"""
+    from core import figures
+
+    result = st.session_state.clustering_result
+    if result is None:
+        return
+    clustering = result['clustering']
+
     # Visualisasi dengan PCA
     st.divider()
     st.subheader("📍 Visualisasi PCA 2D")
-    
-    pca = PCA(n_components=2)
-    X_pca = pca.fit_transform(result['X_scaled'])
-    
-    colors = ['#e41a1c', '#377eb8', '#4daf4a', '#984ea3', '#ff7f00', 
-              '#ffff33', '#a65628', '#f781bf', '#999999', '#66c2a5']
-    
-    unique_clusters = sorted(df['cluster'].unique())
-    
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    for cluster_id in unique_clusters:
-        mask = df['cluster'] == cluster_id
-        if cluster_id == -1:
-            ax.scatter(
-                X_pca[mask, 0], 
-                X_pca[mask, 1], 
-                c='#333333', 
-                s=100, 
-                alpha=0.6, 
-                edgecolors='black',
-                linewidths=0.5,
-                label='Noise/Outlier'
-            )
-        else:
-            kategori = df[mask]['kategori'].iloc[0]
-            ax.scatter(
-                X_pca[mask, 0], 
-                X_pca[mask, 1], 
-                c=colors[cluster_id % len(colors)], 
-                s=100, 
-                alpha=0.6,
-                edgecolors='black',
-                linewidths=0.5,
-                label=f'{kategori} (Cluster {cluster_id})'
-            )
-    
-    if result['metode'] == 'K-Medoids':
-        medoids_pca = pca.transform(result['kmedoids'].cluster_centers_)
-        ax.scatter(
-            medoids_pca[:,0], 
-            medoids_pca[:,1],
-            c="red", 
-            marker="X", 
-            s=300, 
-            edgecolors='black', 
-            linewidths=2, 
-            label="Medoids",
-            zorder=5
-        )
-    
-    ax.set_xlabel("PCA Component 1", fontsize=12)
-    ax.set_ylabel("PCA Component 2", fontsize=12)
-    
-    if result['tipe_data'] == 'Total (Agregasi)':
-        title_tahun = "Total (Agregasi 2018-2025)"
-    else:
-        title_tahun = f"Tahun {result['tahun']}"
-    
-    if result['metode'] == 'K-Medoids':
-        ax.set_title(f"K-Medoids Clustering (k={result['k']}, {title_tahun})", 
-                     fontsize=14, fontweight='bold')
-    else:
-        ax.set_title(f"DBSCAN Clustering (ε={result['epsilon']}, MinPts={result['min_pts']}, {title_tahun})", 
-                     fontsize=14, fontweight='bold')
-    
-    ax.grid(True, alpha=0.3)
-    ax.legend(loc='best', fontsize=9, framealpha=0.9)
-    plt.tight_layout()
-    st.pyplot(fig)
-    
+
+    stage_start = time.perf_counter()
+    # Judul grafik Total memuat rentang tahun, jadi ikut menjadi bagian key
+    png_pca = figures.cached_png(result['figure_key'], f"pca:{rentang_tahun}", lambda: plot_pca(clustering, rentang_tahun))
+    st.image(png_pca, width="stretch")
+    metrics.observe("render.pca_plot", time.perf_counter() - stage_start)
+
     # Informasi variance explained oleh PCA
-    st.caption(f"💡 PCA Component 1 menjelaskan {pca.explained_variance_ratio_[0]*100:.1f}% variance, "
-               f"Component 2 menjelaskan {pca.explained_variance_ratio_[1]*100:.1f}% variance")
+    st.caption(f"💡 PCA Component 1 menjelaskan {clustering.pca_explained_variance[0]*100:.1f}% variance, "
+               f"Component 2 menjelaskan {clustering.pca_explained_variance[1]*100:.1f}% variance")
+
+
+# Pemetaan
+
+geojson_path = os.path.join("KECAMATAN.geojson")
+
+# Geometri dibaca dari store .npz ringkas yang dipakai bersama oleh semua sesi.
+# Session state hanya menyimpan handle (path), bukan salinan geometri.
+if st.session_state.geometry_key is None:
+    if os.path.exists(geojson_path) or os.path.exists(store_path_for(geojson_path)):
+        st.session_state.geometry_key = geojson_path
+
+# Durasi setiap tahap rerun ini dicatat (panel Performa di BERANDA, ekspor Prometheus)
+metrics.start_trace("CLUSTERING")
+# Profil rerun ini jika admin memintanya (tombol di BERANDA atau ?profile=1)
+profile_capture = profiling.start("CLUSTERING", user_type, st.session_state, st.query_params)
+current_params = None
+data_hash = None
+
+# finally: st.rerun() di parameter_section (mis. klik Jalankan) mengakhiri script
+# lebih awal, tetapi profil dan trace rerun ini tetap dihentikan dan dicatat
+try:
+    list_tahun = list_years()
+    rentang_tahun = f"{list_tahun[0]}-{list_tahun[-1]}" if list_tahun else "-"
+
+    parameter_section(list_tahun, rentang_tahun)
+    current_params = st.session_state.get("cluster_params")
+
+    # Klik Jalankan di parameter_section: baca data dan jalankan clustering
+    if st.session_state.pop("run_requested", False) and current_params is not None:
+        data_hash = run_clustering(current_params)
+
+    # TAMPILKAN HASIL dari session state
+    if st.session_state.clustering_result is not None:
+        result_summary_section()
+        silhouette_section()
+        map_section()
+        table_section()
+        distribution_section()
+        pca_section(rentang_tahun)
+finally:
+    profile_name = profiling.finish(profile_capture, st.session_state, params=current_params, data_version=data_hash)
+    if profile_name:
+        st.caption(f"🔬 Profil tersimpan: {profile_name} (unduh dari panel Profil di BERANDA)")
+    metrics.finish_trace()
 
 show_footer()
\ No newline at end of file
@@ -1,13 +1,8 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.decomposition import PCA
-from sklearn.metrics import silhouette_score
-from sklearn_extra.cluster import KMedoids
-import psycopg2
-from sqlalchemy import create_engine
-import toml
+import numpy as np
+from core import db, ingest, invalidation, kecamatan, metrics, profiling, snapshot, versioning
+from core.backend import get_backend
 
 # Hide sidebar if guest
 user_type = st.session_state.get("user_type")
@@ -24,6 +19,15 @@ st.set_page_config(
     page_icon="📤",
 )
 
+@st.cache_data(ttl=600, show_spinner=False)
+def get_available_years():
+    """Daftar tahun yang tersedia di backend penyimpanan (sama seperti di CLUSTERING)"""
+    return get_backend().available_years()
+
+
+invalidation.subscribe("data.get_available_years", lambda scope: get_available_years.clear())
+
+
 def show_footer():
     st.markdown("""
     <hr style='margin: 0.5rem 0;'>
@@ -39,12 +43,8 @@ with st._main:
     
     # ===== LOAD DATABASE CONFIGURATION FROM secrets.toml =====
     try:
-        secrets = toml.load(".streamlit/secrets.toml")
-        db_host = secrets["database"]["db_host"]
-        db_port = secrets["database"]["db_port"]
-        db_name = secrets["database"]["db_name"]
-        db_user = secrets["database"]["db_user"]
-        db_password = secrets["database"]["db_password"]
+        db.load_config()
+        tahun_tersedia = get_available_years()
     except FileNotFoundError:
         st.error("❌ File secrets.toml tidak ditemukan di folder .streamlit/")
         st.info("💡 Pastikan file secrets.toml ada di .streamlit/secrets.toml")
@@ -52,8 +52,18 @@ with st._main:
     except KeyError as e:
         st.error(f"❌ Konfigurasi database tidak lengkap di secrets.toml: {e}")
         st.stop()
+    except Exception as e:
+        st.error(f"❌ Gagal membaca daftar tahun dari database: {str(e)}")
+        st.info("💡 Periksa koneksi database lalu muat ulang halaman")
+        st.stop()
     # =========================================================
     
+    # Dimulai setelah konfigurasi terbaca: st.stop() di atas tidak meninggalkan profil terbuka
+    # Durasi baca / validasi / tulis dicatat (panel Performa di BERANDA, ekspor Prometheus)
+    metrics.start_trace("DATA")
+    # Profil rerun ini jika admin memintanya (tombol di BERANDA atau ?profile=1)
+    profile_capture = profiling.start("DATA", user_type, st.session_state, st.query_params)
+    
     # Upload data section
     st.header("Upload & Update Data")
     st.caption("Upload file untuk update data kecamatan di database")
@@ -63,6 +73,7 @@ with st._main:
     ### 📋 Informasi Penting
     - ✅ File harus berisi **tepat 44 baris data kecamatan**
     - ✅ Nama kecamatan harus **valid dan sesuai** dengan database
+    - ✅ Workbook dengan **satu sheet per tahun** (nama sheet = tahun, misalnya 2018) di-upload sekaligus
     - ⚠️ **Hati-hati!** Data akan langsung **diupdate ke database**
     - 📥 Download template di bawah sebagai contoh format yang benar
     """)
@@ -86,80 +97,78 @@ with st._main:
     
     upload_tahun = st.selectbox(
         "Tahun Target",
-        options=list(range(2018, 2026)),
-        key="upload_tahun"
+        options=tahun_tersedia,
+        key="upload_tahun",
+        help="Dipakai untuk file satu sheet / CSV tanpa kolom tahun"
     )
     
     uploaded_file = st.file_uploader(
-        "Pilih File Excel/CSV",
-        type=["xlsx", "xls", "csv"],
-        help="File harus memiliki 44 baris kecamatan dengan header yang sama"
+        "Pilih File Excel/CSV/Parquet",
+        type=["xlsx", "xls", "csv", "parquet"],
+        help="File harus memiliki 44 baris kecamatan dengan header yang sama. "
+             "Workbook dengan satu sheet per tahun (nama sheet = tahun) di-upload sekaligus."
     )
     
     if uploaded_file is not None:
         try:
-            # Baca file yang diupload
-            if uploaded_file.name.endswith('.csv'):
-                df_upload = pd.read_csv(uploaded_file)
-            else:
-                df_upload = pd.read_excel(uploaded_file)
+            # Baca file yang diupload (Excel dibaca streaming, bisa banyak sheet/tahun)
+            with metrics.stage("upload.read"):
+                sheets = ingest.read_upload(uploaded_file, upload_tahun)
             
-            # Replace NaN dengan None
-            df_upload = df_upload.where(pd.notna(df_upload), None)
+            tahun_list = sorted(sheets)
+            total_baris = sum(len(df) for df in sheets.values())
+            unknown_years = sorted(set(tahun_list) - set(tahun_tersedia))
             
-            st.success(f"✅ File berhasil dibaca: {len(df_upload)} baris")
+            if sheets:
+                st.success(f"✅ File berhasil dibaca: {total_baris} baris, tahun {', '.join(map(str, tahun_list))}")
             
-            # Validasi jumlah baris
-            if len(df_upload) != 44:
-                st.error(f"❌ Jumlah baris tidak sesuai! Ditemukan: {len(df_upload)}, Expected: 44")
+            if not sheets:
+                st.error("❌ Tidak ada sheet yang bisa dibaca. Beri nama sheet sesuai tahun, misalnya 2018.")
+            elif unknown_years:
+                st.error(f"❌ Tahun tidak ada di database: {', '.join(map(str, unknown_years))}")
             else:
-                # Validasi kolom yang diperlukan
-                required_cols = ["kecamatan", "jumlah_rw_terdampak", "jumlah_kk_terdampak", 
-                                 "jumlah_jiwa_terdampak", "rata_ketinggian_air", "ketinggian_air_max",
-                                 "jumlah_jiwa", "jumlah_disabilitas", "jumlah_lansia"]
-                
-                missing_cols = [col for col in required_cols if col not in df_upload.columns]
-                
-                if missing_cols:
-                    st.error(f"❌ Kolom tidak lengkap!")
-                    st.write("Kolom yang hilang:", missing_cols)
-                    st.write("Kolom yang ada:", df_upload.columns.tolist())
-                else:
-                    # === VALIDASI NAMA KECAMATAN ===
-                    conn = None
-                    engine = None
-                    try:
-                        # Koneksi ke database untuk ambil daftar kecamatan valid
-                        if db_password:
-                            connection_string = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-                        else:
-                            connection_string = f"postgresql://{db_user}@{db_host}:{db_port}/{db_name}"
+                # === VALIDASI PER TAHUN ===
+                try:
+                    kecamatan_index = kecamatan.get_index()
+                    validations = {}
+                    
+                    for tahun in tahun_list:
+                        df_upload = sheets[tahun]
+                        
+                        if len(tahun_list) > 1:
+                            st.subheader(f"📅 Tahun {tahun}")
                         
-                        engine = create_engine(connection_string)
-                        table_name = f"kejadian_{upload_tahun}"
+                        # Ambil daftar kode kecamatan yang ada di database (index kode_kec)
+                        with metrics.stage("upload.validate"):
+                            valid_codes = get_backend().valid_codes(tahun)
+                            validation = ingest.validate(df_upload, valid_codes, kecamatan_index)
+                        validation['valid_codes'] = valid_codes
+                        validations[tahun] = validation
                         
-                        # Ambil daftar kecamatan yang ada di database
-                        query_kecamatan = f"SELECT DISTINCT UPPER(TRIM(kecamatan)) as kecamatan FROM {table_name} ORDER BY kecamatan"
-                        df_valid_kecamatan = pd.read_sql(query_kecamatan, engine)
-                        valid_kecamatan_list = df_valid_kecamatan['kecamatan'].tolist()
+                        # Validasi jumlah baris
+                        if not validation['row_count_ok']:
+                            st.error(f"❌ Jumlah baris tidak sesuai! Ditemukan: {validation['rows']}, Expected: {ingest.EXPECTED_ROWS}")
+                            continue
                         
-                        # Normalisasi nama kecamatan dari upload
-                        df_upload['kecamatan_normalized'] = df_upload['kecamatan'].str.strip().str.upper()
-                        upload_kecamatan_list = df_upload['kecamatan_normalized'].tolist()
+                        # Validasi kolom yang diperlukan
+                        if validation['missing_columns']:
+                            st.error(f"❌ Kolom tidak lengkap!")
+                            st.write("Kolom yang hilang:", validation['missing_columns'])
+                            st.write("Kolom yang ada:", df_upload.columns.tolist())
+                            continue
                         
-                        # Cek kecamatan yang tidak valid
-                        invalid_kecamatan = [k for k in upload_kecamatan_list if k not in valid_kecamatan_list]
-                        missing_kecamatan = [k for k in valid_kecamatan_list if k not in upload_kecamatan_list]
+                        invalid_kecamatan = validation['invalid']
+                        missing_kecamatan = validation['missing']
                         
                         # Tampilkan hasil validasi
                         col1, col2 = st.columns(2)
                         
                         with col1:
-                            st.metric("📋 Total Kecamatan di Upload", len(upload_kecamatan_list))
-                            st.metric("✅ Kecamatan Valid", len([k for k in upload_kecamatan_list if k in valid_kecamatan_list]))
+                            st.metric("📋 Total Kecamatan di Upload", validation['rows'])
+                            st.metric("✅ Kecamatan Valid", int(validation['is_valid'].sum()))
                         
                         with col2:
-                            st.metric("🗂️ Total Kecamatan di Database", len(valid_kecamatan_list))
+                            st.metric("🗂️ Total Kecamatan di Database", len(validation['valid_names']))
                             st.metric("❌ Kecamatan Invalid", len(invalid_kecamatan))
                         
                         # Warning untuk kecamatan invalid
@@ -176,6 +185,11 @@ with st._main:
                                 st.write(missing_kecamatan)
                                 st.info("💡 Data kecamatan ini tidak akan diubah (tetap seperti semula)")
                         
+                        # Warning untuk nilai yang bukan angka (akan disimpan sebagai kosong)
+                        if validation['bad_values']:
+                            st.warning("⚠️ Ada nilai yang bukan angka, akan disimpan sebagai kosong (NULL):")
+                            st.write(validation['bad_values'])
+                        
                         # Jika semua valid, tampilkan success
                         if not invalid_kecamatan and not missing_kecamatan:
                             st.success("✅ Semua nama kecamatan valid dan lengkap!")
@@ -183,171 +197,85 @@ with st._main:
                         # Preview data dengan status validasi
                         with st.expander("👀 Preview Data Upload (dengan Status Validasi)"):
                             df_preview = df_upload.copy()
-                            df_preview['Status'] = df_preview['kecamatan_normalized'].apply(
-                                lambda x: '✅ Valid' if x in valid_kecamatan_list else '❌ Invalid'
-                            )
+                            df_preview['Status'] = np.where(validation['is_valid'], '✅ Valid', '❌ Invalid')
                             st.dataframe(df_preview[['kecamatan', 'Status', 'jumlah_rw_terdampak', 
                                                      'jumlah_kk_terdampak', 'jumlah_jiwa_terdampak']])
-                        
-                        # Tombol untuk update (hanya aktif jika tidak ada invalid)
-                        if invalid_kecamatan:
-                            st.warning("⚠️ Perbaiki nama kecamatan yang invalid terlebih dahulu sebelum melakukan update!")
-                        else:
-                            if st.button("🔄 Update Database", type="primary"):
-                                conn = None
-                                try:
-                                    conn = engine.raw_connection()
-                                    cursor = conn.cursor()
-                                    
-                                    updated_count = 0
-                                    skipped_count = 0
-                                    update_details = []
-
-                                    # === FUNGSI HELPER ===
-                                    def to_int(val):
-                                        if val is None or pd.isna(val):
-                                            return None
-                                        try:
-                                            return int(float(val))
-                                        except (ValueError, TypeError):
-                                            return None
-                                        
-                                    def to_float(val):
-                                        if val is None or pd.isna(val):
-                                            return None
-                                        try:
-                                            return float(val)
-                                        except (ValueError, TypeError):
-                                            return None
-                                    
-                                    with st.spinner(f"🔄 Updating data ke tabel {table_name}..."):
-                                        progress_bar = st.progress(0)
-                                        total_rows = len(df_upload)
-                                        
-                                        for idx, row in df_upload.iterrows():
-                                            kecamatan_name = str(row['kecamatan']).strip().upper()
-                                            
-                                            # Skip jika kecamatan tidak valid
-                                            if kecamatan_name not in valid_kecamatan_list:
-                                                skipped_count += 1
-                                                update_details.append({
-                                                    'Kecamatan': row['kecamatan'],
-                                                    'Status': '⏭️ Skipped',
-                                                    'Reason': 'Tidak ditemukan di database'
-                                                })
-                                                continue
-                                            
-                                            # UPDATE query
-                                            update_query = f"""
-                                            UPDATE {table_name}
-                                            SET 
-                                                jumlah_rw_terdampak = %s,
-                                                jumlah_kk_terdampak = %s,
-                                                jumlah_jiwa_terdampak = %s,
-                                                rata_ketinggian_air = %s,
-                                                ketinggian_air_max = %s,
-                                                jumlah_jiwa = %s,
-                                                jumlah_disabilitas = %s,
-                                                jumlah_lansia = %s
-                                            WHERE UPPER(TRIM(kecamatan)) = %s
-                                            """
-                                            
-                                            cursor.execute(update_query, (
-                                                to_int(row['jumlah_rw_terdampak']),
-                                                to_int(row['jumlah_kk_terdampak']),
-                                                to_int(row['jumlah_jiwa_terdampak']),
-                                                to_float(row['rata_ketinggian_air']),
-                                                to_float(row['ketinggian_air_max']),
-                                                to_int(row['jumlah_jiwa']),
-                                                to_int(row['jumlah_disabilitas']),
-                                                to_int(row['jumlah_lansia']),
-                                                kecamatan_name
-                                            ))
-                                            
-                                            if cursor.rowcount > 0:
-                                                updated_count += cursor.rowcount
-                                                update_details.append({
-                                                    'Kecamatan': row['kecamatan'],
-                                                    'Status': '✅ Updated',
-                                                    'Reason': f'{cursor.rowcount} row(s) affected'
-                                                })
-                                            else:
-                                                update_details.append({
-                                                    'Kecamatan': row['kecamatan'],
-                                                    'Status': '⚠️ Not Updated',
-                                                    'Reason': 'Tidak ada perubahan atau kecamatan tidak ditemukan'
-                                                })
-                                            
-                                            # Update progress bar
-                                            progress_bar.progress((idx + 1) / total_rows)
-                                        
-                                        conn.commit()
-                                        progress_bar.empty()
-                                    
-                                    cursor.close()
-                                    conn.close()
-                                    
-                                    # === TAMPILKAN HASIL UPDATE ===
-                                    st.success(f"🎉 Proses Update Selesai!")
-                                    
-                                    col1, col2, col3 = st.columns(3)
-                                    with col1:
-                                        st.metric("✅ Berhasil Update", updated_count, delta="rows")
-                                    with col2:
-                                        st.metric("⏭️ Skipped", skipped_count, delta="rows")
-                                    with col3:
-                                        st.metric("📊 Total Diproses", len(df_upload), delta="rows")
-                                    
-                                    # Detail hasil update
-                                    with st.expander("📋 Detail Hasil Update per Kecamatan"):
-                                        df_details = pd.DataFrame(update_details)
-                                        st.dataframe(df_details, use_container_width=True)
-                                    
-                                    # Download laporan update
-                                    csv_report = df_details.to_csv(index=False).encode('utf-8')
-                                    st.download_button(
-                                        label="📥 Download Laporan Update",
-                                        data=csv_report,
-                                        file_name=f"laporan_update_{table_name}.csv",
-                                        mime="text/csv"
+                    
+                    # Tombol untuk update (hanya aktif jika semua tahun valid)
+                    if not all(ingest.is_ready(v) for v in validations.values()):
+                        st.warning("⚠️ Perbaiki data yang invalid terlebih dahulu sebelum melakukan update!")
+                    else:
+                        if st.button("🔄 Update Database", type="primary"):
+                            try:
+                                with st.spinner(f"🔄 Updating data tahun {', '.join(map(str, tahun_list))}..."), metrics.stage("upload.write"):
+                                    # Semua tahun ditulis dalam satu transaksi; per tahun hanya
+                                    # baris yang berubah (beda row_hash). Ringkasan Total dan
+                                    # versi data diperbarui di transaksi yang sama (core.backend)
+                                    results = get_backend().apply_upload(
+                                        sheets, {tahun: validations[tahun]['valid_codes'] for tahun in tahun_list}
                                     )
+                                
+                                changed_years = [tahun for tahun in tahun_list if results[tahun]['changed']]
+                                updated_count = sum(len(r['changed']) for r in results.values())
+                                update_details = [
+                                    dict(Tahun=tahun, **detail)
+                                    for tahun in tahun_list for detail in results[tahun]['details']
+                                ]
+                                
+                                # === TAMPILKAN HASIL UPDATE ===
+                                st.success(f"🎉 Proses Update Selesai!")
+                                
+                                col1, col2, col3, col4 = st.columns(4)
+                                with col1:
+                                    st.metric("✅ Berubah", updated_count, delta="rows")
+                                with col2:
+                                    st.metric("➖ Tidak Berubah", sum(r['unchanged'] for r in results.values()), delta="rows")
+                                with col3:
+                                    st.metric("⏭️ Skipped", sum(r['skipped'] for r in results.values()), delta="rows")
+                                with col4:
+                                    st.metric("📊 Total Diproses", total_baris, delta="rows")
+                                
+                                # Detail hasil update
+                                with st.expander("📋 Detail Hasil Update per Kecamatan"):
+                                    df_details = pd.DataFrame(update_details)
+                                    st.dataframe(df_details, use_container_width=True)
+                                
+                                # Download laporan update
+                                csv_report = df_details.to_csv(index=False).encode('utf-8')
+                                st.download_button(
+                                    label="📥 Download Laporan Update",
+                                    data=csv_report,
+                                    file_name=f"laporan_update_kejadian_{'_'.join(map(str, tahun_list))}.csv",
+                                    mime="text/csv"
+                                )
+                                
+                                if updated_count == 0:
+                                    st.info("💡 Tidak ada data yang berubah. Database dan cache tidak diubah.")
+                                
+                                if updated_count > 0:
+                                    st.balloons()
                                     
-                                    if updated_count > 0:
-                                        st.balloons()
-                                        
-                                        st.info(f"💡 Membersihkan cache untuk tahun {upload_tahun} dan Total (Agregasi)...")
-                                        
-                                        # Import fungsi dari CLUSTERING.py
-                                        # Karena cache adalah global di Streamlit, cukup clear langsung
-                                        try:
-                                            # ✅ Clear cache untuk load_data dan get_data_hash
-                                            from pages import CLUSTERING  # Sesuaikan dengan struktur folder Anda
-                                            
-                                            # Clear cache functions
-                                            if hasattr(CLUSTERING, 'load_data'):
-                                                CLUSTERING.load_data.clear()
-                                            if hasattr(CLUSTERING, 'get_data_hash'):
-                                                CLUSTERING.get_data_hash.clear()
-                                            
-                                            st.success(f"✅ Cache telah dibersihkan. Data terbaru akan diambil saat clustering berikutnya.")
-                                        except:
-                                            # Jika import gagal (struktur folder berbeda), gunakan clear manual
-                                            # Cache akan auto-refresh karena checksum berubah
-                                            st.success(f"✅ Data berhasil diupdate. Cache akan otomatis ter-refresh berdasarkan checksum database.")
+                                    st.info(f"💡 Membersihkan cache untuk tahun {', '.join(map(str, changed_years))} dan Total (Agregasi)...")
                                     
-                                except Exception as e:
-                                    st.error(f"❌ Gagal update database: {str(e)}")
-                                    if conn:
-                                        conn.rollback()
-                                finally:
-                                    if conn:
-                                        conn.close()
-                        
-                    except Exception as e:
-                        st.error(f"❌ Gagal validasi kecamatan: {str(e)}")
-                    finally:
-                        if engine:
-                            engine.dispose()
+                                    # Hanya key cache tahun yang berubah + Total yang dihapus;
+                                    # proses aplikasi lain menerima perubahan yang sama lewat NOTIFY
+                                    changed_scopes = [versioning.scope_for("Per Tahun", tahun) for tahun in changed_years]
+                                    with metrics.stage("upload.invalidate"):
+                                        invalidation.publish(*changed_scopes)
+                                    st.success(f"✅ Cache telah dibersihkan. Data terbaru akan diambil saat clustering berikutnya.")
+                                    
+                                    # Perbarui snapshot lokal untuk tahun yang berubah
+                                    try:
+                                        with metrics.stage("upload.snapshot_export"):
+                                            snapshot.export(changed_scopes)
+                                    except Exception as e:
+                                        st.warning(f"⚠️ Snapshot lokal gagal diperbarui: {str(e)}. Data tetap dibaca dari database.")
+                                
+                            except Exception as e:
+                                st.error(f"❌ Gagal update database: {str(e)}")
+                    
+                except Exception as e:
+                    st.error(f"❌ Gagal validasi kecamatan: {str(e)}")
                             
         except Exception as e:
             st.error(f"❌ Gagal membaca file: {str(e)}")
@@ -355,3 +283,15 @@ with st._main:
         st.divider()
         show_footer()
 
+profile_name = profiling.finish(
+    profile_capture, st.session_state,
+    params={"upload_tahun": upload_tahun, "file": getattr(uploaded_file, "name", None)},
+    data_version=lambda: {
+        tahun: get_backend().get_version(versioning.scope_for("Per Tahun", tahun))
+        for tahun in tahun_tersedia
+    },
+)
+if profile_name:
+    st.caption(f"🔬 Profil tersimpan: {profile_name} (unduh dari panel Profil di BERANDA)")
+
+metrics.finish_trace()
@@ -0,0 +1,33 @@
+import pytest
+
+from core import db
+
+
+class FakeIndex:
+    """Pengganti KecamatanIndex untuk load_years: hanya rows() yang dipakai"""
+
+    def __init__(self, names):
+        self.names = names
+
+    def rows(self):
+        return [(kode, nama, nama, "KOTA") for kode, nama in self.names.items()]
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path):
+    """SQLiteBackend di file sementara; konfigurasi database dikembalikan sesudahnya"""
+    from core.backend import get_backend
+
+    secrets = tmp_path / "secrets.toml"
+    secrets.write_text(
+        "[database]\n"
+        f'connection_string = "sqlite:///{tmp_path}/test.sqlite"\n'
+        f'snapshot_dir = "{tmp_path}/snapshots"\n'
+        "warm_up = false\n"
+    )
+    original = db.SECRETS_PATH
+    db.configure(str(secrets))
+    try:
+        yield get_backend()
+    finally:
+        db.configure(original)
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import aggregate, schema, upload, versioning
+from tests.conftest import FakeIndex
+
+NAMES = {"K01": "ALPHA", "K02": "BETA", "K03": "GAMMA"}
+
+
+def year_frame(rows):
+    """rows: {kode: (rw, kk, jiwa_terdampak, rata, max, jiwa, disabilitas, lansia)}"""
+    df = pd.DataFrame(
+        [(kode, NAMES[kode], *values) for kode, values in rows.items()],
+        columns=[schema.KEY_COLUMN] + schema.DATA_COLUMNS,
+    )
+    df[upload.HASH_COLUMN] = 0
+    return df
+
+
+@pytest.fixture
+def frames():
+    return {
+        2019: year_frame({
+            "K01": (1, 10, 100, 0.5, 1.0, 1000, 10, 100),
+            "K02": (2, 20, 200, None, 2.0, 2000, 20, 200),
+        }),
+        2020: year_frame({
+            "K01": (3, 30, None, 1.5, 3.0, 1100, 11, 110),
+            "K02": (None, None, None, None, None, 2100, 21, 210),
+            "K03": (5, 50, 500, 2.5, 0.5, 3100, 31, 310),
+        }),
+    }
+
+
+def test_total_sums_averages_and_maxes_per_code(frames):
+    total = aggregate.total_from_frames(frames, demographics_year=2020).set_index("kode_kec")
+
+    assert list(total.index) == ["K01", "K02", "K03"]
+    assert total.loc["K01", ["jumlah_rw_terdampak", "jumlah_kk_terdampak", "jumlah_jiwa_terdampak"]].tolist() == [4, 40, 100]
+    assert total.loc["K01", "rata_ketinggian_air"] == pytest.approx(1.0)
+    assert total.loc["K01", "ketinggian_air_max"] == 3.0
+    # NULL diabaikan; kecamatan tanpa nilai sama sekali menjadi 0
+    assert total.loc["K02", ["jumlah_rw_terdampak", "jumlah_jiwa_terdampak", "rata_ketinggian_air"]].tolist() == [2, 200, 0]
+    assert total.loc["K03", "jumlah_rw_terdampak"] == 5
+
+
+def test_total_demographics_come_from_demographics_year_only(frames):
+    total = aggregate.total_from_frames(frames, demographics_year=2019).set_index("kode_kec")
+    assert total.loc["K01", ["jumlah_jiwa", "jumlah_disabilitas", "jumlah_lansia"]].tolist() == [1000, 10, 100]
+    # K03 tidak ada di tahun demografi
+    assert total.loc["K03", ["jumlah_jiwa", "jumlah_disabilitas", "jumlah_lansia"]].isna().all()
+
+    missing = aggregate.total_from_frames(frames, demographics_year=2030)
+    assert missing[["jumlah_jiwa", "jumlah_disabilitas", "jumlah_lansia"]].isna().all().all()
+
+
+def test_total_skips_rows_without_code(frames):
+    frames[2019].loc[len(frames[2019])] = [None, "TANPA KODE", 99, 99, 99, 9.0, 9.0, 1, 1, 1, 0]
+    total = aggregate.total_from_frames(frames, demographics_year=2020)
+    assert "TANPA KODE" not in set(total["kecamatan"])
+    assert list(total.columns) == [schema.KEY_COLUMN] + schema.DATA_COLUMNS
+
+
+def test_backend_total_matches_total_from_frames(sqlite_backend, frames):
+    sqlite_backend.load_years(frames, FakeIndex(NAMES), log=lambda message: None)
+
+    stored = {
+        tahun: sqlite_backend.fetch(versioning.scope_for("Per Tahun", tahun))
+        for tahun in sqlite_backend.available_years()
+    }
+    expected = aggregate.total_from_frames(stored)
+    actual = sqlite_backend.fetch(versioning.TOTAL_SCOPE)
+    pd.testing.assert_frame_equal(actual, expected)
+    assert np.isfinite(actual["jumlah_rw_terdampak"].astype(float)).all()
+
+
+def test_demographics_year_defaults_to_latest_year(frames):
+    assert aggregate.resolve_demographics_year([2019, 2020]) == 2020
+    assert aggregate.resolve_demographics_year([2019, 2020], configured=2019) == 2019
+    assert aggregate.resolve_demographics_year([]) is None
+
+    total = aggregate.total_from_frames(frames).set_index("kode_kec")
+    assert total.loc["K03", "jumlah_jiwa"] == 3100
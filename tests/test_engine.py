@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from core import engine
+
+
+def make_frame():
+    """Sembilan kecamatan dalam tiga kelompok yang terpisah jelas (rendah, sedang, tinggi)"""
+    levels = [1.0, 1.1, 1.2, 50.0, 51.0, 52.0, 100.0, 101.0, 102.0]
+    df = pd.DataFrame({"kecamatan": [f"KEC {i}" for i in range(len(levels))]})
+    for scale, col in enumerate(engine.FEATURE_COLUMNS, start=1):
+        df[col] = [level * scale for level in levels]
+    return df
+
+
+def test_import_does_not_load_database_stack():
+    # Proses baru: modul yang sudah dimuat test lain tidak ikut terhitung
+    code = "import sys, core.engine; print(sorted({'sqlalchemy', 'core.db', 'streamlit'} & set(sys.modules)))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "[]"
+
+
+def test_kmedoids_labels_categories_and_pca():
+    df = make_frame()
+    result = engine.run(engine.ClusteringRequest(metode=engine.KMEDOIDS, tahun=2019, k=3), df)
+
+    groups = [set(result.labels[i:i + 3]) for i in (0, 3, 6)]
+    assert all(len(group) == 1 for group in groups)
+    assert len(set.union(*groups)) == 3
+    assert result.n_clusters == 3
+    assert result.n_noise == 0
+
+    rendah, sedang, tinggi = (result.labels[i] for i in (0, 3, 6))
+    assert result.category_map == {
+        rendah: "Tingkat Kerawanan Rendah",
+        sedang: "Tingkat Kerawanan Sedang",
+        tinggi: "Tingkat Kerawanan Tinggi",
+    }
+    assert list(result.df["kategori"]) == [result.category_map[label] for label in result.labels]
+    assert result.score is not None and result.score > 0.9
+
+    assert result.pca_coords.shape == (len(df), 2)
+    assert result.pca_medoids.shape == (3, 2)
+    assert len(result.pca_explained_variance) == 2
+    # run() tidak mengubah df milik pemanggil
+    assert "cluster" not in df.columns
+
+
+def test_dbscan_marks_outlier_as_noise():
+    df = make_frame().iloc[:6]
+    outlier = make_frame().iloc[[8]]
+    df = pd.concat([df, outlier], ignore_index=True)
+    request = engine.ClusteringRequest(metode=engine.DBSCAN_METHOD, tipe_data=engine.TOTAL, epsilon=0.1, min_pts=2)
+    result = engine.run(request, df)
+
+    assert result.n_clusters == 2
+    assert result.n_noise == 1
+    assert result.labels[-1] == -1
+    assert result.category_map[-1] == engine.NOISE_LABEL
+    assert result.pca_coords.shape == (len(df), 2)
+    assert result.pca_medoids is None
+    assert result.request.name == "total_dbscan_eps0.1_minpts2"
+    assert np.isfinite(result.score)
@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from core import ingest, kecamatan, schema
+
+
+@pytest.fixture
+def index():
+    store = SimpleNamespace(properties={
+        "kode_kec": ["K01", "K02", "K03"],
+        "kecamatan": ["Alpha", "Beta  Timur", "Gamma"],
+        "kab_kota": ["KOTA"] * 3,
+    })
+    return kecamatan.KecamatanIndex(store)
+
+
+def upload_frame(names, value=1):
+    df = pd.DataFrame({"kecamatan": names})
+    for col in ingest.NUMERIC_COLUMNS:
+        df[col] = value
+    return df[schema.DATA_COLUMNS]
+
+
+def test_validate_matches_names_after_normalizing(index, monkeypatch):
+    monkeypatch.setattr(ingest, "EXPECTED_ROWS", 3)
+    df = upload_frame([" alpha", "BETA timur", "Gamma "])
+    result = ingest.validate(df, ["K01", "K02", "K03"], index)
+
+    assert df["kode_kec"].tolist() == ["K01", "K02", "K03"]
+    assert df["kecamatan_normalized"].tolist() == ["ALPHA", "BETA TIMUR", "GAMMA"]
+    assert result["valid_names"] == ["ALPHA", "BETA TIMUR", "GAMMA"]
+    assert (result["invalid"], result["missing"], result["bad_values"]) == ([], [], {})
+    assert result["is_valid"].tolist() == [True, True, True]
+    assert ingest.is_ready(result)
+
+
+def test_validate_reports_invalid_and_missing_names(index):
+    df = upload_frame(["Alpha", "Delta", "Gamma"])
+    # K03 ada di geometri tetapi tidak di database tahun ini
+    result = ingest.validate(df, ["K01", "K02"], index)
+
+    assert result["invalid"] == ["DELTA", "GAMMA"]
+    assert result["missing"] == ["BETA TIMUR"]
+    assert result["is_valid"].tolist() == [True, False, False]
+    assert not result["row_count_ok"]
+    assert not ingest.is_ready(result)
+
+
+def test_validate_counts_non_numeric_values_but_allows_blanks(index, monkeypatch):
+    monkeypatch.setattr(ingest, "EXPECTED_ROWS", 3)
+    df = upload_frame(["Alpha", "Beta Timur", "Gamma"])
+    df["jumlah_jiwa"] = ["10", "", None]
+    df["ketinggian_air_max"] = ["1,5", "n/a", "2.0"]
+    result = ingest.validate(df, ["K01", "K02", "K03"], index)
+
+    assert result["bad_values"] == {"ketinggian_air_max": 2}
+    # Nilai bukan angka menjadi NULL saat ditulis; tidak menghalangi upload
+    assert ingest.is_ready(result)
+
+
+def test_validate_stops_at_missing_columns(index):
+    df = upload_frame(["Alpha"]).drop(columns=["jumlah_lansia", "jumlah_jiwa"])
+    result = ingest.validate(df, ["K01"], index)
+
+    assert result["missing_columns"] == ["jumlah_jiwa", "jumlah_lansia"]
+    assert "kode_kec" not in df.columns
+    assert not ingest.is_ready(result)
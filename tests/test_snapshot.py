@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+
+from core import snapshot
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "snapshot_dir", lambda: str(tmp_path))
+    return tmp_path
+
+
+def test_write_then_read_matches_version(snapshot_dir):
+    df = pd.DataFrame({"kecamatan": ["A", "B"], "jumlah_jiwa": [10, 20]})
+    snapshot.write("kejadian_2019", df, "kejadian_2019:3")
+
+    pd.testing.assert_frame_equal(snapshot.read("kejadian_2019", "kejadian_2019:3"), df)
+    assert snapshot.read("kejadian_2019", "kejadian_2019:4") is None
+    # Tidak ada file sementara yang tertinggal
+    assert [path.name for path in snapshot_dir.iterdir()] == ["kejadian_2019.arrow"]
+
+
+@pytest.mark.parametrize("damage", [lambda data: data[: len(data) // 2], lambda data: b"bukan arrow"])
+def test_corrupt_snapshot_is_a_miss(snapshot_dir, damage):
+    snapshot.write("kejadian_2019", pd.DataFrame({"a": [1, 2, 3]}), "kejadian_2019:1")
+    path = snapshot_dir / "kejadian_2019.arrow"
+    path.write_bytes(damage(path.read_bytes()))
+
+    assert snapshot.read("kejadian_2019") is None
+    assert snapshot.read("kejadian_2019", "kejadian_2019:1") is None
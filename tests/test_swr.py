@@ -0,0 +1,73 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from core import swr
+
+
+def frame(value):
+    return pd.DataFrame({"nilai": [value]})
+
+
+def test_cold_key_runs_one_loader_for_concurrent_sessions():
+    store = swr.StaleWhileRevalidate()
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return frame(1)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(store.get, "2019", "v1", loader) for _ in range(8)]
+        time.sleep(0.1)
+        release.set()
+        results = [future.result(timeout=5) for future in futures]
+
+    assert len(calls) == 1
+    assert all(df["nilai"].tolist() == [1] for df, _ in results)
+    assert sorted(status["cached"] for _, status in results) == [False] + [True] * 7
+
+
+def test_failed_cold_load_is_raised_and_retried():
+    store = swr.StaleWhileRevalidate()
+
+    def failing():
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        store.get("2019", "v1", failing)
+    df, status = store.get("2019", "v1", lambda: frame(2))
+    assert df["nilai"].tolist() == [2]
+    assert status["cached"] is False
+
+
+def test_version_change_serves_stale_then_refreshes():
+    store = swr.StaleWhileRevalidate()
+    store.get("2019", "v1", lambda: frame(1))
+
+    df, status = store.get("2019", "v1", lambda: frame(99))
+    assert df["nilai"].tolist() == [1] and not status["stale"]
+
+    df, status = store.get("2019", None, lambda: frame(99))
+    assert df["nilai"].tolist() == [1] and status["reason"] == swr.REASON_OFFLINE
+
+    done = threading.Event()
+
+    def loader():
+        done.set()
+        return frame(2)
+
+    df, status = store.get("2019", "v2", loader)
+    assert df["nilai"].tolist() == [1] and status["reason"] == swr.REASON_REFRESHING
+    assert done.wait(5)
+    for _ in range(50):
+        df, status = store.get("2019", "v2", loader)
+        if not status["stale"]:
+            break
+        time.sleep(0.02)
+    assert df["nilai"].tolist() == [2] and status["version"] == "v2"
@@ -0,0 +1,103 @@
+import pandas as pd
+
+from core import schema, upload
+
+CODES = ["K01", "K02", "K03"]
+
+
+def upload_frame(rows):
+    """rows: [(kecamatan, kode_kec, nilai)]; semua kolom angka diisi nilai"""
+    return pd.DataFrame(
+        [(name, kode, *[value] * len(upload.VALUE_COLUMNS)) for name, kode, value in rows],
+        columns=["kecamatan", "kode_kec"] + upload.VALUE_COLUMNS,
+    )
+
+
+def stored_from(df):
+    """{kode_kec: row_hash} seperti yang tersimpan setelah df ditulis"""
+    return dict(zip(df["kode_kec"], upload.row_hashes(upload.prepare_values(df)).tolist()))
+
+
+def test_prepare_values_truncates_ints_and_nulls_blanks():
+    df = pd.DataFrame({col: ["3.9", "", "abc"] for col in schema.DATA_COLUMNS})
+    values = upload.prepare_values(df)
+
+    assert list(values.columns) == upload.VALUE_COLUMNS
+    assert values["jumlah_jiwa"].tolist()[0] == 3
+    assert str(values["jumlah_jiwa"].dtype) == "Int64"
+    assert values["rata_ketinggian_air"].tolist()[0] == 3.9
+    assert values.iloc[1:].isna().all().all()
+
+
+def test_row_hashes_depend_on_content_not_index_or_text_form():
+    a = upload.prepare_values(upload_frame([("ALPHA", "K01", 1), ("BETA", "K02", 2)]))
+    b = upload.prepare_values(upload_frame([("ALPHA", "K01", "1.0"), ("BETA", "K02", 2)]).set_axis([7, 8]))
+    c = upload.prepare_values(upload_frame([("ALPHA", "K01", 1), ("BETA", "K02", 3)]))
+
+    assert upload.row_hashes(a).tolist() == upload.row_hashes(b).tolist()
+    assert upload.row_hashes(a)[0] == upload.row_hashes(c)[0]
+    assert upload.row_hashes(a)[1] != upload.row_hashes(c)[1]
+
+
+def test_diff_upload_writes_all_rows_without_stored_hashes():
+    df = upload_frame([("ALPHA", "K01", 1), ("BETA", "K02", 2)])
+    changed, result = upload.diff_upload(df, CODES, lambda kode_list: {})
+
+    assert list(changed.columns) == ["kode_kec"] + upload.VALUE_COLUMNS + [upload.HASH_COLUMN]
+    assert result["changed"] == ["K01", "K02"]
+    assert (result["unchanged"], result["skipped"]) == (0, 0)
+
+
+def test_diff_upload_skips_rows_with_matching_hash():
+    before = upload_frame([("ALPHA", "K01", 1), ("BETA", "K02", 2), ("GAMMA", "K03", 3)])
+    after = upload_frame([("ALPHA", "K01", 1), ("BETA", "K02", 5), ("GAMMA", "K03", 3)])
+    requested = []
+
+    def stored_hashes(kode_list):
+        requested.append(kode_list)
+        return stored_from(before)
+
+    changed, result = upload.diff_upload(after, CODES, stored_hashes)
+
+    assert requested == [CODES]
+    assert result["changed"] == ["K02"]
+    assert result["unchanged"] == 2
+    assert changed["jumlah_jiwa"].tolist() == [5]
+    assert [row["Status"] for row in result["details"]] == ["➖ Unchanged", "✅ Changed", "➖ Unchanged"]
+
+
+def test_diff_upload_treats_null_stored_hash_as_changed():
+    # row_hash dikosongkan trigger saat baris diubah di luar jalur upload
+    df = upload_frame([("ALPHA", "K01", 1), ("BETA", "K02", 2)])
+    stored = stored_from(df)
+    stored["K01"] = None
+
+    _, result = upload.diff_upload(df, CODES, lambda kode_list: stored)
+    assert result["changed"] == ["K01"]
+    assert result["unchanged"] == 1
+
+
+def test_diff_upload_skips_unknown_codes_and_keeps_last_duplicate():
+    df = upload_frame([
+        ("ALPHA", "K01", 1),
+        ("TIDAK ADA", None, 2),
+        ("LUAR", "K99", 3),
+        ("ALPHA", "K01", 4),
+    ])
+    changed, result = upload.diff_upload(df, CODES, lambda kode_list: {})
+
+    assert changed["kode_kec"].tolist() == ["K01"]
+    assert changed["jumlah_jiwa"].tolist() == [4]
+    assert result["skipped"] == 2
+    assert [row["Status"] for row in result["details"]] == ["✅ Changed", "⏭️ Skipped", "⏭️ Skipped", "✅ Changed"]
+
+
+def test_diff_upload_without_valid_rows_does_not_query_hashes():
+    df = upload_frame([("TIDAK ADA", None, 1)])
+
+    def stored_hashes(kode_list):
+        raise AssertionError("tidak boleh dipanggil")
+
+    changed, result = upload.diff_upload(df, CODES, stored_hashes)
+    assert changed.empty
+    assert (result["changed"], result["unchanged"], result["skipped"]) == ([], 0, 1)